@@ -0,0 +1,247 @@
+"""
+Benchmark of the control server proxy's overhead, TCP versus unix socket.
+
+Runs the control server, with a minimal inference server behind it that
+answers every request right away, so that timings are dominated by the
+proxying. Sends requests straight to the inference server, as the baseline,
+then through the control server, proxying over TCP and over a unix socket.
+Reports throughput and latency percentiles of each.
+
+Usage:
+    poetry run python benchmarks/control_proxy.py [--requests 20000] \\
+        [--concurrency 256] [--payload-bytes 1024] \\
+        [--max-keepalive-connections 8] [--max-connections 32]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import httpx
+import uvicorn
+
+TEMPLATES_DIR = Path(__file__).parent.parent / "truss" / "templates"
+SERVER_START_TIMEOUT_SECS = 30
+# As the inference server uses, uvicorn's default.
+BACKLOG = 2048
+
+
+async def inference_app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    size = 0
+    more_body = True
+    while more_body:
+        message = await receive()
+        size += len(message.get("body", b""))
+        more_body = message.get("more_body", False)
+    body = json.dumps({"received_bytes": size}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+def serve_inference():
+    """Run by the control server, in place of the inference server."""
+    tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    tcp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    tcp_socket.bind(("127.0.0.1", int(os.environ["INFERENCE_SERVER_PORT"])))
+    tcp_socket.listen(BACKLOG)
+    sockets = [tcp_socket]
+    uds_path = os.environ.get("INFERENCE_SERVER_UDS_PATH")
+    if uds_path is not None:
+        if os.path.exists(uds_path):
+            os.unlink(uds_path)
+        uds_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        uds_socket.bind(uds_path)
+        uds_socket.listen(BACKLOG)
+        sockets.append(uds_socket)
+    config = uvicorn.Config(inference_app, http="h11", log_level="warning")
+    asyncio.run(uvicorn.Server(config).serve(sockets=sockets))
+
+
+def serve_control(args):
+    sys.path.append(str(TEMPLATES_DIR / "control" / "control"))
+    sys.path.append(str(TEMPLATES_DIR))
+    from application import create_app
+
+    inference_server_home = tempfile.mkdtemp()
+    (Path(inference_server_home) / "config.yaml").write_text("model_name: bench\n")
+    app = create_app(
+        {
+            "inference_server_home": inference_server_home,
+            "inference_server_process_args": [
+                sys.executable,
+                os.path.abspath(__file__),
+                "--serve-inference",
+            ],
+            "control_server_host": "127.0.0.1",
+            "control_server_port": args.control_port,
+            "inference_server_port": args.inference_port,
+            "inference_server_uds_path": args.uds_path,
+            "oversee_inference_server": False,
+            "proxy_max_keepalive_connections": args.max_keepalive_connections,
+            "proxy_max_connections": args.max_connections,
+        }
+    )
+    # httpx logs every request at INFO, which would dominate the timings.
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    uvicorn.run(
+        app, host="127.0.0.1", port=args.control_port, http="h11", log_level="warning"
+    )
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_up(url: str):
+    deadline = time.monotonic() + SERVER_START_TIMEOUT_SECS
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/v1/models/model").status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"Server at {url} didn't come up")
+
+
+@contextmanager
+def control_server(args, uds_path: Optional[str]) -> Iterator[tuple]:
+    control_port = _free_port()
+    inference_port = _free_port()
+    cmd = [
+        sys.executable,
+        os.path.abspath(__file__),
+        "--serve-control",
+        "--control-port",
+        str(control_port),
+        "--inference-port",
+        str(inference_port),
+        "--max-keepalive-connections",
+        str(args.max_keepalive_connections),
+        "--max-connections",
+        str(args.max_connections),
+    ]
+    if uds_path is not None:
+        cmd += ["--uds-path", uds_path]
+    # In a session of its own, to stop the inference server along with it.
+    process = subprocess.Popen(cmd, start_new_session=True)
+    try:
+        control_url = f"http://127.0.0.1:{control_port}"
+        inference_url = f"http://127.0.0.1:{inference_port}"
+        _wait_until_up(control_url)
+        yield control_url, inference_url
+    finally:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+async def _load(url: str, num_requests: int, concurrency: int, payload: bytes):
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    latencies: List[float] = []
+    errors = 0
+    remaining = num_requests
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=None) as client:
+
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                try:
+                    resp = await client.post(
+                        "/v1/models/model:predict", content=payload
+                    )
+                    resp.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+    return elapsed, sorted(latencies), errors
+
+
+def _run(name: str, url: str, args):
+    payload = b"x" * args.payload_bytes
+    # Warm up connections.
+    asyncio.run(_load(url, args.concurrency, args.concurrency, payload))
+    elapsed, latencies, errors = asyncio.run(
+        _load(url, args.requests, args.concurrency, payload)
+    )
+
+    def percentile(p: float) -> float:
+        return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000
+
+    print(
+        f"{name:<28} {len(latencies) / elapsed:>9,.0f} req/sec  "
+        f"p50 {percentile(0.5):>7.2f} ms  p99 {percentile(0.99):>7.2f} ms  "
+        f"{errors} errors"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--payload-bytes", type=int, default=1024)
+    parser.add_argument("--max-keepalive-connections", type=int, default=8)
+    parser.add_argument("--max-connections", type=int, default=32)
+    # Used to run the servers.
+    parser.add_argument("--serve-inference", action="store_true")
+    parser.add_argument("--serve-control", action="store_true")
+    parser.add_argument("--control-port", type=int)
+    parser.add_argument("--inference-port", type=int)
+    parser.add_argument("--uds-path")
+    args = parser.parse_args()
+
+    if args.serve_inference:
+        serve_inference()
+        return
+    if args.serve_control:
+        serve_control(args)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with control_server(args, uds_path=None) as (control_url, inference_url):
+            _run("direct", inference_url, args)
+            _run("proxied over TCP", control_url, args)
+        uds_path = os.path.join(tmp_dir, "inference_server.sock")
+        with control_server(args, uds_path=uds_path) as (control_url, _):
+            _run("proxied over unix socket", control_url, args)
+
+
+if __name__ == "__main__":
+    main()
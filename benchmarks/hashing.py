@@ -0,0 +1,111 @@
+"""
+Benchmark of truss directory hashing.
+
+Builds a synthetic truss with many small files and a few large blobs under
+`data/`, then compares `directory_content_hash` with the previous
+implementation, which hashed one file at a time in 128 KiB chunks. Both must
+produce the same digest. The persistent file hash cache is disabled, so that
+every run hashes all content.
+
+Files are hashed once before timing, so both implementations read from the
+page cache. Pass --keep to reuse a generated truss across runs.
+
+Usage:
+    poetry run python benchmarks/hashing.py [--small-files 5000] \\
+        [--blobs 2] [--blob-size-mb 2048] [--dir /tmp/truss-hash-bench]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+from blake3 import blake3
+from truss.patch.hash import directory_content_hash, str_hash
+from truss.patch.hash_cache import DISABLE_HASH_CACHE_ENV_VAR
+from truss.util.path import get_unignored_relative_paths_from_root
+
+WRITE_CHUNK_BYTES = 16 * 1024 * 1024
+
+
+def previous_directory_content_hash(root: Path) -> str:
+    hasher = blake3()
+    paths = sorted(get_unignored_relative_paths_from_root(root))
+    for path in paths:
+        hasher.update(str_hash(str(path)))
+        absolute_path = root / path
+        if absolute_path.is_file():
+            file_hasher = blake3()
+            buffer = bytearray(128 * 1024)
+            mem_view = memoryview(buffer)
+            with absolute_path.open("rb") as f:
+                while True:
+                    n = f.readinto(mem_view)
+                    if n <= 0:
+                        break
+                    file_hasher.update(mem_view[:n])
+            hasher.update(file_hasher.digest())
+    return hasher.hexdigest()
+
+
+def build_truss(root: Path, num_small_files: int, num_blobs: int, blob_size_mb: int):
+    marker = root / ".complete"
+    if marker.exists():
+        return
+    (root / "model").mkdir(parents=True, exist_ok=True)
+    (root / "config.yaml").write_text("model_name: hash-bench\n")
+    (root / "model" / "model.py").write_text("class Model:\n    pass\n")
+    for i in range(num_small_files):
+        small_dir = root / "data" / "small" / str(i % 100)
+        small_dir.mkdir(parents=True, exist_ok=True)
+        (small_dir / f"file{i}.json").write_bytes(os.urandom(512 + i % 8192))
+    chunk = os.urandom(WRITE_CHUNK_BYTES)
+    for i in range(num_blobs):
+        with (root / "data" / f"blob{i}.safetensors").open("wb") as f:
+            for _ in range(blob_size_mb * 1024 * 1024 // WRITE_CHUNK_BYTES):
+                # Vary the content, so that chunks don't hash the same.
+                f.write(chunk)
+                chunk = chunk[1:] + chunk[:1]
+    marker.touch()
+
+
+def timed(fn: Callable[[Path], str], root: Path) -> float:
+    start = time.perf_counter()
+    fn(root)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--small-files", type=int, default=5000)
+    parser.add_argument("--blobs", type=int, default=2)
+    parser.add_argument("--blob-size-mb", type=int, default=2048)
+    parser.add_argument("--dir", type=Path, default=None)
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+
+    os.environ[DISABLE_HASH_CACHE_ENV_VAR] = "1"
+    root = args.dir or Path(tempfile.mkdtemp(prefix="truss-hash-bench-"))
+    try:
+        print(f"building truss at {root}")
+        build_truss(root, args.small_files, args.blobs, args.blob_size_mb)
+
+        expected = previous_directory_content_hash(root)
+        assert directory_content_hash(root) == expected, "digests differ"
+
+        previous = timed(previous_directory_content_hash, root)
+        current = timed(directory_content_hash, root)
+        print(
+            f"{args.small_files} small files, {args.blobs} x {args.blob_size_mb} MiB blobs"
+        )
+        print(f"previous: {previous:.2f}s")
+        print(f"current:  {current:.2f}s ({previous / current:.1f}x)")
+    finally:
+        if not args.keep and args.dir is None:
+            shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
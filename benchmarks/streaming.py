@@ -0,0 +1,131 @@
+"""
+Micro-benchmark of the streaming response pipeline in the inference server.
+
+Compares the chunks/sec of the previous implementation (unbounded
+asyncio.Queue, a wrapper object per chunk and an `asyncio.wait_for` per
+read) with `StreamBuffer`, for a producer that generates chunks as fast as
+possible. Also compares driving a sync generator with a thread handoff per
+chunk against `SyncGeneratorPump`.
+
+Usage:
+    poetry run python benchmarks/streaming.py [--chunks 200000]
+"""
+import argparse
+import asyncio
+import time
+
+from anyio import to_thread
+from truss.templates.server.common.streaming import StreamBuffer, SyncGeneratorPump
+
+READ_TIMEOUT_SECS = 60
+
+
+class _ResponseChunk:
+    def __init__(self, value):
+        self.value = value
+
+
+async def _token_stream(num_chunks: int):
+    for i in range(num_chunks):
+        yield "tok"
+
+
+async def queue_pipeline(num_chunks: int) -> int:
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def write():
+        try:
+            async for chunk in _token_stream(num_chunks):
+                await queue.put(_ResponseChunk(chunk))
+        finally:
+            await queue.put(None)
+
+    task = asyncio.create_task(write())
+    count = 0
+    while True:
+        chunk = await asyncio.wait_for(queue.get(), timeout=READ_TIMEOUT_SECS)
+        if chunk is None:
+            break
+        count += 1
+    await task
+    return count
+
+
+async def buffer_pipeline(num_chunks: int, **buffer_kwargs) -> int:
+    buffer = StreamBuffer(read_timeout=READ_TIMEOUT_SECS, **buffer_kwargs)
+
+    async def write():
+        try:
+            async for chunk in _token_stream(num_chunks):
+                await buffer.put(chunk)
+        finally:
+            buffer.close()
+
+    task = asyncio.create_task(write())
+    count = 0
+    while True:
+        try:
+            await buffer.get()
+        except StopAsyncIteration:
+            break
+        count += 1
+    buffer.cancel_timers()
+    await task
+    return count
+
+
+def _sync_token_stream(num_chunks: int):
+    for i in range(num_chunks):
+        yield "tok"
+
+
+async def sync_gen_to_thread(num_chunks: int) -> int:
+    gen = _sync_token_stream(num_chunks)
+    final = object()
+    count = 0
+    while True:
+        chunk = await to_thread.run_sync(next, gen, final)
+        if chunk is final:
+            break
+        count += 1
+    return count
+
+
+async def sync_gen_pump(num_chunks: int) -> int:
+    count = 0
+    async for _ in SyncGeneratorPump(_sync_token_stream(num_chunks)).stream():
+        count += 1
+    return count
+
+
+def _run(name: str, num_chunks: int, pipeline, **kwargs):
+    start = time.perf_counter()
+    responses = asyncio.run(pipeline(num_chunks, **kwargs))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<40} {num_chunks / elapsed:>12,.0f} chunks/sec "
+        f"({responses:,} response chunks)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=200_000)
+    args = parser.parse_args()
+
+    _run("asyncio.Queue + wait_for (previous)", args.chunks, queue_pipeline)
+    _run("StreamBuffer", args.chunks, buffer_pipeline)
+    _run("StreamBuffer, maxsize=64", args.chunks, buffer_pipeline, maxsize=64)
+    _run(
+        "StreamBuffer, coalesce 4 KiB",
+        args.chunks,
+        buffer_pipeline,
+        coalesce_bytes=4096,
+    )
+    sync_chunks = args.chunks // 10
+    _run("sync generator, to_thread per chunk", sync_chunks, sync_gen_to_thread)
+    _run("sync generator, SyncGeneratorPump", sync_chunks, sync_gen_pump)
+
+
+if __name__ == "__main__":
+    main()
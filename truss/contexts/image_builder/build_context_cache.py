@@ -0,0 +1,121 @@
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from truss.local.local_config_handler import LocalConfigHandler
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONTEXTS = 4
+# Partially built contexts older than this are left over from interrupted
+# builds.
+STALE_TMP_CONTEXT_SECS = 60 * 60
+CONTEXT_STATS_FILE = ".truss_build_context.json"
+_TMP_PREFIX = ".tmp-"
+
+
+class BuildContextCache:
+    """Docker build contexts, kept to be reused by later builds.
+
+    Contexts are keyed by a hash of everything that goes into them. Large
+    files in a context may be hardlinks to the truss files they come from,
+    so a context is only reused if its files still have the size and mtime
+    they had when it was built, which an edit in place would change.
+
+    The least recently used contexts beyond `max_contexts` are removed.
+    """
+
+    def __init__(self, cache_dir: Path, max_contexts: int = DEFAULT_MAX_CONTEXTS):
+        self._cache_dir = cache_dir
+        self._max_contexts = max_contexts
+
+    def get_or_create(self, key: str, prepare: Callable[[Path], None]) -> Path:
+        """
+        Directory of the build context for `key`, prepared by calling
+        `prepare` with an empty directory if there is no valid one.
+        """
+        context_dir = self._cache_dir / key
+        if _is_intact(context_dir):
+            logger.info(f"Reusing docker build context at {context_dir}")
+            os.utime(context_dir)
+            return context_dir
+
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_dir = self._cache_dir / f"{_TMP_PREFIX}{key}-{uuid.uuid4().hex[:8]}"
+        tmp_dir.mkdir()
+        try:
+            prepare(tmp_dir)
+            _write_stats(tmp_dir)
+            if context_dir.exists():
+                shutil.rmtree(context_dir)
+            # Built under a temporary name first, so that an interrupted
+            # build never leaves a context that looks complete.
+            os.rename(tmp_dir, context_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            # A concurrent build of the same context may have won the race.
+            if _is_intact(context_dir):
+                return context_dir
+            raise
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        self.collect_garbage(keep=key)
+        return context_dir
+
+    def collect_garbage(self, keep: Optional[str] = None):
+        """Remove least recently used contexts, and interrupted builds."""
+        contexts: List[Tuple[float, Path]] = []
+        now = time.time()
+        try:
+            entries = list(os.scandir(self._cache_dir))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            mtime = entry.stat().st_mtime
+            if entry.name.startswith(_TMP_PREFIX):
+                if now - mtime > STALE_TMP_CONTEXT_SECS:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            elif entry.name != keep:
+                contexts.append((mtime, Path(entry.path)))
+        contexts.sort(reverse=True)
+        max_others = self._max_contexts - (1 if keep is not None else 0)
+        for _, context_dir in contexts[max(max_others, 0) :]:
+            logger.debug(f"Removing docker build context at {context_dir}")
+            shutil.rmtree(context_dir, ignore_errors=True)
+
+
+def build_context_cache() -> BuildContextCache:
+    return BuildContextCache(LocalConfigHandler.build_contexts_dir_path())
+
+
+def _file_stats(context_dir: Path) -> Dict[str, List[int]]:
+    stats = {}
+    for root, _, files in os.walk(context_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            relative_path = Path(path).relative_to(context_dir).as_posix()
+            if relative_path == CONTEXT_STATS_FILE:
+                continue
+            stat = os.lstat(path)
+            stats[relative_path] = [stat.st_size, stat.st_mtime_ns]
+    return stats
+
+
+def _write_stats(context_dir: Path):
+    (context_dir / CONTEXT_STATS_FILE).write_text(json.dumps(_file_stats(context_dir)))
+
+
+def _is_intact(context_dir: Path) -> bool:
+    try:
+        recorded = json.loads((context_dir / CONTEXT_STATS_FILE).read_text())
+    except (OSError, ValueError):
+        return False
+    return recorded == _file_stats(context_dir)
@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
 from truss.docker import Docker
 from truss.util.path import given_or_temporary_dir
@@ -19,12 +20,11 @@ class ImageBuilder(ABC):
 
         Arguments:
             build_dir(Path): Directory to use for building the docker image. If None
-                             then a temporary directory is used.
+                             then the builder picks one, see `prepared_build_dir`.
             tag(str): A tag to assign to the docker image.
         """
 
-        with given_or_temporary_dir(build_dir) as build_dir_path:
-            self.prepare_image_build_dir(build_dir_path)
+        with self.prepared_build_dir(build_dir) as build_dir_path:
             return Docker.client().build(
                 str(build_dir_path),
                 labels=labels if labels else {},
@@ -34,6 +34,16 @@ class ImageBuilder(ABC):
                 load=True,  # We pass load=True so that `build` returns an `Image` object
             )
 
+    @contextmanager
+    def prepared_build_dir(self, build_dir: Optional[Path] = None) -> Iterator[Path]:
+        """Build directory prepared for building the docker image from.
+
+        If `build_dir` is None, a temporary directory is used.
+        """
+        with given_or_temporary_dir(build_dir) as build_dir_path:
+            self.prepare_image_build_dir(build_dir_path)
+            yield build_dir_path
+
     @property
     @abstractmethod
     def default_tag(self):
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+import json
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Type
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type
 
 import boto3
+import truss
 import yaml
 from botocore import UNSIGNED
 from botocore.client import Config
@@ -36,6 +39,7 @@ from truss.constants import (
     USE_BRITON,
     USER_SUPPLIED_REQUIREMENTS_TXT_FILENAME,
 )
+from truss.contexts.image_builder.build_context_cache import build_context_cache
 from truss.contexts.image_builder.cache_warmer import (
     AWSCredentials,
     parse_s3_credentials_file,
@@ -49,7 +53,7 @@ from truss.contexts.image_builder.util import (
     truss_base_image_tag,
 )
 from truss.contexts.truss_context import TrussContext
-from truss.patch.hash import directory_content_hash
+from truss.patch.hash import directory_content_hash, str_hash_str
 from truss.truss_config import BaseImage, TrussConfig
 from truss.truss_spec import TrussSpec
 from truss.util.jinja import read_template_from_fs
@@ -75,6 +79,10 @@ CLOUD_BUCKET_CACHE = Path("/app/model_cache/")
 HF_SOURCE_DIR = Path("./root/.cache/huggingface/hub/")
 HF_CACHE_DIR = Path("/root/.cache/huggingface/hub/")
 
+# Files of cached build directories at least this large are cloned or
+# hardlinked from the truss rather than copied.
+BUILD_DIR_LINK_MIN_SIZE = 1024 * 1024
+
 
 class RemoteCache(ABC):
     def __init__(self, repo_name, data_dir, revision=None):
@@ -259,6 +267,7 @@ class CachedFile:
 
 def get_files_to_cache(config: TrussConfig, truss_dir: Path, build_dir: Path):
     def copy_into_build_dir(from_path: Path, path_in_build_dir: str):
+        _unlink_if_exists(build_dir / path_in_build_dir)
         copy_tree_or_file(from_path, build_dir / path_in_build_dir)  # type: ignore[operator]
 
     remote_model_files = {}
@@ -309,33 +318,106 @@ class ServingImageBuilder(ImageBuilder):
     def default_tag(self):
         return f"{self._spec.model_framework_name}-model:latest"
 
+    @contextmanager
+    def prepared_build_dir(self, build_dir: Optional[Path] = None) -> Iterator[Path]:
+        if build_dir is None and self._can_cache_build_dir():
+            yield self._cached_build_dir(use_hf_secret=False)
+            return
+        with super().prepared_build_dir(build_dir) as build_dir_path:
+            yield build_dir_path
+
     def prepare_image_build_dir(
         self, build_dir: Optional[Path] = None, use_hf_secret: bool = False
-    ):
+    ) -> Path:
         """
         Prepare a directory for building the docker image from.
+
+        Without `build_dir`, a build directory prepared before for the same
+        truss is reused if possible, see `BuildContextCache`.
+
+        Returns: the build directory
         """
+        if build_dir is None:
+            if self._can_cache_build_dir():
+                return self._cached_build_dir(use_hf_secret)
+            # TODO(pankaj) We probably don't need model framework specific directory.
+            build_dir = build_truss_target_directory(self._spec.model_framework_name)
+        self._prepare_image_build_dir(build_dir, use_hf_secret)
+        return build_dir
+
+    def _can_cache_build_dir(self) -> bool:
+        # Files to cache from model repos are listed when preparing, they can
+        # change without the truss changing.
+        return len(self._spec.config.model_cache.models) == 0
+
+    def _cached_build_dir(self, use_hf_secret: bool) -> Path:
+        return build_context_cache().get_or_create(
+            self._build_dir_cache_key(use_hf_secret),
+            lambda build_dir: self._prepare_image_build_dir(
+                build_dir,
+                use_hf_secret,
+                # TRT-LLM template files are copied over the truss files.
+                link_min_size=(
+                    BUILD_DIR_LINK_MIN_SIZE
+                    if self._spec.config.trt_llm is None
+                    else None
+                ),
+            ),
+        )
+
+    def _build_dir_cache_key(self, use_hf_secret: bool) -> str:
+        truss_hash = directory_content_hash(
+            self._truss_dir,
+            load_trussignore_patterns() + self._user_truss_ignore_patterns(),
+        )
+        templates_hash = directory_content_hash(
+            TEMPLATES_DIR, ["__pycache__/", "*.py[cod]"]
+        )
+        return str_hash_str(
+            json.dumps(
+                [
+                    truss.version(),
+                    str(self._truss_dir.resolve()),
+                    truss_hash,
+                    templates_hash,
+                    use_hf_secret,
+                    bool(USE_BRITON),
+                ]
+            )
+        )
+
+    def _user_truss_ignore_patterns(self) -> List[str]:
+        if (self._truss_dir / USER_TRUSS_IGNORE_FILE).exists():
+            return load_trussignore_patterns(self._truss_dir / USER_TRUSS_IGNORE_FILE)
+        return []
+
+    def _prepare_image_build_dir(
+        self,
+        build_dir: Path,
+        use_hf_secret: bool,
+        link_min_size: Optional[int] = None,
+    ):
         truss_dir = self._truss_dir
         spec = self._spec
         config = spec.config
         model_framework_name = spec.model_framework_name
-        if build_dir is None:
-            # TODO(pankaj) We probably don't need model framework specific directory.
-            build_dir = build_truss_target_directory(model_framework_name)
 
         data_dir = build_dir / config.data_dir  # type: ignore[operator]
 
         def copy_into_build_dir(from_path: Path, path_in_build_dir: str):
+            _unlink_if_exists(build_dir / path_in_build_dir)
             copy_tree_or_file(from_path, build_dir / path_in_build_dir)  # type: ignore[operator]
 
-        truss_ignore_patterns = []
-        if (truss_dir / USER_TRUSS_IGNORE_FILE).exists():
-            truss_ignore_patterns = load_trussignore_patterns(
-                truss_dir / USER_TRUSS_IGNORE_FILE
-            )
+        truss_ignore_patterns = self._user_truss_ignore_patterns()
 
-        # Copy over truss
-        copy_tree_path(truss_dir, build_dir, ignore_patterns=truss_ignore_patterns)
+        # Copy over truss. Large files may be hardlinks, so files written to
+        # below are replaced rather than written to in place.
+        copy_tree_path(
+            truss_dir,
+            build_dir,
+            ignore_patterns=truss_ignore_patterns,
+            link_min_size=link_min_size,
+        )
 
         # Copy over template truss for TRT-LLM (we overwrite the model and packages dir)
         # Most of the code is pulled from upstream triton-inference-server tensorrtllm_backend
@@ -369,6 +451,7 @@ class ServingImageBuilder(ImageBuilder):
             config.model_metadata["tags"] = [OPENAI_COMPATIBLE_TAG]
 
         # Override config.yml
+        _unlink_if_exists(build_dir / CONFIG_FILE)
         with (build_dir / CONFIG_FILE).open("w") as config_file:
             yaml.dump(config.to_dict(verbose=True), config_file)
 
@@ -434,13 +517,16 @@ class ServingImageBuilder(ImageBuilder):
             else ""
         )
         if spec.requirements_file is not None:
+            _unlink_if_exists(build_dir / USER_SUPPLIED_REQUIREMENTS_TXT_FILENAME)
             copy_into_build_dir(
                 truss_dir / spec.requirements_file,
                 USER_SUPPLIED_REQUIREMENTS_TXT_FILENAME,
             )
+        _unlink_if_exists(build_dir / REQUIREMENTS_TXT_FILENAME)
         (build_dir / REQUIREMENTS_TXT_FILENAME).write_text(
             user_provided_python_requirements
         )
+        _unlink_if_exists(build_dir / SYSTEM_PACKAGES_TXT_FILENAME)
         (build_dir / SYSTEM_PACKAGES_TXT_FILENAME).write_text(spec.system_packages_txt)
 
         self._render_dockerfile(
@@ -518,4 +604,11 @@ class ServingImageBuilder(ImageBuilder):
             **FILENAME_CONSTANTS_MAP,
         )
         docker_file_path = build_dir / MODEL_DOCKERFILE_NAME
+        _unlink_if_exists(docker_file_path)
         docker_file_path.write_text(dockerfile_contents)
+
+
+def _unlink_if_exists(path: Path):
+    # Files copied from the truss may be hardlinks to the originals.
+    if path.is_file():
+        path.unlink()
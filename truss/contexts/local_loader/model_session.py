@@ -0,0 +1,236 @@
+import asyncio
+import importlib
+import sys
+import threading
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncGenerator,
+    Awaitable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TypeVar,
+)
+
+from fastapi import HTTPException
+from truss.constants import SERVER_CODE_DIR, TEMPLATES_DIR
+from truss.contexts.local_loader.load_model_local import LoadModelLocal
+from truss.truss_spec import TrussSpec
+from truss.util.mtime_tracker import MaxModifiedTimeTracker
+
+if TYPE_CHECKING:
+    from truss.truss_handle import TrussHandle
+
+DEFAULT_PREDICT_MANY_CONCURRENCY = 64
+# How long a check of the truss for changes is reused, rather than walking
+# the truss on every prediction. Sessions used for longer than that watch the
+# truss for changes instead, see `MaxModifiedTimeTracker`.
+CHANGE_CHECK_TTL_SECS = 1.0
+
+_T = TypeVar("_T")
+
+
+# Top level modules of the inference server code, see
+# `_import_model_wrapper_module`.
+_SERVER_MODULES = ("common", "shared", "model_wrapper")
+_server_modules_lock = threading.Lock()
+_model_wrapper_module: Any = None
+
+
+def _is_server_module(name: str) -> bool:
+    return name.split(".")[0] in _SERVER_MODULES
+
+
+def _import_model_wrapper_module():
+    # The inference server code imports its modules as top level `common`,
+    # `shared` and `model_wrapper` modules, as laid out in the serving image.
+    # They're imported under those names, then taken out of `sys.path` and
+    # `sys.modules` again, so that they neither shadow nor get shadowed by
+    # modules of the same names of the caller.
+    global _model_wrapper_module
+    with _server_modules_lock:
+        if _model_wrapper_module is not None:
+            return _model_wrapper_module
+        saved_path = list(sys.path)
+        saved_modules = {
+            name: sys.modules.pop(name)
+            for name in list(sys.modules)
+            if _is_server_module(name)
+        }
+        sys.path[:0] = [str(SERVER_CODE_DIR), str(TEMPLATES_DIR)]
+        try:
+            _model_wrapper_module = importlib.import_module("model_wrapper")
+        finally:
+            sys.path[:] = saved_path
+            for name in [name for name in sys.modules if _is_server_module(name)]:
+                del sys.modules[name]
+            sys.modules.update(saved_modules)
+        return _model_wrapper_module
+
+
+def _create_model_wrapper(truss_handle: "TrussHandle"):
+    model_wrapper_module = _import_model_wrapper_module()
+
+    class LocalModelWrapper(model_wrapper_module.ModelWrapper):
+        def try_load(self):
+            # Loads the model from the truss directory, with the current
+            # environment, rather than from the serving image layout.
+            self._model = LoadModelLocal.run(truss_handle.spec.truss_dir)
+            self.set_truss_schema()
+            self.set_batcher()
+
+    spec = TrussSpec(truss_handle.spec.truss_dir)
+    model_wrapper = LocalModelWrapper(spec.config.to_dict(verbose=True))
+    model_wrapper.try_load()
+    model_wrapper.ready = True
+    return model_wrapper
+
+
+class LocalModelSession:
+    """Keeps a Truss model loaded in the current process, for local predictions.
+
+    Predictions go through the same pipeline as on the inference server,
+    including async and streaming models, predict concurrency and batching.
+    The model is loaded on first use and reloaded only when the truss changes.
+
+    The model runs on an event loop in a background thread of the session,
+    which lets it be used from sync code, notebooks included.
+    """
+
+    def __init__(self, truss_handle: "TrussHandle"):
+        self._truss_handle = truss_handle
+        self._model_wrapper: Any = None
+        self._loaded_mod_time: Optional[float] = None
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._mtime_trackers: Dict[str, MaxModifiedTimeTracker] = {}
+
+    @property
+    def model_wrapper(self):
+        """The loaded model, reloaded first if the truss changed since."""
+        with self._lock:
+            mod_time = self._max_modified_time()
+            if self._model_wrapper is None or mod_time != self._loaded_mod_time:
+                self._model_wrapper = self._run(self._load())
+                self._loaded_mod_time = mod_time
+            return self._model_wrapper
+
+    def invalidate(self):
+        """Check the truss for changes on the next use, e.g. after writing to it."""
+        for tracker in self._mtime_trackers.values():
+            tracker.invalidate()
+
+    def _max_modified_time(self) -> float:
+        # Same as the truss handle's `max_modified_time`, with walks reused.
+        paths = [self._truss_handle.spec.truss_dir]
+        if not self._truss_handle.no_external_packages:
+            paths.extend(self._truss_handle.spec.external_package_dirs_paths)
+        return max(self._mtime_tracker(path).get() for path in paths)
+
+    def _mtime_tracker(self, path: Path) -> MaxModifiedTimeTracker:
+        tracker = self._mtime_trackers.get(str(path))
+        if tracker is None:
+            tracker = MaxModifiedTimeTracker(path, ttl_secs=CHANGE_CHECK_TTL_SECS)
+            self._mtime_trackers[str(path)] = tracker
+        return tracker
+
+    async def _load(self):
+        # Loads on the session's event loop, like the server loads before
+        # serving requests on its loop.
+        return _create_model_wrapper(self._truss_handle)
+
+    def predict(self, request: Any) -> Any:
+        """
+        Run preprocess, predict and postprocess for a request. A streaming
+        response is returned as an iterator over its chunks.
+        """
+        model_wrapper = self.model_wrapper
+        return self._to_sync(self._run(_call(model_wrapper, request)))
+
+    def predict_many(
+        self,
+        requests: Sequence[Any],
+        concurrency: int = DEFAULT_PREDICT_MANY_CONCURRENCY,
+    ) -> List[Any]:
+        """
+        Run predictions for many requests, up to `concurrency` at a time, and
+        return the responses in the same order. How many of them run predict
+        at the same time is still bounded by the predict concurrency of the
+        truss.
+        """
+        model_wrapper = self.model_wrapper
+
+        async def call_all():
+            limiter = asyncio.Semaphore(concurrency)
+
+            async def call(request):
+                async with limiter:
+                    return await _call(model_wrapper, request)
+
+            return await asyncio.gather(*[call(request) for request in requests])
+
+        return [self._to_sync(response) for response in self._run(call_all())]
+
+    def close(self):
+        """Stop the session's event loop. The model is loaded again if used."""
+        with self._lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._loop_thread.join()  # type: ignore[union-attr]
+                self._loop.close()
+                self._loop = None
+                self._loop_thread = None
+            self._model_wrapper = None
+            self._loaded_mod_time = None
+            for tracker in self._mtime_trackers.values():
+                tracker.close()
+            self._mtime_trackers = {}
+
+    def _run(self, coro: Awaitable[_T]) -> _T:
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._loop_thread = threading.Thread(
+                target=self._loop.run_forever, name="truss-local-session", daemon=True
+            )
+            self._loop_thread.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()  # type: ignore[arg-type]
+
+    def _to_sync(self, response: Any) -> Any:
+        if isinstance(response, AsyncGenerator):
+            return self._iterate(response)
+        return response
+
+    def _iterate(self, stream: AsyncGenerator) -> Iterator[Any]:
+        try:
+            while True:
+                try:
+                    yield self._run(_next(stream))
+                except StopAsyncIteration:
+                    return
+        finally:
+            if self._loop is not None:
+                self._run(_close(stream))
+
+
+async def _call(model_wrapper, request: Any) -> Any:
+    try:
+        return await model_wrapper(request)
+    except HTTPException as e:
+        # The server turns errors raised by the model into a 500 response,
+        # raise the model's own error instead.
+        if e.status_code == 500 and e.__context__ is not None:
+            raise e.__context__ from None
+        raise
+
+
+async def _next(stream: AsyncGenerator) -> Any:
+    return await stream.__anext__()
+
+
+async def _close(stream: AsyncGenerator):
+    await stream.aclose()
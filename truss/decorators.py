@@ -1,12 +1,15 @@
 def proxy_to_shadow_if_scattered(func):
     def wrapper(*args, **kwargs):
         from truss.truss_handle import TrussHandle
+        from truss.util.mtime_tracker import max_modified_time_tracking
 
         truss_handle = args[0]
-        if not truss_handle.is_scattered():
-            return func(*args, **kwargs)
+        # Walk the truss once per operation, rather than on every lookup.
+        with max_modified_time_tracking():
+            if not truss_handle.is_scattered():
+                return func(*args, **kwargs)
 
-        gathered_truss_handle = TrussHandle(truss_handle.gather())
-        return func(gathered_truss_handle, *args[1:], **kwargs)
+            gathered_truss_handle = TrussHandle(truss_handle.gather())
+            return func(gathered_truss_handle, *args[1:], **kwargs)
 
     return wrapper
@@ -79,6 +79,22 @@ class LocalConfigHandler:
     def _signatures_dir_path():
         return LocalConfigHandler.TRUSS_CONFIG_DIR / "signatures"
 
+    @staticmethod
+    def hash_cache_path():
+        return LocalConfigHandler.TRUSS_CONFIG_DIR / "file_hashes.sqlite"
+
+    @staticmethod
+    def patch_contents_dir_path():
+        return LocalConfigHandler.TRUSS_CONFIG_DIR / "patch_contents"
+
+    @staticmethod
+    def pushed_blobs_dir_path():
+        return LocalConfigHandler.TRUSS_CONFIG_DIR / "pushed_blobs"
+
+    @staticmethod
+    def build_contexts_dir_path():
+        return LocalConfigHandler.TRUSS_CONFIG_DIR / "build_contexts"
+
     @staticmethod
     def shadow_trusses_dir_path():
         return LocalConfigHandler.TRUSS_CONFIG_DIR / "shadow_trusses"
@@ -1,6 +1,6 @@
 import logging
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from typing import Any, Dict, List, Optional, Set
 
 import yaml
 from truss.constants import CONFIG_FILE
@@ -45,10 +45,19 @@ def calc_truss_patch(
     truss_dir: Path,
     previous_truss_signature: TrussSignature,
     ignore_patterns: Optional[List[str]] = None,
+    content_hashes_by_path: Optional[Dict[str, Optional[str]]] = None,
+    binary_content: bool = False,
 ) -> Optional[List[Patch]]:
     """
     Calculate patch for a truss from a previous state.
 
+    If the current `content_hashes_by_path` of the truss are known, e.g. from
+    a `LiveTrussSignature`, changes are found from them, without listing and
+    hashing the truss directory. They must already exclude ignored paths.
+
+    Files that aren't UTF-8 text can only be patched with `binary_content`,
+    i.e. if the receiver of the patch accepts the binary patch format.
+
     Returns: None if patch cannot be calculated, otherwise a list of patches.
         Note that the none return value is pretty important, patch coverage is
         limited and this usually indicates that the identified change cannot be
@@ -69,6 +78,7 @@ def calc_truss_patch(
         truss_dir,
         previous_truss_signature.content_hashes_by_path,
         ignore_patterns,
+        content_hashes_by_path,
     )
 
     truss_spec = TrussSpec(truss_dir)
@@ -125,6 +135,10 @@ def calc_truss_patch(
             # TODO(pankaj) Add support for empty directories, skip them for now.
             if not full_path.is_file():
                 continue
+            content_kwargs = _file_content_kwargs(full_path, binary_content)
+            if content_kwargs is None:
+                logger.info(f"Patching not supported for non UTF-8 file {path}")
+                return None
             logger.info(
                 f"Created patch to {action.value.lower()} model code file: {path}"
             )
@@ -134,7 +148,7 @@ def calc_truss_patch(
                     body=ModelCodePatch(
                         action=action,
                         path=_relative_to(path, model_module_path),
-                        content=full_path.read_text(),
+                        **content_kwargs,
                     ),
                 )
             )
@@ -151,6 +165,10 @@ def calc_truss_patch(
             full_path = truss_dir / path
             if not full_path.is_file():
                 continue
+            content_kwargs = _file_content_kwargs(full_path, binary_content)
+            if content_kwargs is None:
+                logger.info(f"Patching not supported for non UTF-8 file {path}")
+                return None
             logger.info(f"Created patch to {action.value.lower()} package file: {path}")
             patches.append(
                 Patch(
@@ -158,7 +176,7 @@ def calc_truss_patch(
                     body=PackagePatch(
                         action=action,
                         path=_relative_to(path, bundled_packages_path),
-                        content=full_path.read_text(),
+                        **content_kwargs,
                     ),
                 )
             )
@@ -172,14 +190,20 @@ def _calc_changed_paths(
     root: Path,
     previous_root_path_content_hashes: Dict[str, str],
     ignore_patterns: Optional[List[str]],
+    content_hashes_by_path: Optional[Dict[str, Optional[str]]] = None,
 ) -> Dict[str, List[str]]:
     """
     TODO(pankaj) add support for directory creation in patch
     """
-    root_relative_new_paths = set(
-        (str(path.relative_to(root)) for path in root.glob("**/*"))
-    )
-    unignored_new_paths = calc_unignored_paths(root_relative_new_paths, ignore_patterns)
+    if content_hashes_by_path is None:
+        root_relative_new_paths = set(
+            (str(path.relative_to(root)) for path in root.glob("**/*"))
+        )
+        unignored_new_paths = calc_unignored_paths(
+            root_relative_new_paths, ignore_patterns
+        )
+    else:
+        unignored_new_paths = set(content_hashes_by_path.keys())
     previous_root_relative_paths = set(previous_root_path_content_hashes.keys())
     unignored_prev_paths = calc_unignored_paths(
         previous_root_relative_paths, ignore_patterns
@@ -191,12 +215,18 @@ def _calc_changed_paths(
     updated_paths = set()
     common_paths = unignored_new_paths.intersection(unignored_prev_paths)
     for path in common_paths:
-        full_path: Path = root / path
-        if full_path.is_file():
+        if content_hashes_by_path is None:
+            full_path: Path = root / path
+            if not full_path.is_file():
+                continue
             content_hash = file_content_hash_str(full_path)
-            previous_content_hash = previous_root_path_content_hashes[path]
-            if content_hash != previous_content_hash:
-                updated_paths.add(path)
+        else:
+            content_hash = content_hashes_by_path[path]  # type: ignore[assignment]
+            if content_hash is None:
+                continue
+        previous_content_hash = previous_root_path_content_hashes[path]
+        if content_hash != previous_content_hash:
+            updated_paths.add(path)
 
     return {
         "added": list(added_paths),
@@ -414,6 +444,16 @@ def _mk_python_requirement_patch(action: Action, requirement: str) -> Patch:
     )
 
 
+def _file_content_kwargs(path: Path, binary_content: bool) -> Optional[Dict[str, Any]]:
+    content = path.read_bytes()
+    try:
+        return {"content": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        if not binary_content:
+            return None
+        return {"binary_content": content}
+
+
 def _mk_system_package_patch(action: Action, package: str) -> Patch:
     return Patch(
         type=PatchType.SYSTEM_PACKAGE,
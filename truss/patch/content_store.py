@@ -0,0 +1,88 @@
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterable, Optional
+
+from blake3 import blake3
+from truss.local.local_config_handler import LocalConfigHandler
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_TOTAL_BYTES = 256 * 1024 * 1024
+MAX_FILE_BYTES = 16 * 1024 * 1024
+
+
+class ContentStore:
+    """Local store of file contents, keyed by their blake3 hex digest.
+
+    Keeps the contents of files as of the last patch sent to a container, so
+    the next patch can send deltas of changed files rather than their full
+    contents. It's only a cache: contents are verified against their digest
+    when read, and least recently used contents are evicted beyond
+    `max_total_bytes`.
+    """
+
+    def __init__(self, store_dir: Path, max_total_bytes: int = DEFAULT_MAX_TOTAL_BYTES):
+        self._store_dir = store_dir
+        self._max_total_bytes = max_total_bytes
+
+    def get(self, digest: str) -> Optional[bytes]:
+        path = self._path(digest)
+        try:
+            content = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            return None
+        if blake3(content).hexdigest() != digest:
+            logger.debug(f"Removing corrupt content {digest} from {self._store_dir}")
+            path.unlink(missing_ok=True)
+            return None
+        return content
+
+    def put_files(self, files: Iterable[Path]):
+        """Store the contents of files, skipping large ones."""
+        try:
+            self._store_dir.mkdir(parents=True, exist_ok=True)
+            for file in files:
+                if file.is_file() and file.stat().st_size <= MAX_FILE_BYTES:
+                    self._put(file.read_bytes())
+            self._evict()
+        except OSError as e:
+            logger.debug(f"Unable to store file contents in {self._store_dir}: {e}")
+
+    def _put(self, content: bytes):
+        path = self._path(blake3(content).hexdigest())
+        if path.exists():
+            os.utime(path)
+            return
+        # Written under a temporary name first, so that readers never see
+        # partial content.
+        fd, tmp_path = tempfile.mkstemp(dir=self._store_dir, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self._store_dir):
+            if entry.is_file() and not entry.name.startswith("."):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= self._max_total_bytes:
+                break
+            Path(path).unlink(missing_ok=True)
+            total_bytes -= size
+
+    def _path(self, digest: str) -> Path:
+        return self._store_dir / digest
+
+
+def patch_content_store() -> ContentStore:
+    return ContentStore(LocalConfigHandler.patch_contents_dir_path())
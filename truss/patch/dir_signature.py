@@ -1,8 +1,9 @@
 from pathlib import Path
 from typing import Dict, List, Optional
 
-from truss.patch.hash import file_content_hash_str
-from truss.util.path import get_unignored_relative_paths_from_root
+from truss.patch.hash import file_content_hashes
+from truss.patch.hash_cache import file_hash_cache
+from truss.util.path import IgnoreMatcher
 
 
 def directory_content_signature(
@@ -15,13 +16,18 @@ def directory_content_signature(
     A previous signature and the directory can be combined to create
     a patch from the previous state.
 
-    Hash of directories is marked None.
+    Hash of directories is marked None. File content hashes are looked up in
+    the persistent file hash cache first.
     """
-    paths = list(get_unignored_relative_paths_from_root(root, ignore_patterns))
-    paths.sort()
+    walked = sorted(IgnoreMatcher(ignore_patterns).walk(root), key=lambda item: item[0])
+    paths = [path for path, _ in walked]
+    files = [root / path for path, entry in walked if entry.is_file()]
+    with file_hash_cache() as cache:
+        file_hashes = dict(zip(files, cache.file_hashes(files, file_content_hashes)))
 
-    def path_hash(pth: Path):
-        if pth.is_file():
-            return file_content_hash_str(pth)
+    def path_hash(pth: Path) -> Optional[str]:
+        if pth in file_hashes:
+            return file_hashes[pth].hex()
+        return None
 
     return {str(path): path_hash(root / path) for path in paths}
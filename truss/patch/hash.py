@@ -1,8 +1,19 @@
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, List, Optional
+from typing import Any, List, Optional, Sequence
 
 from blake3 import blake3
-from truss.util.path import get_unignored_relative_paths_from_root
+from truss.patch.hash_cache import file_hash_cache
+from truss.util.path import IgnoreMatcher
+
+# Files at least this large are memory-mapped and hashed with multiple
+# threads, smaller ones are read in chunks.
+MMAP_THRESHOLD_BYTES = 4 * 1024 * 1024
+READ_CHUNK_BYTES = 128 * 1024
+# Hashing is mostly IO and blake3, which both release the GIL.
+MAX_HASHING_THREADS = min(32, (os.cpu_count() or 1) * 2)
 
 
 def directory_content_hash(
@@ -17,15 +28,20 @@ def directory_content_hash(
 
     Also, note that name of the root directory is not taken into account, only the contents
     underneath. The (root) Directory will have the same hash, even if renamed.
+
+    File content hashes are looked up in the persistent file hash cache first.
     """
     hasher = blake3()
-    paths = list(get_unignored_relative_paths_from_root(root, ignore_patterns))
-    paths.sort()
+    walked = sorted(IgnoreMatcher(ignore_patterns).walk(root), key=lambda item: item[0])
+    paths = [path for path, _ in walked]
+    files = [root / path for path, entry in walked if entry.is_file()]
+    with file_hash_cache() as cache:
+        file_hashes = dict(zip(files, cache.file_hashes(files, file_content_hashes)))
     for path in paths:
         hasher.update(str_hash(str(path)))
         absolute_path = root / path
-        if absolute_path.is_file():
-            hasher.update(file_content_hash(absolute_path))
+        if absolute_path in file_hashes:
+            hasher.update(file_hashes[absolute_path])
     return hasher.hexdigest()
 
 
@@ -36,6 +52,19 @@ def file_content_hash(file: Path) -> bytes:
     return _file_content_hash_loaded_hasher(file).digest()
 
 
+def file_content_hashes(files: Sequence[Path]) -> List[bytes]:
+    """Calculate blake3 hashes of the content of many files, concurrently.
+    Returns: binary hashes of content, in the same order as `files`
+    """
+    if len(files) <= 1:
+        return [file_content_hash(file) for file in files]
+    with ThreadPoolExecutor(
+        max_workers=min(MAX_HASHING_THREADS, len(files)),
+        thread_name_prefix="truss-hash",
+    ) as executor:
+        return list(executor.map(file_content_hash, files))
+
+
 def file_content_hash_str(file: Path) -> str:
     """Calculate blake3 hash of file content.
 
@@ -45,17 +74,30 @@ def file_content_hash_str(file: Path) -> str:
 
 
 def _file_content_hash_loaded_hasher(file: Path) -> Any:
-    hasher = blake3()
-    buffer = bytearray(128 * 1024)
-    mem_view = memoryview(buffer)
     with file.open("rb") as f:
-        done = False
-        while not done:
-            n = f.readinto(mem_view)
-            if n > 0:
-                hasher.update(mem_view[:n])
-            else:
-                done = True
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD_BYTES:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    hasher = blake3(max_threads=blake3.AUTO)
+                    hasher.update(mapped)
+                    return hasher
+            except (OSError, ValueError):
+                # Not mappable, e.g. a special file, read it in chunks.
+                f.seek(0)
+        return _read_into_hasher(f, blake3())
+
+
+def _read_into_hasher(f: Any, hasher: Any) -> Any:
+    buffer = bytearray(READ_CHUNK_BYTES)
+    mem_view = memoryview(buffer)
+    done = False
+    while not done:
+        n = f.readinto(mem_view)
+        if n > 0:
+            hasher.update(mem_view[:n])
+        else:
+            done = True
     return hasher
 
 
@@ -0,0 +1,180 @@
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+from truss.local.local_config_handler import LocalConfigHandler
+
+logger = logging.getLogger(__name__)
+
+# Set to disable the persistent cache, e.g. on filesystems whose stat data
+# can't be trusted to change when file content does.
+DISABLE_HASH_CACHE_ENV_VAR = "TRUSS_DISABLE_HASH_CACHE"
+DEFAULT_MAX_ENTRIES = 200_000
+# Files modified this recently are not cached: a write within the mtime
+# granularity of the filesystem could change the content but not the stat.
+RACY_MTIME_WINDOW_NS = 2_000_000_000
+SQLITE_TIMEOUT_SECS = 1.0
+
+_StatKey = Tuple[int, int, int, int]
+
+
+class FileHashCache:
+    """Persistent cache of file content hashes, keyed by file stat data.
+
+    A file's cached hash is used as long as its path, size, mtime, inode and
+    device are unchanged, so hashing a directory in which few files changed
+    mostly costs a stat per file. Only files whose mtime is older than
+    `RACY_MTIME_WINDOW_NS` are cached, and files with missing stat data
+    are never cached.
+
+    Without a `db_path`, or if the cache database can't be used, e.g. because
+    the home directory is read-only, hashes are computed without a cache.
+    The least recently used entries are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, db_path: Optional[Path], max_entries: int = DEFAULT_MAX_ENTRIES):
+        self._max_entries = max_entries
+        self._conn: Optional[sqlite3.Connection] = None
+        self._hits: List[Tuple[int, str]] = []
+        self._updates: List[Tuple[str, int, int, int, int, bytes, int]] = []
+        if db_path is None:
+            return
+        try:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(db_path), timeout=SQLITE_TIMEOUT_SECS)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS file_hashes ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, "
+                "inode INTEGER, device INTEGER, digest BLOB, last_used INTEGER)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS file_hashes_last_used "
+                "ON file_hashes (last_used)"
+            )
+        except (OSError, sqlite3.Error) as e:
+            logger.debug(f"Not using file hash cache at {db_path}: {e}")
+            self._close_connection()
+
+    def file_hashes(
+        self,
+        files: Sequence[Path],
+        compute: Callable[[Sequence[Path]], List[bytes]],
+    ) -> List[bytes]:
+        """
+        Hashes of `files`, from the cache for those whose stat data is
+        unchanged. The others are hashed with a single call to `compute`.
+        """
+        if self._conn is None:
+            return compute(files)
+
+        digests: List[Optional[bytes]] = [None] * len(files)
+        misses: List[Tuple[int, str, Optional[_StatKey]]] = []
+        for index, file in enumerate(files):
+            path = os.path.abspath(file)
+            stat_key = _stat_key(file)
+            if stat_key is not None:
+                row = self._query(
+                    "SELECT size, mtime_ns, inode, device, digest FROM file_hashes "
+                    "WHERE path = ?",
+                    (path,),
+                )
+                if row is not None and tuple(row[:4]) == stat_key:
+                    self._hits.append((time.time_ns(), path))
+                    digests[index] = row[4]
+                    continue
+            misses.append((index, path, stat_key))
+
+        computed = compute([files[index] for index, _, _ in misses])
+        for (index, path, stat_key), digest in zip(misses, computed):
+            digests[index] = digest
+            # The stat is taken before reading the content, so if the file
+            # was written to in between, the next stat won't match.
+            if stat_key is not None and _is_cacheable(stat_key):
+                self._updates.append((path, *stat_key, digest, time.time_ns()))
+        return digests  # type: ignore[return-value]
+
+    def file_hash(self, file: Path, compute: Callable[[Path], bytes]) -> bytes:
+        """Hash of `file`, from the cache if its stat data is unchanged."""
+        return self.file_hashes([file], lambda files: [compute(f) for f in files])[0]
+
+    def flush(self):
+        """Persist the hashes computed and used since the last flush."""
+        if self._conn is None:
+            return
+        try:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    self._updates,
+                )
+                self._conn.executemany(
+                    "UPDATE file_hashes SET last_used = ? WHERE path = ?",
+                    self._hits,
+                )
+                self._evict()
+        except sqlite3.Error as e:
+            logger.debug(f"Failed to update file hash cache: {e}")
+        self._hits = []
+        self._updates = []
+
+    def close(self):
+        self.flush()
+        self._close_connection()
+
+    def _evict(self):
+        (num_entries,) = self._conn.execute(  # type: ignore[union-attr]
+            "SELECT COUNT(*) FROM file_hashes"
+        ).fetchone()
+        if num_entries > self._max_entries:
+            self._conn.execute(  # type: ignore[union-attr]
+                "DELETE FROM file_hashes WHERE path IN ("
+                "SELECT path FROM file_hashes ORDER BY last_used LIMIT ?)",
+                (num_entries - self._max_entries,),
+            )
+
+    def _query(self, sql: str, params: tuple) -> Optional[tuple]:
+        # The connection is closed once it failed, e.g. partway through
+        # looking up many files.
+        if self._conn is None:
+            return None
+        try:
+            return self._conn.execute(sql, params).fetchone()
+        except sqlite3.Error as e:
+            logger.debug(f"Not using file hash cache: {e}")
+            self._close_connection()
+            return None
+
+    def _close_connection(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _stat_key(file: Path) -> Optional[_StatKey]:
+    stat = file.stat()
+    if stat.st_mtime_ns <= 0 or stat.st_ino == 0:
+        # Some filesystems don't report these, they can't tell files apart.
+        return None
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino, stat.st_dev
+
+
+def _is_cacheable(stat_key: _StatKey) -> bool:
+    _, mtime_ns, _, _ = stat_key
+    return time.time_ns() - mtime_ns > RACY_MTIME_WINDOW_NS
+
+
+@contextmanager
+def file_hash_cache() -> Iterator[FileHashCache]:
+    """The persistent file hash cache under ~/.truss, flushed on exit."""
+    if os.environ.get(DISABLE_HASH_CACHE_ENV_VAR):
+        cache = FileHashCache(None)
+    else:
+        cache = FileHashCache(LocalConfigHandler.hash_cache_path())
+    try:
+        yield cache
+    finally:
+        cache.close()
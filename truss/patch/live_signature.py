@@ -0,0 +1,228 @@
+import os
+from bisect import bisect_left, insort
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from blake3 import blake3
+from truss.patch.calc_patch import calc_truss_patch
+from truss.patch.hash import file_content_hashes, str_hash
+from truss.patch.hash_cache import file_hash_cache
+from truss.patch.types import TrussSignature
+from truss.types import PatchDetails
+from truss.util.path import IgnoreMatcher
+
+# Paths are kept sorted by their parts, the order in which `Path`s sort.
+_Key = Tuple[str, ...]
+_StatKey = Tuple[int, int, int]
+
+
+class _Entry:
+    __slots__ = ("path_hash", "digest", "stat_key")
+
+    def __init__(self, path: str):
+        self.path_hash = str_hash(path)
+        # Content hash of files, None for directories.
+        self.digest: Optional[bytes] = None
+        self.stat_key: Optional[_StatKey] = None
+
+
+class LiveTrussSignature:
+    """Signature and content hash of a truss directory, kept in memory.
+
+    The directory is scanned once, after that only the paths passed to
+    `update` are looked at again. `content_hash` and `signature` are the same
+    as `directory_content_hash` and `calc_truss_signature` of the directory,
+    as long as all changes to it are passed to `update`.
+    """
+
+    def __init__(self, truss_dir: Path, ignore_patterns: Optional[List[str]] = None):
+        self._truss_dir = truss_dir
+        self._roots = {os.path.abspath(truss_dir), os.path.realpath(truss_dir)}
+        self._ignore_patterns = ignore_patterns
+        self._matcher = IgnoreMatcher(ignore_patterns)
+        self._entries: Dict[_Key, _Entry] = {}
+        self._keys: List[_Key] = []
+        self._content_hash: Optional[str] = None
+        self._add_tree(None, rehash=set())
+
+    def update(self, paths: Iterable[Path]) -> Set[str]:
+        """
+        Update the signature for paths that were added, modified or removed.
+        Any number of changes to the same path can be passed at once.
+
+        Returns: paths relative to the truss directory of the passed paths
+            that are in it.
+        """
+        changed: Set[str] = set()
+        for path in paths:
+            relative_path = self._relative_path(path)
+            if relative_path is not None:
+                changed.add(relative_path)
+
+        rehash: Set[_Key] = set()
+        for relative_path in sorted(changed):
+            key = tuple(relative_path.split("/"))
+            rehash.add(key)
+            if not os.path.lexists(self._truss_dir / relative_path):
+                self._remove_tree(key)
+            elif os.path.isdir(self._truss_dir / relative_path) and not os.path.islink(
+                self._truss_dir / relative_path
+            ):
+                self._add_parents(key)
+                self._add_tree(key, rehash)
+            else:
+                self._add_parents(key)
+                self._remove_tree(key)
+                if not self._matcher.is_ignored(relative_path):
+                    entry = self._add(key)
+                    self._stat(entry, self._truss_dir / relative_path)
+        self._hash_files(rehash)
+        self._content_hash = None
+        return changed
+
+    def content_hash(self) -> str:
+        if self._content_hash is None:
+            chunks: List[bytes] = []
+            for key in self._keys:
+                entry = self._entries[key]
+                chunks.append(entry.path_hash)
+                if entry.digest is not None:
+                    chunks.append(entry.digest)
+            hasher = blake3()
+            hasher.update(b"".join(chunks))
+            self._content_hash = hasher.hexdigest()
+        return self._content_hash
+
+    def signature(self) -> TrussSignature:
+        content_hashes_by_path = {
+            "/".join(key): _hex(self._entries[key].digest) for key in self._keys
+        }
+        with (self._truss_dir / "config.yaml").open("r") as config_file:
+            config = config_file.read()
+        return TrussSignature(
+            content_hashes_by_path=content_hashes_by_path,
+            config=config,
+        )
+
+    def calc_patch(
+        self, prev_truss_hash: str, prev_signature: TrussSignature
+    ) -> Optional[PatchDetails]:
+        """Calculates patch of the truss from a previous state.
+
+        Like `TrussHandle.calc_patch`, but only the changed files are read.
+        """
+        next_signature = self.signature()
+        patch_ops = calc_truss_patch(
+            self._truss_dir,
+            prev_signature,
+            self._ignore_patterns,
+            content_hashes_by_path=next_signature.content_hashes_by_path,
+        )
+        if patch_ops is None:
+            return None
+
+        return PatchDetails(
+            prev_signature=prev_signature,
+            prev_hash=prev_truss_hash,
+            next_hash=self.content_hash(),
+            next_signature=next_signature,
+            patch_ops=patch_ops,
+        )
+
+    def _relative_path(self, path: Path) -> Optional[str]:
+        absolute_path = os.path.abspath(path)
+        for root in self._roots:
+            relative_path = os.path.relpath(absolute_path, root)
+            if relative_path != "." and not relative_path.startswith(".."):
+                return Path(relative_path).as_posix()
+        return None
+
+    def _add(self, key: _Key) -> _Entry:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = _Entry("/".join(key))
+            self._entries[key] = entry
+            insort(self._keys, key)
+        return entry
+
+    def _add_parents(self, key: _Key):
+        for end in range(1, len(key)):
+            parent = key[:end]
+            if parent not in self._entries and not self._matcher.is_ignored(
+                "/".join(parent)
+            ):
+                self._add(parent)
+
+    def _add_tree(self, key: Optional[_Key], rehash: Set[_Key]):
+        """Add the directory at `key`, or the whole truss, and its contents."""
+        start = None
+        if key is not None:
+            start = Path(*key)
+            if not self._matcher.is_ignored("/".join(key)):
+                entry = self._add(key)
+                entry.digest = None
+                entry.stat_key = None
+        previous = self._subtree(key)
+        walked: Set[_Key] = set()
+        for relative_path, dir_entry in self._matcher.walk(self._truss_dir, start):
+            child_key = relative_path.parts
+            walked.add(child_key)
+            old_entry = previous.get(child_key)
+            entry = self._add(child_key)
+            if not dir_entry.is_file():
+                entry.digest = None
+                entry.stat_key = None
+                continue
+            stat = dir_entry.stat()
+            stat_key = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+            if old_entry is None or old_entry.stat_key != stat_key:
+                rehash.add(child_key)
+            entry.stat_key = stat_key
+        for child_key in previous:
+            if child_key not in walked and child_key != key:
+                self._remove(child_key)
+        if key is None:
+            # The initial scan, use the persistent file hash cache.
+            keys = list(rehash)
+            files = [self._truss_dir / "/".join(k) for k in keys]
+            with file_hash_cache() as cache:
+                digests = cache.file_hashes(files, file_content_hashes)
+            for k, digest in zip(keys, digests):
+                self._entries[k].digest = digest
+            rehash.clear()
+
+    def _subtree(self, key: Optional[_Key]) -> Dict[_Key, _Entry]:
+        if key is None:
+            return dict(self._entries)
+        subtree = {}
+        index = bisect_left(self._keys, key)
+        while index < len(self._keys) and self._keys[index][: len(key)] == key:
+            subtree[self._keys[index]] = self._entries[self._keys[index]]
+            index += 1
+        return subtree
+
+    def _remove_tree(self, key: _Key):
+        for child_key in self._subtree(key):
+            self._remove(child_key)
+
+    def _remove(self, key: _Key):
+        del self._entries[key]
+        del self._keys[bisect_left(self._keys, key)]
+
+    def _stat(self, entry: _Entry, path: Path):
+        if path.is_file():
+            stat = path.stat()
+            entry.stat_key = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        else:
+            entry.stat_key = None
+            entry.digest = None
+
+    def _hash_files(self, keys: Set[_Key]):
+        files = [k for k in keys if k in self._entries and self._entries[k].stat_key]
+        digests = file_content_hashes([self._truss_dir / "/".join(k) for k in files])
+        for k, digest in zip(files, digests):
+            self._entries[k].digest = digest
+
+
+def _hex(digest: Optional[bytes]) -> Optional[str]:
+    return digest.hex() if digest is not None else None
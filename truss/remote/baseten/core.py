@@ -1,11 +1,24 @@
 import logging
+import os
+import posixpath
+from pathlib import Path
 from typing import IO, List, Optional, Tuple
 
+import boto3
 import truss
 from truss.remote.baseten.api import BasetenApi
 from truss.remote.baseten.error import ApiError
-from truss.remote.baseten.utils.tar import create_tar_with_progress_bar
-from truss.remote.baseten.utils.transfer import multipart_upload_boto3
+from truss.remote.baseten.utils.manifest import build_manifest, upload_manifest
+from truss.remote.baseten.utils.tar import (
+    create_tar_with_progress_bar,
+    write_tar_with_progress_bar,
+)
+from truss.remote.baseten.utils.transfer import (
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_PART_SIZE,
+    MultipartUploadWriter,
+    multipart_upload_boto3,
+)
 from truss.truss_handle import TrussHandle
 from truss.util.path import load_trussignore_patterns
 
@@ -15,6 +28,10 @@ logger = logging.getLogger(__name__)
 DEPLOYING_STATUSES = ["BUILDING", "DEPLOYING", "LOADING_MODEL", "UPDATING"]
 ACTIVE_STATUS = "ACTIVE"
 
+UPLOAD_PART_SIZE_MB_ENV_VAR = "TRUSS_UPLOAD_PART_SIZE_MB"
+UPLOAD_CONCURRENCY_ENV_VAR = "TRUSS_UPLOAD_CONCURRENCY"
+BLOBS_DIR_NAME = "blobs"
+
 
 class ModelIdentifier:
     value: str
@@ -118,14 +135,7 @@ def archive_truss(truss_handle: TrussHandle) -> IO:
         A file-like object containing the tar file
     """
     truss_dir = truss_handle._spec.truss_dir
-    ignore_patterns = []
-
-    # check for a truss_ignore file and read the ignore patterns if it exists
-    truss_ignore_file = truss_dir / ".truss_ignore"
-    if truss_ignore_file.exists():
-        ignore_patterns = load_trussignore_patterns(truss_ignore_file=truss_ignore_file)
-    else:
-        ignore_patterns = load_trussignore_patterns()
+    ignore_patterns = _archive_ignore_patterns(truss_dir)
 
     try:
         temp_file = create_tar_with_progress_bar(truss_dir, ignore_patterns)
@@ -158,6 +168,113 @@ def upload_truss(api: BasetenApi, serialize_file: IO) -> str:
     return s3_key
 
 
+def archive_and_upload_truss(
+    api: BasetenApi,
+    truss_handle: TrussHandle,
+    part_size: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+) -> str:
+    """
+    Archive a TrussHandle and upload it to the Baseten remote, as a stream.
+
+    Compressed parts of the archive are uploaded while the rest of the truss
+    is read and compressed, without writing the archive to disk.
+
+    Args:
+        api: BasetenApi instance
+        truss_handle: TrussHandle to archive
+        part_size: Size of uploaded parts in bytes, defaults to
+            $TRUSS_UPLOAD_PART_SIZE_MB or 16 MiB
+        max_concurrency: Number of parts uploaded at once, defaults to
+            $TRUSS_UPLOAD_CONCURRENCY or 4
+
+    Returns:
+        The S3 key of the uploaded file
+    """
+    if part_size is None:
+        part_size_mb = os.environ.get(UPLOAD_PART_SIZE_MB_ENV_VAR)
+        part_size = (
+            int(part_size_mb) * 1024 * 1024 if part_size_mb else DEFAULT_PART_SIZE
+        )
+    if max_concurrency is None:
+        max_concurrency = int(
+            os.environ.get(UPLOAD_CONCURRENCY_ENV_VAR, DEFAULT_MAX_CONCURRENCY)
+        )
+
+    truss_dir = truss_handle._spec.truss_dir
+    ignore_patterns = _archive_ignore_patterns(truss_dir)
+    temp_credentials_s3_upload = api.model_s3_upload_credentials()
+    s3_key = temp_credentials_s3_upload.pop("s3_key")
+    s3_bucket = temp_credentials_s3_upload.pop("s3_bucket")
+    s3_client = boto3.client("s3", **temp_credentials_s3_upload)
+    with MultipartUploadWriter(
+        s3_client,
+        s3_bucket,
+        s3_key,
+        part_size=part_size,
+        max_concurrency=max_concurrency,
+    ) as upload_writer:
+        write_tar_with_progress_bar(truss_dir, upload_writer, ignore_patterns)
+    return s3_key
+
+
+def upload_truss_content_addressed(
+    api: BasetenApi,
+    truss_handle: TrussHandle,
+    max_concurrency: Optional[int] = None,
+) -> str:
+    """
+    Upload a TrussHandle to the Baseten remote as a manifest of its files,
+    uploading only the file contents the remote doesn't have yet.
+
+    File contents are uploaded as blobs named by their digest, next to the
+    manifest. Digests of blobs already pushed are cached locally.
+
+    Not used by `truss push` yet: the remote can't build a truss from a
+    manifest, it needs the archive uploaded by `archive_and_upload_truss`.
+
+    Args:
+        api: BasetenApi instance
+        truss_handle: TrussHandle to upload
+        max_concurrency: Number of blobs uploaded at once, defaults to
+            $TRUSS_UPLOAD_CONCURRENCY or 4
+
+    Returns:
+        The S3 key of the uploaded manifest
+    """
+    if max_concurrency is None:
+        max_concurrency = int(
+            os.environ.get(UPLOAD_CONCURRENCY_ENV_VAR, DEFAULT_MAX_CONCURRENCY)
+        )
+
+    truss_dir = truss_handle._spec.truss_dir
+    temp_credentials_s3_upload = api.model_s3_upload_credentials()
+    s3_key = temp_credentials_s3_upload.pop("s3_key")
+    s3_bucket = temp_credentials_s3_upload.pop("s3_bucket")
+    s3_client = boto3.client("s3", **temp_credentials_s3_upload)
+    manifest = build_manifest(
+        truss_dir,
+        posixpath.join(posixpath.dirname(s3_key), BLOBS_DIR_NAME),
+        _archive_ignore_patterns(truss_dir),
+    )
+    uploaded = upload_manifest(
+        s3_client, s3_bucket, s3_key, truss_dir, manifest, max_concurrency
+    )
+    logger.info(
+        f"Uploaded {len(uploaded)} of {len(manifest.files)} files, "
+        "the others were already pushed."
+    )
+    return s3_key
+
+
+def _archive_ignore_patterns(truss_dir: Path) -> List[str]:
+    # check for a truss_ignore file and read the ignore patterns if it exists
+    truss_ignore_file = truss_dir / ".truss_ignore"
+    if truss_ignore_file.exists():
+        return load_trussignore_patterns(truss_ignore_file=truss_ignore_file)
+    return load_trussignore_patterns()
+
+
 def create_truss_service(
     api: BasetenApi,
     model_name: str,
@@ -1,5 +1,7 @@
+import json
 import logging
 import re
+from dataclasses import dataclass
 from pathlib import Path
 from typing import List, Optional, Tuple
 
@@ -7,7 +9,9 @@ import click
 import rich
 import yaml
 from requests import ReadTimeout
-from truss.local.local_config_handler import LocalConfigHandler
+from truss.constants import CONFIG_FILE
+from truss.patch.live_signature import LiveTrussSignature
+from truss.patch.types import TrussSignature
 from truss.remote.baseten.api import BasetenApi
 from truss.remote.baseten.auth import AuthService
 from truss.remote.baseten.core import (
@@ -15,14 +19,13 @@ from truss.remote.baseten.core import (
     ModelIdentifier,
     ModelName,
     ModelVersionId,
-    archive_truss,
+    archive_and_upload_truss,
     create_truss_service,
     exists_model,
     get_dev_version,
     get_dev_version_from_versions,
     get_model_versions,
     get_prod_version_from_versions,
-    upload_truss,
 )
 from truss.remote.baseten.error import ApiError
 from truss.remote.baseten.service import BasetenService
@@ -30,9 +33,14 @@ from truss.remote.baseten.utils.transfer import base64_encoded_json_str
 from truss.remote.truss_remote import TrussRemote
 from truss.truss_config import ModelServer
 from truss.truss_handle import TrussHandle
-from truss.util.path import is_ignored, load_trussignore_patterns
+from truss.util.path import IgnoreMatcher, load_trussignore_patterns
 from watchfiles import watch
 
+# Changes to a watched truss are grouped until none are seen for WATCH_STEP_MS,
+# for at most WATCH_DEBOUNCE_MS.
+WATCH_STEP_MS = 100
+WATCH_DEBOUNCE_MS = 3000
+
 
 class BasetenRemote(TrussRemote):
     def __init__(self, remote_url: str, api_key: str, **kwargs):
@@ -88,8 +96,7 @@ class BasetenRemote(TrussRemote):
             gathered_truss._spec._config.to_dict()
         )
 
-        temp_file = archive_truss(gathered_truss)
-        s3_key = upload_truss(self._api, temp_file)
+        s3_key = archive_and_upload_truss(self._api, gathered_truss)
 
         model_id, model_version_id = create_truss_service(
             api=self._api,
@@ -215,45 +222,82 @@ class BasetenRemote(TrussRemote):
 
         watch_path = Path(target_directory)
         truss_ignore_patterns = load_trussignore_patterns()
+        ignore_matcher = IgnoreMatcher(truss_ignore_patterns)
 
         def watch_filter(_, path):
-            return not is_ignored(
-                Path(path),
-                truss_ignore_patterns,
-            )
+            return not ignore_matcher.is_ignored(Path(path))
 
         # disable watchfiles logger
         logging.getLogger("watchfiles.main").disabled = True
 
         rich.print(f"🚰 Attempting to sync truss at '{watch_path}' with remote")
-        self.patch(watch_path, truss_ignore_patterns)
+        watched_truss = self.patch(watch_path, truss_ignore_patterns)
 
         rich.print(f"👀 Watching for changes to truss at '{watch_path}' ...")
-        for _ in watch(watch_path, watch_filter=watch_filter, raise_interrupt=False):
-            self.patch(watch_path, truss_ignore_patterns)
+        # Bursts of changes, e.g. from saving many files or switching branches,
+        # are grouped until no change is seen for `step` ms and sent as one
+        # patch. Changes made while a patch is sent make up the next one.
+        for changes in watch(
+            watch_path,
+            watch_filter=watch_filter,
+            raise_interrupt=False,
+            debounce=WATCH_DEBOUNCE_MS,
+            step=WATCH_STEP_MS,
+        ):
+            if watched_truss is not None:
+                changed_paths = watched_truss.signature.update(
+                    Path(path) for _, path in changes
+                )
+                if CONFIG_FILE in changed_paths:
+                    # Config changes can change what's ignored, start over.
+                    watched_truss = None
+            watched_truss = self.patch(watch_path, truss_ignore_patterns, watched_truss)
 
     def patch(
         self,
         watch_path: Path,
         truss_ignore_patterns: List[str],
-    ) -> None:
+        watched_truss: Optional["_WatchedTruss"] = None,
+    ) -> Optional["_WatchedTruss"]:
+        """Patch the development deployment with local changes to the truss.
+
+        Returns the watched truss, with its live signature, to pass to the
+        next call after updating it with the changes since. Without one, the
+        truss is read and its signature calculated from scratch. Returns None
+        if the truss can't be read.
+        """
         from truss.cli.console import console, error_console
 
-        try:
-            truss_handle = TrussHandle(watch_path)
-        except yaml.parser.ParserError:
-            error_console.print("Unable to parse config file")
-            return
-        except ValueError:
-            error_console.print(f"Error when reading truss from directory {watch_path}")
-            return
+        if watched_truss is None:
+            try:
+                truss_handle = TrussHandle(watch_path)
+            except yaml.parser.ParserError:
+                error_console.print("Unable to parse config file")
+                return None
+            except ValueError:
+                error_console.print(
+                    f"Error when reading truss from directory {watch_path}"
+                )
+                return None
+            watched_truss = _WatchedTruss(
+                truss_handle,
+                LiveTrussSignature(
+                    watch_path,
+                    truss_ignore_patterns + truss_handle.spec.hash_ignore_patterns,
+                ),
+            )
+        truss_handle = watched_truss.handle
+        if watched_truss.signature.content_hash() == watched_truss.synced_hash:
+            console.print("No changes observed, skipping patching")
+            return watched_truss
+
         model_name = truss_handle.spec.config.model_name
         dev_version = get_dev_version(self._api, model_name)  # type: ignore
         if not dev_version:
             error_console.print(
                 f"No development deployment found with model name: {model_name}"
             )
-            return
+            return watched_truss
         truss_hash = dev_version.get("truss_hash", None)
         truss_signature = dev_version.get("truss_signature", None)
         if not (truss_hash and truss_signature):
@@ -262,20 +306,23 @@ class BasetenRemote(TrussRemote):
                 "Ensure that there exists a running remote deployment before "
                 "attempting to watch for changes"
             )
-            return
-        LocalConfigHandler.add_signature(truss_hash, truss_signature)
+            return watched_truss
         try:
-            patch_request = truss_handle.calc_patch(truss_hash, truss_ignore_patterns)
+            patch_request = watched_truss.signature.calc_patch(
+                truss_hash, TrussSignature.from_dict(json.loads(truss_signature))
+            )
         except Exception:
             error_console.print("Failed to calculate patch, bailing on patching")
-            return
+            return watched_truss
         if patch_request:
+            if patch_request.prev_hash == patch_request.next_hash:
+                watched_truss.synced_hash = patch_request.next_hash
             if (
                 patch_request.prev_hash == patch_request.next_hash
                 or len(patch_request.patch_ops) == 0
             ):
                 console.print("No changes observed, skipping patching")
-                return
+                return watched_truss
             try:
                 with console.status("Applying patch..."):
                     resp = self._api.patch_draft_truss(model_name, patch_request)
@@ -284,12 +331,12 @@ class BasetenRemote(TrussRemote):
                     "Read Timeout when attempting to connect to remote. "
                     "Bailing on patching"
                 )
-                return
+                return watched_truss
             except Exception:
                 error_console.print(
                     "Failed to patch draft deployment, bailing on patching"
                 )
-                return
+                return watched_truss
             if not resp["succeeded"]:
                 needs_full_deploy = resp.get("needs_full_deploy", None)
                 if needs_full_deploy:
@@ -303,6 +350,7 @@ class BasetenRemote(TrussRemote):
                         "Model left in original state"
                     )
             else:
+                watched_truss.synced_hash = patch_request.next_hash
                 console.print(
                     resp.get(
                         "success_message",
@@ -310,3 +358,12 @@ class BasetenRemote(TrussRemote):
                     ),
                     style="green",
                 )
+        return watched_truss
+
+
+@dataclass
+class _WatchedTruss:
+    handle: TrussHandle
+    signature: LiveTrussSignature
+    # Hash of the truss when it was last synced with the remote.
+    synced_hash: Optional[str] = None
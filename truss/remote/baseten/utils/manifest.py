@@ -0,0 +1,249 @@
+import json
+import logging
+import posixpath
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from botocore.exceptions import ClientError
+from rich.progress import Progress
+from truss.local.local_config_handler import LocalConfigHandler
+from truss.patch.hash import file_content_hashes
+from truss.patch.hash_cache import file_hash_cache
+from truss.remote.baseten.error import Error
+from truss.util.path import IgnoreMatcher
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+DEFAULT_MAX_CONCURRENCY = 4
+
+
+@dataclass
+class ManifestEntry:
+    path: str  # Relative to the truss directory, posix style
+    digest: str  # blake3 hex digest of the content
+    size: int
+    mode: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "digest": self.digest,
+            "size": self.size,
+            "mode": self.mode,
+        }
+
+    @staticmethod
+    def from_dict(entry_dict: Dict[str, Any]) -> "ManifestEntry":
+        return ManifestEntry(
+            path=entry_dict["path"],
+            digest=entry_dict["digest"],
+            size=entry_dict["size"],
+            mode=entry_dict["mode"],
+        )
+
+
+@dataclass
+class TrussManifest:
+    """Layout of a truss: its files and the digests of their contents.
+
+    Contents are stored separately, as blobs named by their digest under
+    `blob_prefix`, so that contents shared with earlier pushes are
+    uploaded only once.
+    """
+
+    blob_prefix: str
+    files: List[ManifestEntry]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": MANIFEST_VERSION,
+            "blob_prefix": self.blob_prefix,
+            "files": [entry.to_dict() for entry in self.files],
+        }
+
+    @staticmethod
+    def from_dict(manifest_dict: Dict[str, Any]) -> "TrussManifest":
+        return TrussManifest(
+            blob_prefix=manifest_dict["blob_prefix"],
+            files=[ManifestEntry.from_dict(f) for f in manifest_dict["files"]],
+        )
+
+    def blob_key(self, digest: str) -> str:
+        return posixpath.join(self.blob_prefix, digest)
+
+
+def build_manifest(
+    truss_dir: Path, blob_prefix: str, ignore_patterns: List[str] = []
+) -> TrussManifest:
+    """Manifest of the files of `truss_dir` that aren't ignored."""
+    relative_paths = []
+    stats = []
+    for relative_path, entry in IgnoreMatcher(ignore_patterns).walk(truss_dir):
+        if entry.is_file():
+            relative_paths.append(relative_path)
+            stats.append(entry.stat())
+    with file_hash_cache() as cache:
+        digests = cache.file_hashes(
+            [truss_dir / path for path in relative_paths], file_content_hashes
+        )
+    return TrussManifest(
+        blob_prefix=blob_prefix,
+        files=[
+            ManifestEntry(
+                path=path.as_posix(),
+                digest=digest.hex(),
+                size=file_stat.st_size,
+                mode=stat.S_IMODE(file_stat.st_mode),
+            )
+            for path, file_stat, digest in zip(relative_paths, stats, digests)
+        ],
+    )
+
+
+class PushedBlobCache:
+    """Local record of the blobs already pushed to a bucket and prefix.
+
+    Saves checking the remote for each blob on every push.
+    """
+
+    def __init__(self, cache_file: Path):
+        self._cache_file = cache_file
+        self._lock = threading.Lock()
+        self._digests: Set[str] = set()
+        try:
+            self._digests = set(cache_file.read_text().split())
+        except OSError:
+            pass
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._digests
+
+    def add(self, digests: Iterable[str]):
+        with self._lock:
+            new_digests = [d for d in digests if d not in self._digests]
+            if not new_digests:
+                return
+            self._digests.update(new_digests)
+            try:
+                self._cache_file.parent.mkdir(parents=True, exist_ok=True)
+                with self._cache_file.open("a") as cache_file:
+                    cache_file.write("".join(f"{d}\n" for d in new_digests))
+            except OSError as e:
+                logger.debug(f"Unable to update pushed blob cache: {e}")
+
+
+def pushed_blob_cache(bucket_name: str, blob_prefix: str) -> PushedBlobCache:
+    cache_name = f"{bucket_name}/{blob_prefix}".replace("/", "__")
+    return PushedBlobCache(LocalConfigHandler.pushed_blobs_dir_path() / cache_name)
+
+
+def upload_manifest(
+    s3_client: Any,
+    bucket_name: str,
+    key: str,
+    truss_dir: Path,
+    manifest: TrussManifest,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+) -> List[str]:
+    """
+    Upload the blobs of `manifest` the bucket doesn't have yet, then the
+    manifest itself to `key`.
+
+    The files of the blobs to upload are checked to still have the content
+    of the manifest, and to not change while they're uploaded, so that a
+    blob never holds other content than its digest says.
+
+    Raises: Error if a file changed since the manifest was built
+    Returns: digests of the uploaded blobs
+    """
+    cache = pushed_blob_cache(bucket_name, manifest.blob_prefix)
+    files_by_digest = {entry.digest: entry for entry in manifest.files}
+    unknown = [d for d in files_by_digest if d not in cache]
+
+    def blob_exists(digest: str) -> bool:
+        try:
+            s3_client.head_object(Bucket=bucket_name, Key=manifest.blob_key(digest))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return False
+            raise
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        exists = list(executor.map(blob_exists, unknown))
+        cache.add(d for d, e in zip(unknown, exists) if e)
+        missing = [d for d, e in zip(unknown, exists) if not e]
+        stats = _check_unchanged(truss_dir, [files_by_digest[d] for d in missing])
+
+        progress = Progress()
+        task_id = progress.add_task(
+            "[cyan]Uploading...",
+            total=sum(files_by_digest[d].size for d in missing),
+        )
+
+        def upload_blob(digest: str):
+            path = files_by_digest[digest].path
+            blob_key = manifest.blob_key(digest)
+            s3_client.upload_file(
+                str(truss_dir / path),
+                bucket_name,
+                blob_key,
+                Callback=lambda n: progress.update(task_id, advance=n),
+            )
+            if _stat_key(truss_dir / path) != stats[digest]:
+                s3_client.delete_object(Bucket=bucket_name, Key=blob_key)
+                raise _file_changed_error(path)
+            cache.add([digest])
+
+        with progress:
+            list(executor.map(upload_blob, missing))
+
+    s3_client.put_object(
+        Bucket=bucket_name,
+        Key=key,
+        Body=json.dumps(manifest.to_dict()).encode("utf-8"),
+        ContentType="application/json",
+    )
+    return missing
+
+
+_StatKey = Tuple[int, int, int]
+
+
+def _stat_key(file: Path) -> Optional[_StatKey]:
+    try:
+        file_stat = file.stat()
+    except FileNotFoundError:
+        return None
+    return file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino
+
+
+def _check_unchanged(
+    truss_dir: Path, entries: List[ManifestEntry]
+) -> Dict[str, Optional[_StatKey]]:
+    """
+    Checks that the files of `entries` still have their digest, i.e. weren't
+    changed since the manifest was built.
+
+    Returns: stat data of the files by digest, taken before checking them
+    """
+    files = [truss_dir / entry.path for entry in entries]
+    stats = [_stat_key(file) for file in files]
+    for entry, file_stat in zip(entries, stats):
+        if file_stat is None:
+            raise _file_changed_error(entry.path)
+    with file_hash_cache() as cache:
+        digests = cache.file_hashes(files, file_content_hashes)
+    for entry, digest in zip(entries, digests):
+        if digest.hex() != entry.digest:
+            raise _file_changed_error(entry.path)
+    return {entry.digest: file_stat for entry, file_stat in zip(entries, stats)}
+
+
+def _file_changed_error(path: str) -> Error:
+    return Error(f"{path} changed while pushing the truss, please push again")
@@ -1,10 +1,14 @@
+import gzip
 import tarfile
 import tempfile
 from pathlib import Path
 from typing import IO, Any, Callable, List
 
 from rich.progress import Progress
-from truss.util.path import is_ignored
+from truss.util.path import IgnoreMatcher
+
+# Much faster than the default level 9, for slightly larger archives.
+DEFAULT_COMPRESSLEVEL = 3
 
 
 class ReadProgressIndicatorFileHandle:
@@ -26,17 +30,35 @@ class ReadProgressIndicatorFileHandle:
 def create_tar_with_progress_bar(
     source_dir: Path, ignore_patterns: List[str] = [], delete=True
 ):
+    temp_file = tempfile.NamedTemporaryFile(suffix=".tgz", delete=delete)
+    with open(temp_file.name, "wb") as file_obj:
+        write_tar_with_progress_bar(source_dir, file_obj, ignore_patterns)
+    return temp_file
+
+
+def write_tar_with_progress_bar(
+    source_dir: Path,
+    file_obj: IO[bytes],
+    ignore_patterns: List[str] = [],
+    compresslevel: int = DEFAULT_COMPRESSLEVEL,
+):
+    """
+    Write a gzip compressed tar of `source_dir` to `file_obj`, as a stream:
+    `file_obj` only needs to be writable, and gets compressed data as files
+    are read.
+    """
     # Exclude files that match the ignore_patterns
     files_to_include = [
-        f
-        for f in source_dir.rglob("*")
-        if f.is_file() and not is_ignored(f, ignore_patterns, source_dir)
+        source_dir / relative_path
+        for relative_path, entry in IgnoreMatcher(ignore_patterns).walk(source_dir)
+        if entry.is_file()
     ]
 
     total_size = sum(f.stat().st_size for f in files_to_include)
-    temp_file = tempfile.NamedTemporaryFile(suffix=".tgz", delete=delete)
 
-    with tarfile.open(temp_file.name, "w:") as tar:
+    with gzip.GzipFile(
+        fileobj=file_obj, mode="wb", compresslevel=compresslevel, mtime=0
+    ) as gzip_file, tarfile.open(fileobj=gzip_file, mode="w|") as tar:
 
         progress = Progress()
 
@@ -49,12 +71,11 @@ def create_tar_with_progress_bar(
 
             for file_path in files_to_include:
                 arcname = str(file_path.relative_to(source_dir))
-                with file_path.open("rb") as file_obj:
+                with file_path.open("rb") as file_obj_to_add:
                     file_obj_with_progress = ReadProgressIndicatorFileHandle(
-                        file_obj, file_read_progress_callback
+                        file_obj_to_add, file_read_progress_callback
                     )
                     tarinfo = tar.gettarinfo(name=str(file_path), arcname=arcname)
                     tar.addfile(
                         tarinfo=tarinfo, fileobj=file_obj_with_progress  # type: ignore[arg-type]
                     )
-    return temp_file
@@ -1,11 +1,20 @@
 import base64
+import io
 import json
 import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
 
 import boto3
 from boto3.s3.transfer import TransferConfig
 from rich.progress import Progress
 
+# S3 requires all parts but the last one to be at least 5 MiB.
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 16 * 1024 * 1024
+DEFAULT_MAX_CONCURRENCY = 4
+
 
 def base64_encoded_json_str(obj):
     return base64.b64encode(str.encode(json.dumps(obj))).decode("utf-8")
@@ -35,3 +44,156 @@ def multipart_upload_boto3(file_path, bucket_name, key, credentials):
             ),
             Callback=callback,
         )
+
+
+class MultipartUploadWriter(io.RawIOBase):
+    """Writable file object that uploads what is written to it to S3.
+
+    Written bytes are cut into parts of `part_size`, which are uploaded as a
+    multipart upload by `max_concurrency` threads while writing continues.
+    Writes block while that many parts are in flight, so at most
+    `(max_concurrency + 1) * part_size` bytes are held in memory.
+
+    Closing the writer uploads the last part and completes the upload. Used
+    as a context manager, the upload is aborted instead if the block raises.
+    A writer garbage collected without being closed aborts the upload too.
+    """
+
+    def __init__(
+        self,
+        s3_client: Any,
+        bucket_name: str,
+        key: str,
+        part_size: int = DEFAULT_PART_SIZE,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        progress_callback: Optional[Callable[[int], Any]] = None,
+    ):
+        super().__init__()
+        self._s3_client = s3_client
+        self._bucket_name = bucket_name
+        self._key = key
+        self._part_size = part_size
+        self._progress_callback = progress_callback
+        self._buffer = bytearray()
+        self._futures: List[Future] = []
+        self._error: Optional[BaseException] = None
+        # Set before anything can fail, so that closing a writer that failed
+        # to initialize, e.g. when it's garbage collected, has nothing to do.
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._upload_id: Optional[str] = None
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"Part size must be at least {MIN_PART_SIZE} bytes")
+        if max_concurrency < 1:
+            raise ValueError("Upload concurrency must be at least 1")
+        self._in_flight = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="truss-upload"
+        )
+        self._upload_id = s3_client.create_multipart_upload(
+            Bucket=bucket_name, Key=key
+        )["UploadId"]
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._raise_if_failed()
+        self._buffer += data
+        while len(self._buffer) >= self._part_size:
+            part = bytes(self._buffer[: self._part_size])
+            del self._buffer[: self._part_size]
+            self._submit(part)
+        return len(data)
+
+    def close(self):
+        if self.closed:
+            return
+        if self._upload_id is None:
+            self._shutdown_executor()
+            super().close()
+            return
+        try:
+            # An empty upload still needs one, empty, part.
+            if self._buffer or not self._futures:
+                self._submit(bytes(self._buffer))
+                self._buffer = bytearray()
+            parts = [future.result() for future in self._futures]
+            self._s3_client.complete_multipart_upload(
+                Bucket=self._bucket_name,
+                Key=self._key,
+                UploadId=self._upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except BaseException:
+            self.abort()
+            raise
+        finally:
+            self._shutdown_executor()
+            super().close()
+
+    def abort(self):
+        """Abort the upload, discarding uploaded parts."""
+        if self.closed:
+            return
+        for future in self._futures:
+            future.cancel()
+        self._shutdown_executor()
+        try:
+            if self._upload_id is not None:
+                self._s3_client.abort_multipart_upload(
+                    Bucket=self._bucket_name, Key=self._key, UploadId=self._upload_id
+                )
+        finally:
+            super().close()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+    def __del__(self):
+        # Only an explicit close completes the upload. A writer dropped
+        # without one, e.g. mid-write, has likely not been written in full.
+        try:
+            self.abort()
+        except Exception:
+            pass
+        super().__del__()
+
+    def _shutdown_executor(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def _submit(self, part: bytes):
+        part_number = len(self._futures) + 1
+        self._in_flight.acquire()
+        try:
+            future = self._executor.submit(self._upload_part, part_number, part)
+        except BaseException:
+            self._in_flight.release()
+            raise
+        future.add_done_callback(self._part_done)
+        self._futures.append(future)
+
+    def _part_done(self, future: Future):
+        self._in_flight.release()
+        if not future.cancelled() and future.exception() is not None:
+            self._error = future.exception()
+
+    def _upload_part(self, part_number: int, part: bytes) -> Dict[str, Any]:
+        response = self._s3_client.upload_part(
+            Bucket=self._bucket_name,
+            Key=self._key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=part,
+        )
+        if self._progress_callback is not None:
+            self._progress_callback(len(part))
+        return {"ETag": response["ETag"], "PartNumber": part_number}
+
+    def _raise_if_failed(self):
+        # Fail early rather than compressing the rest of the upload for nothing.
+        if self._error is not None:
+            raise self._error
@@ -11,11 +11,16 @@ from fastapi.responses import JSONResponse
 from helpers.errors import ModelLoadFailed, PatchApplicatonError
 from helpers.inference_server_controller import InferenceServerController
 from helpers.inference_server_process_controller import InferenceServerProcessController
+from helpers.inference_server_readiness import InferenceServerReadiness
 from helpers.inference_server_starter import async_inference_server_startup_flow
+from helpers.inference_server_transport import InferenceServerTransport
 from helpers.truss_patch.model_container_patch_applier import ModelContainerPatchApplier
 from shared.logging import setup_logging
 from starlette.datastructures import State
 
+DEFAULT_PROXY_MAX_KEEPALIVE_CONNECTIONS = 8
+DEFAULT_PROXY_MAX_CONNECTIONS = 32
+
 
 async def handle_patch_error(_, exc):
     error_type = _camel_to_snake_case(type(exc).__name__)
@@ -54,16 +59,39 @@ def create_app(base_config: Dict):
     for k, v in base_config.items():
         setattr(app_state, k, v)
 
+    inference_server_uds_path = getattr(app_state, "inference_server_uds_path", None)
     app_state.inference_server_process_controller = InferenceServerProcessController(
         app_state.inference_server_home,
         app_state.inference_server_process_args,
         app_state.inference_server_port,
         app_logger=app_logger,
+        inference_server_uds_path=inference_server_uds_path,
+        inference_server_alternate_port=getattr(
+            app_state, "inference_server_alternate_port", None
+        ),
     )
 
-    limits = httpx.Limits(max_keepalive_connections=8, max_connections=32)
+    limits = httpx.Limits(
+        max_keepalive_connections=getattr(
+            app_state,
+            "proxy_max_keepalive_connections",
+            DEFAULT_PROXY_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+        max_connections=getattr(
+            app_state, "proxy_max_connections", DEFAULT_PROXY_MAX_CONNECTIONS
+        ),
+    )
+    # The inference server also listens on a unix socket if given, which
+    # saves requests the TCP overhead. The transport follows the inference
+    # server when it's swapped.
     app_state.proxy_client = httpx.AsyncClient(
-        base_url=f"http://localhost:{app_state.inference_server_port}", limits=limits
+        base_url=f"http://localhost:{app_state.inference_server_port}",
+        transport=InferenceServerTransport(
+            app_state.inference_server_process_controller, limits
+        ),
+    )
+    app_state.inference_server_readiness = InferenceServerReadiness(
+        app_state.proxy_client, app_state.inference_server_process_controller
     )
 
     pip_path = getattr(app_state, "pip_path", None)
@@ -75,12 +103,16 @@ def create_app(base_config: Dict):
     )
 
     oversee_inference_server = getattr(app_state, "oversee_inference_server", True)
+    blue_green = getattr(app_state, "inference_server_blue_green", False)
+    hot_reload = getattr(app_state, "inference_server_hot_reload", False)
 
     app_state.inference_server_controller = InferenceServerController(
         app_state.inference_server_process_controller,
         patch_applier,
         app_logger,
         oversee_inference_server,
+        blue_green,
+        hot_reload,
     )
 
     async def start_background_inference_startup():
@@ -1,16 +1,33 @@
 import asyncio
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import httpx
 from fastapi import APIRouter
 from fastapi.responses import JSONResponse, StreamingResponse
 from helpers.errors import ModelLoadFailed, ModelNotReady
+from helpers.inference_server_readiness import InferenceServerReadiness
+from helpers.request_body import ReplayableRequestBody
+from helpers.truss_patch.wire_format import (
+    ACCEPT_PATCH_HEADER,
+    PATCH_BINARY_MEDIA_TYPE,
+    PATCH_JSON_MEDIA_TYPE,
+    decode_patch_request,
+)
 from httpx import URL, ConnectError, RemoteProtocolError
+from starlette.background import BackgroundTask
 from starlette.requests import ClientDisconnect, Request
 from starlette.responses import Response
-from tenacity import Retrying, retry_if_exception_type, stop_after_attempt, wait_fixed
 
 INFERENCE_SERVER_START_WAIT_SECS = 60
+HOP_BY_HOP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-connection",
+    "te",
+    "trailer",
+    "transfer-encoding",
+    "upgrade",
+}
 
 
 control_app = APIRouter()
@@ -26,62 +43,68 @@ async def proxy(request: Request):
         request.app.state.inference_server_process_controller
     )
     client: httpx.AsyncClient = request.app.state.proxy_client
+    readiness: InferenceServerReadiness = request.app.state.inference_server_readiness
     url = URL(path=request.url.path, query=request.url.query.encode("utf-8"))
 
     # 2 min connect timeouts, no timeout for requests.
     # We don't want requests to fail due to timeout on the proxy
     timeout = httpx.Timeout(None, connect=2 * 60.0)
-    try:
-        request_body = await request.body()
-    except ClientDisconnect:
-        # If the client disconnects, we don't need to proxy the request
-        return Response(status_code=499)
-
-    inf_serv_req = client.build_request(
-        request.method,
-        url,
-        headers=request.headers.raw,
-        content=request_body,
-        timeout=timeout,
-    )
-
-    # Wait a bit for inference server to start
-    for attempt in Retrying(
-        retry=(
-            retry_if_exception_type(ConnectError)
-            | retry_if_exception_type(ModelNotReady)
-            | retry_if_exception_type(RemoteProtocolError)
-        ),
-        stop=stop_after_attempt(INFERENCE_SERVER_START_WAIT_SECS),
-        wait=wait_fixed(1),
-    ):
-        with attempt:
-            try:
-                if (
-                    inference_server_process_controller.is_inference_server_intentionally_stopped()
-                ):
-                    raise ModelLoadFailed("Model load failed")
-                resp = await client.send(inf_serv_req, stream=True)
-
-                if await _is_model_not_ready(resp):
-                    raise ModelNotReady("Model has started running, but not ready yet.")
-            except (RemoteProtocolError, ConnectError) as exp:
-                # This check is a bit expensive so we don't do it before every request, we
-                # do it only if request fails with connection error. If the inference server
-                # process is running then we continue waiting for it to start (by retrying),
-                # otherwise we bail.
-                if (
-                    inference_server_process_controller.inference_server_ever_started()
-                    and not inference_server_process_controller.is_inference_server_running()
-                ):
-                    error_msg = "It appears your model has stopped running. This often means' \
-                        ' it crashed and may need a fix to get it running again."
-                    return JSONResponse(error_msg, 503)
-                raise exp
+    # The body is streamed to the inference server rather than read up front.
+    request_body: Optional[ReplayableRequestBody] = None
+    if _has_body(request):
+        request_body = ReplayableRequestBody(request.stream())
+
+    # Wait a bit for inference server to start, without blocking the event
+    # loop, and with all waiting requests sharing a single readiness check.
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + INFERENCE_SERVER_START_WAIT_SECS
+    error: Exception
+    while True:
+        await readiness.wait(deadline - loop.time())
+        if (
+            inference_server_process_controller.is_inference_server_intentionally_stopped()
+        ):
+            raise ModelLoadFailed("Model load failed")
+        inf_serv_req = client.build_request(
+            request.method,
+            url,
+            headers=request.headers.raw,
+            content=request_body.stream() if request_body is not None else None,
+            timeout=timeout,
+        )
+        try:
+            resp = await client.send(inf_serv_req, stream=True)
+            if not await _is_model_not_ready(resp):
+                break
+            error = ModelNotReady("Model has started running, but not ready yet.")
+        except (RemoteProtocolError, ConnectError) as exp:
+            # This check is a bit expensive so we don't do it before every request, we
+            # do it only if request fails with connection error. If the inference server
+            # process is running then we continue waiting for it to start (by retrying),
+            # otherwise we bail.
+            if (
+                inference_server_process_controller.inference_server_ever_started()
+                and not inference_server_process_controller.is_inference_server_running()
+            ):
+                error_msg = "It appears your model has stopped running. This often means' \
+                    ' it crashed and may need a fix to get it running again."
+                return JSONResponse(error_msg, 503)
+            error = exp
+        except ClientDisconnect:
+            # If the client disconnects, we don't need to proxy the request
+            return Response(status_code=499)
+        if loop.time() >= deadline:
+            raise error
+        if request_body is not None and not request_body.can_replay():
+            raise error
+        readiness.reset()
 
     if _is_streaming_response(resp):
         return StreamingResponse(
-            resp.aiter_bytes(), media_type="application/octet-stream"
+            resp.aiter_raw(),
+            status_code=resp.status_code,
+            headers=_end_to_end_headers(resp.headers),
+            background=BackgroundTask(resp.aclose),
         )
 
     await resp.aread()
@@ -92,10 +115,22 @@ async def proxy(request: Request):
 control_app.add_route("/v1/{path:path}", proxy, ["GET", "POST"])
 
 
+@control_app.options("/control/patch")
+async def patch_options() -> Response:
+    return Response(
+        headers={
+            ACCEPT_PATCH_HEADER: f"{PATCH_JSON_MEDIA_TYPE}, {PATCH_BINARY_MEDIA_TYPE}"
+        }
+    )
+
+
 @control_app.post("/control/patch")
 async def patch(request: Request) -> Dict[str, str]:
     request.app.state.logger.info("Patch request received.")
-    patch_request = await request.json()
+    if request.headers.get("content-type") == PATCH_BINARY_MEDIA_TYPE:
+        patch_request = decode_patch_request(await request.body())
+    else:
+        patch_request = await request.json()
     loop = asyncio.get_event_loop()
     await loop.run_in_executor(
         None,
@@ -143,6 +178,20 @@ async def _is_model_not_ready(resp) -> bool:
     return False
 
 
+def _has_body(request: Request) -> bool:
+    return "content-length" in request.headers or "transfer-encoding" in request.headers
+
+
+def _end_to_end_headers(headers: httpx.Headers) -> Dict[str, str]:
+    # Headers about the connection to the inference server, rather than about
+    # the response, are left to the control server to set.
+    return {
+        name: value
+        for name, value in headers.items()
+        if name.lower() not in HOP_BY_HOP_HEADERS
+    }
+
+
 def _is_streaming_response(resp) -> bool:
     for header_name, value in resp.headers.items():
         if header_name.lower() == "transfer-encoding" and value.lower() == "chunked":
@@ -36,6 +36,13 @@ class InadmissiblePatch(PatchApplicatonError):
     pass
 
 
+class DeltaBaseMismatch(InadmissiblePatch):
+    """A file delta of the patch was calculated from different file content
+    than the current one. The patch can be sent again with full contents."""
+
+    pass
+
+
 class ModelNotReady(Error):
     """Model has started running, but not ready yet."""
 
@@ -5,6 +5,7 @@ import time
 from typing import Optional
 
 from helpers.errors import (
+    DeltaBaseMismatch,
     InadmissiblePatch,
     PatchFailedRecoverable,
     PatchFailedUnrecoverable,
@@ -22,12 +23,22 @@ class InferenceServerController:
 
     Currently, it only applies locks to various actions and mostly
     delegates to InferenceServerProcessController.
+
+    With `blue_green`, patches and restarts swap in a new inference server
+    while the current one keeps serving, rather than stopping it first, see
+    `InferenceServerProcessController.swap`.
+
+    With `hot_reload`, patches of only model code are picked up by the running
+    inference server, which swaps in the new model code without loading the
+    model again. If it can't, the inference server is restarted as usual.
     """
 
     _process_controller: InferenceServerProcessController
     _patch_applier: ModelContainerPatchApplier
     _app_logger: logging.Logger
     _oversee_inference_server: bool
+    _blue_green: bool
+    _hot_reload: bool
     _inf_env: dict
 
     def __init__(
@@ -36,8 +47,12 @@ class InferenceServerController:
         patch_applier: ModelContainerPatchApplier,
         app_logger: logging.Logger,
         oversee_inference_server: bool = True,
+        blue_green: bool = False,
+        hot_reload: bool = False,
     ):
         self._lock = threading.Lock()
+        self._blue_green = blue_green
+        self._hot_reload = hot_reload
         self._process_controller = process_controller
         self._patch_applier = patch_applier
         self._current_running_hash = os.environ.get("HASH_TRUSS", None)
@@ -46,6 +61,9 @@ class InferenceServerController:
         self._inf_env = (
             os.environ.copy()
         )  # this must be initialized before overseer is started
+        if hot_reload:
+            # For the inference server to serve the endpoint for it.
+            self._inf_env["INFERENCE_SERVER_HOT_RELOAD"] = "true"
         if oversee_inference_server:
             self._inference_server_overseer_thread = threading.Thread(
                 target=self._check_and_recover_inference_server
@@ -85,7 +103,28 @@ class InferenceServerController:
             except (KeyError, ValueError) as exc:
                 raise UnsupportedPatch(str(exc)) from exc
 
-            self._process_controller.stop()
+            # Patches sent in the binary format can have file deltas, these
+            # are checked against the current files before changing anything.
+            try:
+                patches = [
+                    self._patch_applier.resolve_delta(patch)
+                    if getattr(patch.body, "delta", None) is not None
+                    else patch
+                    for patch in patches
+                ]
+            except (OSError, ValueError) as exc:
+                raise DeltaBaseMismatch(str(exc)) from exc
+
+            hot_reload = (
+                self._hot_reload
+                and self._process_controller.is_inference_server_running()
+                and all(patch.type == PatchType.MODEL_CODE for patch in patches)
+            )
+            # When swapping or reloading, the running inference server keeps
+            # serving while patches are applied, it has already loaded its code.
+            keep_serving = self._blue_green or hot_reload
+            if not keep_serving:
+                self._process_controller.stop()
             patches.sort(key=_patch_sort_key_fn)
             try:
                 patches_executed = 0
@@ -98,16 +137,24 @@ class InferenceServerController:
                     # the bad state; with partially applied patch all bets are off.
                     # Correct handling of this scenario is to fallback to full deploy.
                     self._has_partially_applied_patch = True
+                    if keep_serving:
+                        self._process_controller.stop()
                     raise PatchFailedUnrecoverable(str(exc)) from exc
                 # No patches executed, the very first patch failed. We
                 # consider this safe to start inference server back up.
                 # Theoretically, a single patch application may leave
                 # side-effects, but that's not the case with currently
                 # supported patches.
-                self._process_controller.start(self._inf_env)
+                if not keep_serving:
+                    self._process_controller.start(self._inf_env)
                 raise PatchFailedRecoverable(str(exc)) from exc
 
-            self._process_controller.start(self._inf_env)
+            if hot_reload and self._process_controller.hot_reload():
+                self._app_logger.info("Reloaded model code in place")
+            elif keep_serving:
+                self._swap_or_restart()
+            else:
+                self._process_controller.start(self._inf_env)
             self._current_running_hash = req_hash
 
     def truss_hash(self) -> Optional[str]:
@@ -115,6 +162,9 @@ class InferenceServerController:
 
     def restart(self):
         with self._lock:
+            if self._blue_green:
+                self._swap_or_restart()
+                return
             self._process_controller.stop()
             self._process_controller.start(self._inf_env)
 
@@ -131,6 +181,20 @@ class InferenceServerController:
         with self._lock:
             return self._has_partially_applied_patch
 
+    def _swap_or_restart(self):
+        # There's only something to keep serving if the inference server is
+        # running. If the new one didn't get ready, likely the model fails to
+        # load with the new code; restart with it anyway, so that it shows
+        # like it would without swapping.
+        if (
+            self._blue_green
+            and self._process_controller.is_inference_server_running()
+            and self._process_controller.swap(self._inf_env)
+        ):
+            return
+        self._process_controller.stop()
+        self._process_controller.start(self._inf_env)
+
     def _check_and_recover_inference_server(self):
         self._app_logger.info("Inference server overseer thread started")
         while not self._process_controller.is_inference_server_terminated():
@@ -1,19 +1,30 @@
 import logging
 import subprocess
+import threading
 import time
 from pathlib import Path
 from typing import List, Optional
 
+import requests
 from helpers.context_managers import current_directory
 
 INFERENCE_SERVER_FAILED_FILE = Path("~/inference_server_crashed.txt").expanduser()
 TERMINATION_TIMEOUT_SECS = 120.0
 TERMINATION_CHECK_INTERVAL_SECS = 0.5
+# Models can take long to load, a swap waits this long for the new inference
+# server to be ready.
+SWAP_READY_TIMEOUT_SECS = 30 * 60.0
+SWAP_READY_CHECK_INTERVAL_SECS = 0.5
+READINESS_PATH = "/v1/models/model"
+HOT_RELOAD_PATH = "/internal/hot_reload"
+# Includes waiting for requests in flight to finish before swapping the model.
+HOT_RELOAD_TIMEOUT_SECS = 120.0
 
 
 class InferenceServerProcessController:
     _inference_server_process: Optional[subprocess.Popen] = None
     _inference_server_port: int
+    _inference_server_uds_path: Optional[str]
     _inference_server_home: str
     _app_logger: logging.Logger
     _inference_server_process_args: List[str]
@@ -25,10 +36,20 @@ class InferenceServerProcessController:
         inference_server_process_args: List[str],
         inference_server_port: int,
         app_logger: logging.Logger,
+        inference_server_uds_path: Optional[str] = None,
+        inference_server_alternate_port: Optional[int] = None,
     ) -> None:
         self._inference_server_home = inference_server_home
         self._inference_server_process_args = inference_server_process_args
         self._inference_server_port = inference_server_port
+        self._inference_server_uds_path = inference_server_uds_path
+        # Used by the inference server that's swapped in, see `swap`.
+        self._inference_server_alternate_port = (
+            inference_server_alternate_port or inference_server_port + 1
+        )
+        # Which of the two ports, and unix sockets, the current inference
+        # server listens on.
+        self._slot = 0
         self._inference_server_started = False
         self._inference_server_ever_started = False
         self._inference_server_terminated = False
@@ -36,16 +57,104 @@ class InferenceServerProcessController:
         self._app_logger = app_logger
 
     def start(self, inf_env: dict):
+        self._inference_server_process = self._spawn(inf_env, self._slot)
+        self._inference_server_started = True
+        self._inference_server_ever_started = True
+        self._logged_unrecoverable_since_last_restart = False
+
+    def swap(self, inf_env: dict) -> bool:
+        """Replace the inference server without a gap in serving.
+
+        Starts a new inference server on the other port, and unix socket,
+        while the current one keeps serving. Once the new one is ready,
+        requests go to it, and the current one is stopped after finishing the
+        requests it has. Needs room for two copies of the model for a while.
+
+        Returns: False if the new inference server didn't get ready, in which
+            case the current one is left as is.
+        """
+        new_slot = 1 - self._slot
+        new_process = self._spawn(inf_env, new_slot)
+        if not self._wait_until_ready(new_process, new_slot):
+            self._app_logger.warning(
+                "New inference server didn't get ready, not swapping to it"
+            )
+            new_process.terminate()
+            new_process.wait()
+            return False
+
+        old_process = self._inference_server_process
+        self._inference_server_process = new_process
+        self._slot = new_slot
+        self._inference_server_started = True
+        self._inference_server_ever_started = True
+        self._logged_unrecoverable_since_last_restart = False
+        self._app_logger.info(
+            f"Swapped to new inference server on port {self.port(new_slot)}"
+        )
+        if old_process is not None:
+            # The inference server finishes in flight requests before exiting.
+            threading.Thread(
+                target=_terminate_and_wait, args=(old_process,), daemon=True
+            ).start()
+        return True
+
+    def hot_reload(self) -> bool:
+        """Have the inference server reload the model code in place.
+
+        Returns: False if the inference server didn't, in which case it still
+            runs the previous model code.
+        """
+        url = f"http://localhost:{self.port(self._slot)}{HOT_RELOAD_PATH}"
+        try:
+            resp = requests.post(url, timeout=HOT_RELOAD_TIMEOUT_SECS)
+        except requests.RequestException as exc:
+            self._app_logger.warning(f"Failed to reload model code in place: {exc}")
+            return False
+        if resp.status_code != 200:
+            self._app_logger.warning(
+                f"Failed to reload model code in place: {resp.text}"
+            )
+            return False
+        return True
+
+    def active_slot(self) -> int:
+        return self._slot
+
+    def port(self, slot: int) -> int:
+        if slot == 0:
+            return self._inference_server_port
+        return self._inference_server_alternate_port
+
+    def uds_path(self, slot: int) -> Optional[str]:
+        if slot == 0 or self._inference_server_uds_path is None:
+            return self._inference_server_uds_path
+        return f"{self._inference_server_uds_path}.{slot}"
+
+    def _spawn(self, inf_env: dict, slot: int) -> subprocess.Popen:
         with current_directory(self._inference_server_home):
-            inf_env["INFERENCE_SERVER_PORT"] = str(self._inference_server_port)
-            self._inference_server_process = subprocess.Popen(
+            inf_env["INFERENCE_SERVER_PORT"] = str(self.port(slot))
+            uds_path = self.uds_path(slot)
+            if uds_path is not None:
+                inf_env["INFERENCE_SERVER_UDS_PATH"] = uds_path
+            return subprocess.Popen(
                 self._inference_server_process_args,
                 env=inf_env,
             )
 
-            self._inference_server_started = True
-            self._inference_server_ever_started = True
-            self._logged_unrecoverable_since_last_restart = False
+    def _wait_until_ready(self, process: subprocess.Popen, slot: int) -> bool:
+        url = f"http://localhost:{self.port(slot)}{READINESS_PATH}"
+        deadline = time.monotonic() + SWAP_READY_TIMEOUT_SECS
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                return False
+            try:
+                if requests.get(url, timeout=5).status_code == 200:
+                    return True
+            except requests.RequestException:
+                pass
+            time.sleep(SWAP_READY_CHECK_INTERVAL_SECS)
+        return False
 
     def stop(self):
         if self._inference_server_process is not None:
@@ -109,3 +218,12 @@ class InferenceServerProcessController:
                         "Inference server unrecoverable. Try patching"
                     )
                     self._logged_unrecoverable_since_last_restart = True
+
+
+def _terminate_and_wait(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(TERMINATION_TIMEOUT_SECS)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
@@ -0,0 +1,89 @@
+import asyncio
+from typing import Optional
+
+import httpx
+from helpers.inference_server_process_controller import InferenceServerProcessController
+
+READINESS_PATH = "/v1/models/model"
+READINESS_POLL_INTERVAL_SECS = 0.5
+READINESS_PROBE_TIMEOUT_SECS = 5.0
+
+
+class InferenceServerReadiness:
+    """Lets proxied requests wait for the inference server without polling it.
+
+    While the inference server isn't known to be ready, a single watcher task
+    polls its readiness route, and all waiting requests await the same event.
+    The watcher also wakes them up if the inference server stops, so that
+    they can find out why. Requests that find the inference server not ready
+    after all, e.g. because it's restarting, call `reset` and wait again.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        process_controller: InferenceServerProcessController,
+        poll_interval_secs: float = READINESS_POLL_INTERVAL_SECS,
+    ):
+        self._client = client
+        self._process_controller = process_controller
+        self._poll_interval_secs = poll_interval_secs
+        # Created on first use, asyncio objects need to be created within the
+        # event loop they are used in.
+        self._ready: Optional[asyncio.Event] = None
+        self._watcher: Optional[asyncio.Task] = None
+
+    def is_ready(self) -> bool:
+        return self._ready is not None and self._ready.is_set()
+
+    def reset(self):
+        if self._ready is not None:
+            self._ready.clear()
+
+    async def wait(self, timeout_secs: float) -> bool:
+        """
+        Wait until the inference server is ready, or has stopped.
+
+        Returns: False if that didn't happen within `timeout_secs`.
+        """
+        if self.is_ready():
+            return True
+        ready = self._event()
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.get_running_loop().create_task(self._watch())
+        try:
+            await asyncio.wait_for(ready.wait(), max(timeout_secs, 0))
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def _event(self) -> asyncio.Event:
+        if self._ready is None:
+            self._ready = asyncio.Event()
+        return self._ready
+
+    async def _watch(self):
+        ready = self._event()
+        while not ready.is_set():
+            if self._has_stopped() or await self._is_up():
+                ready.set()
+                return
+            await asyncio.sleep(self._poll_interval_secs)
+
+    async def _is_up(self) -> bool:
+        try:
+            resp = await self._client.get(
+                READINESS_PATH, timeout=READINESS_PROBE_TIMEOUT_SECS
+            )
+        except httpx.HTTPError:
+            return False
+        # The readiness route returns 503 while the model loads.
+        return resp.status_code != 503
+
+    def _has_stopped(self) -> bool:
+        if self._process_controller.is_inference_server_intentionally_stopped():
+            return True
+        return (
+            self._process_controller.inference_server_ever_started()
+            and not self._process_controller.is_inference_server_running()
+        )
@@ -0,0 +1,38 @@
+from typing import Dict
+
+import httpx
+from helpers.inference_server_process_controller import InferenceServerProcessController
+
+
+class InferenceServerTransport(httpx.AsyncBaseTransport):
+    """Sends requests to the port, or unix socket, of the current inference server.
+
+    The inference server moves between two of them when it's swapped, see
+    `InferenceServerProcessController.swap`. Each request goes to the one
+    current when it's sent, so the switch is atomic, while requests already
+    sent to the previous inference server finish there.
+    """
+
+    def __init__(
+        self,
+        process_controller: InferenceServerProcessController,
+        limits: httpx.Limits,
+    ):
+        self._process_controller = process_controller
+        self._limits = limits
+        self._transports: Dict[int, httpx.AsyncHTTPTransport] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        slot = self._process_controller.active_slot()
+        transport = self._transports.get(slot)
+        if transport is None:
+            transport = httpx.AsyncHTTPTransport(
+                uds=self._process_controller.uds_path(slot), limits=self._limits
+            )
+            self._transports[slot] = transport
+        request.url = request.url.copy_with(port=self._process_controller.port(slot))
+        return await transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        for transport in self._transports.values():
+            await transport.aclose()
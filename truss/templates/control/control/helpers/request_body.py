@@ -0,0 +1,52 @@
+from typing import AsyncIterator, List, Optional
+
+# Up to this much of a request body is kept to be able to send it again.
+DEFAULT_REPLAY_BUFFER_BYTES = 1024 * 1024
+
+
+class ReplayableRequestBody:
+    """Body of an incoming request, streamed as it's forwarded.
+
+    The body isn't read up front. Chunks are passed on as they come in, and
+    kept until more than `max_buffer_bytes` have been read, so that the
+    request can be sent again if sending it failed. A body that hasn't been
+    read at all, e.g. because connecting failed, can always be sent again.
+    """
+
+    def __init__(
+        self,
+        source: AsyncIterator[bytes],
+        max_buffer_bytes: int = DEFAULT_REPLAY_BUFFER_BYTES,
+    ):
+        self._source = source
+        self._max_buffer_bytes = max_buffer_bytes
+        self._buffer: Optional[List[bytes]] = []
+        self._buffered_bytes = 0
+        self._source_done = False
+
+    def can_replay(self) -> bool:
+        return self._buffer is not None
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """Body from the start, for one attempt at sending the request."""
+        if self._buffer is None:
+            raise RuntimeError("Request body was too large to be sent again.")
+        for chunk in list(self._buffer):
+            yield chunk
+        while not self._source_done:
+            try:
+                chunk = await self._source.__anext__()
+            except StopAsyncIteration:
+                self._source_done = True
+                return
+            self._keep(chunk)
+            yield chunk
+
+    def _keep(self, chunk: bytes):
+        if self._buffer is None:
+            return
+        self._buffered_bytes += len(chunk)
+        if self._buffered_bytes > self._max_buffer_bytes:
+            self._buffer = None
+        else:
+            self._buffer.append(chunk)
@@ -23,12 +23,17 @@ def apply_code_patch(
         filepath.parent.mkdir(parents=True, exist_ok=True)
         action_log = "Adding" if action == Action.ADD else "Updating"
         logger.info(f"{action_log} file {filepath}")
+        if patch.delta is not None:
+            raise ValueError("Invalid patch: file delta was not resolved.")
+        if patch.binary_content is not None:
+            filepath.write_bytes(patch.binary_content)
+            return
+        content = patch.content
+        if content is None:
+            raise ValueError(
+                "Invalid patch: content of a file update patch should not be None."
+            )
         with filepath.open("w") as file:
-            content = patch.content
-            if content is None:
-                raise ValueError(
-                    "Invalid patch: content of a file update patch should not be None."
-                )
             file.write(content)
 
     elif action == Action.REMOVE:
@@ -1,10 +1,13 @@
+import dataclasses
+import hashlib
 import logging
 import subprocess
 from pathlib import Path
 from typing import Optional
 
-from helpers.errors import UnsupportedPatch
+from helpers.errors import DeltaBaseMismatch, UnsupportedPatch
 from helpers.truss_patch.model_code_patch_applier import apply_code_patch
+from helpers.truss_patch.wire_format import apply_delta
 from helpers.types import (
     Action,
     ConfigPatch,
@@ -72,6 +75,32 @@ class ModelContainerPatchApplier:
         else:
             raise UnsupportedPatch(f"Unknown patch type {patch.type}")
 
+    def resolve_delta(self, patch: Patch) -> Patch:
+        """
+        Replace the file delta of a model code or package patch by the new
+        content of the file, built from its current content.
+        """
+        body = patch.body
+        if not isinstance(body, (ModelCodePatch, PackagePatch)) or body.delta is None:
+            return patch
+        if isinstance(body, ModelCodePatch):
+            filepath = self._model_module_dir / body.path
+        else:
+            filepath = self._bundled_packages_dir / body.path
+        base = filepath.read_bytes() if filepath.is_file() else b""
+        if hashlib.sha256(base).hexdigest() != body.delta.base_sha256:
+            raise DeltaBaseMismatch(
+                f"Delta of {filepath} doesn't apply to its current content."
+            )
+        content = apply_delta(base, body.delta.ops)
+        try:
+            new_body = dataclasses.replace(
+                body, content=content.decode("utf-8"), delta=None
+            )
+        except UnicodeDecodeError:
+            new_body = dataclasses.replace(body, binary_content=content, delta=None)
+        return Patch(type=patch.type, body=new_body)
+
     @property
     def _truss_config(self) -> TrussConfig:
         return TrussConfig.from_yaml(self._inference_server_home / "config.yaml")
@@ -0,0 +1,205 @@
+"""Binary wire format of patch requests.
+
+Patch requests are JSON by default, which carries file contents as text, in
+full. Control servers that also accept this format list its media type in the
+`Accept-Patch` header of `OPTIONS /control/patch`.
+
+A request in this format is zlib compressed. Uncompressed, it's a 4 byte big
+endian header length, a JSON header and the blobs the header refers to, back
+to back. The header is the JSON patch request, where the content of model
+code and package files is replaced by either
+
+* `content_blob`: index of a blob with the raw content, and `binary`: whether
+  the content isn't UTF-8 text, or
+* `delta`: `{"base_sha256": ..., "ops_blob": ...}`, index of a blob with the
+  ops of a delta from the file's previous content, see `compute_delta`.
+
+Decoding turns it back into a JSON patch request, with deltas left to resolve
+against the files they apply to.
+"""
+import base64
+import difflib
+import hashlib
+import json
+import logging
+import struct
+import zlib
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from helpers.types import Action, ModelCodePatch, PackagePatch, Patch
+except ModuleNotFoundError as exc:
+    logging.debug(f"Importing helpers from truss core, caused by: {exc}")
+    from truss.templates.control.control.helpers.types import (
+        Action,
+        ModelCodePatch,
+        PackagePatch,
+        Patch,
+    )
+
+PATCH_JSON_MEDIA_TYPE = "application/json"
+PATCH_BINARY_MEDIA_TYPE = "application/vnd.truss.patch+binary"
+ACCEPT_PATCH_HEADER = "Accept-Patch"
+
+# Deltas are only computed for files up to this size, and only sent if they
+# are at most this fraction of the full content.
+MAX_DELTA_CONTENT_BYTES = 16 * 1024 * 1024
+MAX_DELTA_RATIO = 0.5
+ZLIB_LEVEL = 6
+
+_HEADER_LENGTH = struct.Struct(">I")
+_COPY_OP = b"C"
+_COPY = struct.Struct(">QQ")
+_INSERT_OP = b"I"
+_INSERT = struct.Struct(">Q")
+
+
+def encode_patch_request(
+    hash: str,
+    prev_hash: str,
+    patches: List[Patch],
+    base_content: Optional[Callable[[Patch], Optional[bytes]]] = None,
+) -> bytes:
+    """
+    Encode a patch request in the binary format. `base_content` returns the
+    previous content of the file of a patch, if known, for sending a delta
+    instead of the full content.
+    """
+    blobs: List[bytes] = []
+
+    def add_blob(blob: bytes) -> int:
+        blobs.append(blob)
+        return len(blobs) - 1
+
+    patch_dicts = []
+    for patch in patches:
+        patch_dict = patch.to_dict()
+        content = _file_content(patch)
+        if content is not None:
+            body_dict = patch_dict["body"]
+            for key in ("content", "content_base64", "delta"):
+                body_dict.pop(key, None)
+            base = base_content(patch) if base_content is not None else None
+            delta = _delta_if_smaller(base, content) if base is not None else None
+            if delta is not None:
+                body_dict["delta"] = {
+                    "base_sha256": hashlib.sha256(base).hexdigest(),  # type: ignore[arg-type]
+                    "ops_blob": add_blob(delta),
+                }
+            else:
+                body_dict["content_blob"] = add_blob(content)
+                body_dict["binary"] = patch.body.binary_content is not None  # type: ignore[attr-defined]
+        patch_dicts.append(patch_dict)
+
+    header = json.dumps(
+        {
+            "hash": hash,
+            "prev_hash": prev_hash,
+            "patches": patch_dicts,
+            "blob_lengths": [len(blob) for blob in blobs],
+        }
+    ).encode("utf-8")
+    return zlib.compress(
+        b"".join([_HEADER_LENGTH.pack(len(header)), header, *blobs]), ZLIB_LEVEL
+    )
+
+
+def decode_patch_request(body: bytes) -> Dict[str, Any]:
+    """Decode a patch request in the binary format, into a JSON patch request."""
+    data = memoryview(zlib.decompress(body))
+    (header_length,) = _HEADER_LENGTH.unpack_from(data)
+    offset = _HEADER_LENGTH.size + header_length
+    header = json.loads(bytes(data[_HEADER_LENGTH.size : offset]))
+    blobs = []
+    for blob_length in header.pop("blob_lengths"):
+        blobs.append(bytes(data[offset : offset + blob_length]))
+        offset += blob_length
+
+    for patch_dict in header["patches"]:
+        body_dict = patch_dict["body"]
+        if "content_blob" in body_dict:
+            content = blobs[body_dict.pop("content_blob")]
+            if body_dict.pop("binary"):
+                body_dict["content"] = None
+                body_dict["content_base64"] = base64.b64encode(content).decode("ascii")
+            else:
+                body_dict["content"] = content.decode("utf-8")
+        elif "delta" in body_dict:
+            delta = body_dict["delta"]
+            ops = blobs[delta.pop("ops_blob")]
+            delta["ops_base64"] = base64.b64encode(ops).decode("ascii")
+            body_dict["content"] = None
+    return header
+
+
+def compute_delta(base: bytes, content: bytes) -> bytes:
+    """
+    Ops that build `content` from `base`: copies of ranges of `base` and
+    inserted bytes. Matching is done line by line, which works best for text
+    files, but is correct for any content.
+    """
+    base_lines = base.splitlines(keepends=True)
+    content_lines = content.splitlines(keepends=True)
+    base_offsets = _line_offsets(base_lines)
+    content_offsets = _line_offsets(content_lines)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, base_lines, content_lines)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            start = base_offsets[i1]
+            ops.append(_COPY_OP + _COPY.pack(start, base_offsets[i2] - start))
+        elif j2 > j1:
+            inserted = content[content_offsets[j1] : content_offsets[j2]]
+            ops.append(_INSERT_OP + _INSERT.pack(len(inserted)) + inserted)
+    return b"".join(ops)
+
+
+def apply_delta(base: bytes, ops: bytes) -> bytes:
+    """Build new content from `base` and the ops of `compute_delta`."""
+    parts = []
+    view = memoryview(ops)
+    offset = 0
+    while offset < len(view):
+        op = bytes(view[offset : offset + 1])
+        offset += 1
+        if op == _COPY_OP:
+            start, length = _COPY.unpack_from(view, offset)
+            offset += _COPY.size
+            parts.append(base[start : start + length])
+        elif op == _INSERT_OP:
+            (length,) = _INSERT.unpack_from(view, offset)
+            offset += _INSERT.size
+            parts.append(bytes(view[offset : offset + length]))
+            offset += length
+        else:
+            raise ValueError(f"Invalid delta op {op!r}")
+    return b"".join(parts)
+
+
+def _file_content(patch: Patch) -> Optional[bytes]:
+    body = patch.body
+    if not isinstance(body, (ModelCodePatch, PackagePatch)):
+        return None
+    if body.action == Action.REMOVE:
+        return None
+    if body.binary_content is not None:
+        return body.binary_content
+    if body.content is not None:
+        return body.content.encode("utf-8")
+    return None
+
+
+def _delta_if_smaller(base: bytes, content: bytes) -> Optional[bytes]:
+    if max(len(base), len(content)) > MAX_DELTA_CONTENT_BYTES:
+        return None
+    delta = compute_delta(base, content)
+    if len(delta) > len(content) * MAX_DELTA_RATIO:
+        return None
+    return delta
+
+
+def _line_offsets(lines: List[bytes]) -> List[int]:
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+    return offsets
@@ -1,7 +1,8 @@
+import base64
 from abc import abstractmethod
 from dataclasses import dataclass
 from enum import Enum
-from typing import Dict, Optional, Type, Union
+from typing import Any, Dict, Optional, Type, Union
 
 
 class PatchType(Enum):
@@ -36,16 +37,45 @@ class PatchBody:
         pass
 
 
+@dataclass
+class FileDelta:
+    """New content of a file, as ranges copied from its previous content and
+    inserted bytes. See `helpers.truss_patch.wire_format`.
+    """
+
+    base_sha256: str  # Of the previous content the delta applies to
+    ops: bytes
+
+    def to_dict(self):
+        return {
+            "base_sha256": self.base_sha256,
+            "ops_base64": base64.b64encode(self.ops).decode("ascii"),
+        }
+
+    @staticmethod
+    def from_dict(delta_dict: Dict):
+        return FileDelta(
+            base_sha256=delta_dict["base_sha256"],
+            ops=base64.b64decode(delta_dict["ops_base64"]),
+        )
+
+
 @dataclass
 class ModelCodePatch(PatchBody):
     path: str  # Relative to model module directory
     content: Optional[str] = None
+    # Content of files that aren't valid UTF-8, set instead of content.
+    binary_content: Optional[bytes] = None
+    # Set instead of content when the patch is sent as a delta, until resolved
+    # against the current content of the file.
+    delta: Optional[FileDelta] = None
 
     def to_dict(self):
         return {
             "action": self.action.value,
             "path": self.path,
             "content": self.content,
+            **_file_content_dict(self.binary_content, self.delta),
         }
 
     @staticmethod
@@ -55,6 +85,7 @@ class ModelCodePatch(PatchBody):
             action=Action[action_str],
             path=patch_dict["path"],
             content=patch_dict["content"],
+            **_file_content_kwargs(patch_dict),
         )
 
 
@@ -148,12 +179,16 @@ class DataPatch(PatchBody):
 class PackagePatch(PatchBody):
     path: str
     content: Optional[str] = None
+    # See ModelCodePatch.
+    binary_content: Optional[bytes] = None
+    delta: Optional[FileDelta] = None
 
     def to_dict(self):
         return {
             "action": self.action.value,
             "content": self.content,
             "path": self.path,
+            **_file_content_dict(self.binary_content, self.delta),
         }
 
     @staticmethod
@@ -163,6 +198,7 @@ class PackagePatch(PatchBody):
             action=Action[action_str],
             content=patch_dict["content"],
             path=patch_dict["path"],
+            **_file_content_kwargs(patch_dict),
         )
 
 
@@ -204,6 +240,30 @@ class ExternalDataPatch(PatchBody):
         )
 
 
+def _file_content_dict(
+    binary_content: Optional[bytes], delta: Optional[FileDelta]
+) -> Dict[str, Any]:
+    # Only present when set, so that older control servers can still read
+    # patches of text files.
+    content_dict: Dict[str, Any] = {}
+    if binary_content is not None:
+        content_dict["content_base64"] = base64.b64encode(binary_content).decode(
+            "ascii"
+        )
+    if delta is not None:
+        content_dict["delta"] = delta.to_dict()
+    return content_dict
+
+
+def _file_content_kwargs(patch_dict: Dict) -> Dict[str, Any]:
+    kwargs: Dict[str, Any] = {}
+    if patch_dict.get("content_base64") is not None:
+        kwargs["binary_content"] = base64.b64decode(patch_dict["content_base64"])
+    if patch_dict.get("delta") is not None:
+        kwargs["delta"] = FileDelta.from_dict(patch_dict["delta"])
+    return kwargs
+
+
 PATCH_BODY_BY_TYPE: Dict[
     PatchType,
     Type[
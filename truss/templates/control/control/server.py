@@ -1,11 +1,27 @@
 import asyncio
 import os
+from typing import Optional
 
 import uvicorn
 from application import create_app
 
 CONTROL_SERVER_PORT = int(os.environ.get("CONTROL_SERVER_PORT", "8080"))
 INFERENCE_SERVER_PORT = int(os.environ.get("INFERENCE_SERVER_PORT", "8090"))
+INFERENCE_SERVER_UDS_PATH = os.environ.get("INFERENCE_SERVER_UDS_PATH")
+PROXY_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.environ.get("PROXY_MAX_KEEPALIVE_CONNECTIONS", "8")
+)
+PROXY_MAX_CONNECTIONS = int(os.environ.get("PROXY_MAX_CONNECTIONS", "32"))
+# Swap in a new inference server on patches and restarts, instead of
+# stopping the running one first. Needs room for two copies of the model.
+INFERENCE_SERVER_BLUE_GREEN = (
+    os.environ.get("INFERENCE_SERVER_BLUE_GREEN", "false").lower() == "true"
+)
+# Reload patched model code in the running inference server, keeping the
+# loaded model.
+INFERENCE_SERVER_HOT_RELOAD = (
+    os.environ.get("INFERENCE_SERVER_HOT_RELOAD", "false").lower() == "true"
+)
 
 
 def _identify_python_executable_path() -> str:
@@ -22,12 +38,22 @@ class ControlServer:
         inf_serv_home: str,
         control_server_port: int,
         inference_server_port: int,
+        inference_server_uds_path: Optional[str] = None,
+        proxy_max_keepalive_connections: int = PROXY_MAX_KEEPALIVE_CONNECTIONS,
+        proxy_max_connections: int = PROXY_MAX_CONNECTIONS,
+        inference_server_blue_green: bool = INFERENCE_SERVER_BLUE_GREEN,
+        inference_server_hot_reload: bool = INFERENCE_SERVER_HOT_RELOAD,
     ):
         super().__init__()
         self._python_executable_path = python_executable_path
         self._inf_serv_home = inf_serv_home
         self._control_server_port = control_server_port
         self._inference_server_port = inference_server_port
+        self._inference_server_uds_path = inference_server_uds_path
+        self._proxy_max_keepalive_connections = proxy_max_keepalive_connections
+        self._proxy_max_connections = proxy_max_connections
+        self._inference_server_blue_green = inference_server_blue_green
+        self._inference_server_hot_reload = inference_server_hot_reload
 
     def run(self):
         application = create_app(
@@ -40,6 +66,11 @@ class ControlServer:
                 "control_server_host": "0.0.0.0",
                 "control_server_port": self._control_server_port,
                 "inference_server_port": self._inference_server_port,
+                "inference_server_uds_path": self._inference_server_uds_path,
+                "proxy_max_keepalive_connections": self._proxy_max_keepalive_connections,
+                "proxy_max_connections": self._proxy_max_connections,
+                "inference_server_blue_green": self._inference_server_blue_green,
+                "inference_server_hot_reload": self._inference_server_hot_reload,
             }
         )
 
@@ -68,5 +99,6 @@ if __name__ == "__main__":
         inf_serv_home=os.environ["APP_HOME"],
         control_server_port=CONTROL_SERVER_PORT,
         inference_server_port=INFERENCE_SERVER_PORT,
+        inference_server_uds_path=INFERENCE_SERVER_UDS_PATH,
     )
     control_server.run()
@@ -0,0 +1,101 @@
+import asyncio
+import heapq
+import itertools
+from typing import List, Optional, Tuple
+
+
+class AdmissionError(Exception):
+    """Raised when a request is not admitted to wait for a slot."""
+
+
+class QueueFullError(AdmissionError):
+    pass
+
+
+class QueueTimeoutError(AdmissionError):
+    pass
+
+
+class PrioritySemaphore:
+    """
+    Semaphore that hands out free slots to waiters by priority, highest
+    first, and in order of arrival within a priority.
+
+    Callers can bound how many waiters may queue up ahead of them and how
+    long they wait, and are rejected with an `AdmissionError` rather than
+    queueing without limit.
+    """
+
+    def __init__(self, value: int = 1):
+        if value < 1:
+            raise ValueError("value must be at least 1")
+        self._value = value
+        # Entries are (-priority, arrival, future), the heap pops the highest
+        # priority, earliest arrival first. Entries of waiters that gave up
+        # are left in the heap and skipped when popped.
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._arrivals = itertools.count()
+        self._num_waiting = 0
+
+    @property
+    def value(self) -> int:
+        """Number of free slots."""
+        return self._value
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of callers waiting for a slot."""
+        return self._num_waiting
+
+    async def acquire(
+        self,
+        priority: int = 0,
+        max_queue_depth: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Wait for a slot. Raises `QueueFullError` right away if
+        `max_queue_depth` callers are already waiting, and `QueueTimeoutError`
+        if no slot is free within `timeout` seconds.
+        """
+        if self._value > 0 and self._num_waiting == 0:
+            self._value -= 1
+            return
+        if max_queue_depth is not None and self._num_waiting >= max_queue_depth:
+            raise QueueFullError(f"{self._num_waiting} requests are already queued")
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (-priority, next(self._arrivals), waiter))
+        self._num_waiting += 1
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError as e:
+            self._release_if_handed_over(waiter)
+            raise QueueTimeoutError(f"No slot was free within {timeout}s") from e
+        except BaseException:
+            self._release_if_handed_over(waiter)
+            raise
+        finally:
+            self._num_waiting -= 1
+
+    def release(self):
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                # Hand the slot over directly, so that it can't be taken by a
+                # caller that arrives before the waiter wakes up.
+                waiter.set_result(None)
+                return
+        self._value += 1
+
+    def _release_if_handed_over(self, waiter: asyncio.Future):
+        if waiter.done() and not waiter.cancelled():
+            # The slot was handed over after we stopped waiting, e.g. as the
+            # timeout fired.
+            self.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, *exc_info):
+        self.release()
@@ -0,0 +1,237 @@
+import asyncio
+import itertools
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_BATCH_MAX_WAIT_MS = 10
+
+BatchFn = Callable[[List[Any]], Awaitable[List[Any]]]
+
+
+@dataclass
+class _Pending:
+    item: Any
+    future: asyncio.Future
+    # Taken into a batch that's about to run.
+    dispatched: bool = False
+
+
+class BatchSizeMismatchError(RuntimeError):
+    def __init__(self, expected: int, actual: int):
+        self.expected = expected
+        self.actual = actual
+
+    def __str__(self):
+        return (
+            f"predict_batch returned {self.actual} results for a batch of "
+            f"{self.expected} inputs."
+        )
+
+
+class DynamicBatcher:
+    """
+    Gathers concurrently submitted items into micro-batches.
+
+    Items are collected until either `max_batch_size` items are pending or
+    `max_wait_ms` has elapsed since the first item of the batch arrived. The
+    batch function is then called once with the list of items and must return
+    a list of results of the same length, in the same order. A result that is
+    an exception instance fails only the corresponding request.
+
+    If the batch function raises for a batch of more than one item, each item
+    is retried as a batch of one, so that a single bad input cannot fail the
+    other requests it happened to be batched with.
+
+    With `acquire_slot` and `release_slot`, a batch holds a slot while it runs.
+    While waiting for one, the batch keeps growing, up to `max_batch_size`,
+    with what arrives, so that batches get bigger the busier the model is.
+    Items are taken into batches by priority, highest first.
+    """
+
+    def __init__(
+        self,
+        batch_fn: BatchFn,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_BATCH_MAX_WAIT_MS,
+        acquire_slot: Optional[Callable[[], Awaitable[None]]] = None,
+        release_slot: Optional[Callable[[], None]] = None,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self._batch_fn = batch_fn
+        self._max_batch_size = max_batch_size
+        self._max_wait_secs = max(max_wait_ms, 0) / 1000.0
+        self._acquire_slot = acquire_slot
+        self._release_slot = release_slot
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._arrivals = itertools.count()
+        # Items submitted and not yet taken into a running batch, nor given up.
+        self._num_pending = 0
+        self._worker: Optional[asyncio.Task] = None
+        self._batch_tasks: set = set()
+        self._logger = logging.getLogger(__name__)
+        # Number of batches executed, keyed by batch size.
+        self.batch_size_counts: Counter = Counter()
+
+    @property
+    def max_batch_size(self) -> int:
+        return self._max_batch_size
+
+    def pending(self) -> int:
+        """Number of items not yet taken into a running batch."""
+        return self._num_pending
+
+    def batch_size_distribution(self) -> Dict[int, int]:
+        return dict(sorted(self.batch_size_counts.items()))
+
+    async def submit(
+        self, item: Any, priority: int = 0, timeout: Optional[float] = None
+    ) -> Any:
+        """Submit one item and wait for its individual result.
+
+        Raises `asyncio.TimeoutError` if the item isn't taken into a running
+        batch within `timeout` seconds.
+        """
+        self._ensure_worker()
+        pending = _Pending(item, asyncio.get_running_loop().create_future())
+        self._queue.put_nowait(  # type: ignore[union-attr]
+            (-priority, next(self._arrivals), pending)
+        )
+        self._num_pending += 1
+        try:
+            if timeout is not None:
+                await asyncio.wait([pending.future], timeout=timeout)
+                if not pending.future.done() and not pending.dispatched:
+                    raise asyncio.TimeoutError(f"Item wasn't batched within {timeout}s")
+            return await pending.future
+        except BaseException:
+            if not pending.dispatched:
+                # Left out of the batch, it's not running yet.
+                pending.future.cancel()
+                self._num_pending -= 1
+            raise
+
+    def stop(self):
+        """Stop gathering new batches; batches already running complete."""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+    def _ensure_worker(self):
+        # The queue and worker are created lazily so that they are bound to the
+        # event loop of the server process, rather than the one (if any) that
+        # was running when the model wrapper was constructed.
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.PriorityQueue()
+            self._num_pending = 0
+            self._worker = asyncio.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        queue: asyncio.PriorityQueue = self._queue  # type: ignore[assignment]
+        while True:
+            batch = [(await queue.get())[-1]]
+            deadline = loop.time() + self._max_wait_secs
+            while len(batch) < self._max_batch_size:
+                self._drain(queue, batch)
+                remaining = deadline - loop.time()
+                if len(batch) >= self._max_batch_size or remaining <= 0:
+                    break
+                try:
+                    entry = await asyncio.wait_for(queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(entry[-1])
+
+            if self._acquire_slot is not None:
+                await self._wait_for_slot(queue, batch)
+
+            # Requests that were cancelled while queued don't take part.
+            batch = [pending for pending in batch if not pending.future.done()]
+            if not batch:
+                self._release()
+                continue
+            for pending in batch:
+                pending.dispatched = True
+            self._num_pending -= len(batch)
+            # Run the batch in its own task, so that the next batch can be
+            # gathered while this one executes.
+            task = asyncio.create_task(self._execute_holding_slot(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    def _drain(self, queue: asyncio.PriorityQueue, batch: List[_Pending]):
+        # Whatever is already queued, without waiting.
+        while len(batch) < self._max_batch_size and not queue.empty():
+            batch.append(queue.get_nowait()[-1])
+
+    async def _wait_for_slot(self, queue: asyncio.PriorityQueue, batch: List[_Pending]):
+        acquire = asyncio.ensure_future(self._acquire_slot())  # type: ignore[misc]
+        get: Optional[asyncio.Future] = None
+        try:
+            while not acquire.done() and len(batch) < self._max_batch_size:
+                get = asyncio.ensure_future(queue.get())
+                await asyncio.wait([acquire, get], return_when=asyncio.FIRST_COMPLETED)
+                if get.done():
+                    batch.append(get.result()[-1])
+                else:
+                    # The item, if any, stays queued.
+                    get.cancel()
+                get = None
+            await acquire
+        except BaseException:
+            if get is not None:
+                get.cancel()
+            if acquire.done() and not acquire.cancelled() and not acquire.exception():
+                self._release()
+            else:
+                acquire.cancel()
+            raise
+        self._drain(queue, batch)
+
+    def _release(self):
+        if self._release_slot is not None:
+            self._release_slot()
+
+    async def _execute_holding_slot(self, batch: List[_Pending]):
+        try:
+            await self._execute(batch)
+        finally:
+            self._release()
+
+    async def _execute(self, batch: List[_Pending]):
+        items = [pending.item for pending in batch]
+        futures = [pending.future for pending in batch]
+        self.batch_size_counts[len(items)] += 1
+        try:
+            results = await self._batch_fn(items)
+            if not isinstance(results, (list, tuple)) or len(results) != len(items):
+                raise BatchSizeMismatchError(
+                    len(items),
+                    len(results) if isinstance(results, (list, tuple)) else 1,
+                )
+        except Exception as e:
+            if len(batch) == 1:
+                _set_exception(futures[0], e)
+                return
+            self._logger.warning(
+                f"Batch of {len(batch)} failed, retrying items individually: {e}"
+            )
+            # One after the other, within the slot of the batch.
+            for pending in batch:
+                await self._execute([pending])
+            return
+
+        for fut, result in zip(futures, results):
+            if isinstance(result, Exception):
+                _set_exception(fut, result)
+            elif not fut.done():
+                fut.set_result(result)
+
+
+def _set_exception(fut: asyncio.Future, exc: BaseException):
+    if not fut.done():
+        fut.set_exception(exc)
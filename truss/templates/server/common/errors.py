@@ -57,6 +57,19 @@ class ModelNotReady(RuntimeError):
         return self.error_msg
 
 
+class HotReloadUnavailable(RuntimeError):
+    """
+    Exception class indicating the model code can't be reloaded in place, the
+    inference server has to be restarted to run it.
+    """
+
+    def __init__(self, reason):
+        self.reason = reason
+
+    def __str__(self):
+        return self.reason
+
+
 async def exception_handler(_, exc):
     return JSONResponse(
         status_code=HTTPStatus.INTERNAL_SERVER_ERROR, content={"error": str(exc)}
@@ -90,6 +103,10 @@ async def model_not_ready_handler(_, exc):
     )
 
 
+async def hot_reload_unavailable_handler(_, exc):
+    return JSONResponse(status_code=HTTPStatus.CONFLICT, content={"error": str(exc)})
+
+
 async def not_implemented_error_handler(_, exc):
     return JSONResponse(
         status_code=HTTPStatus.NOT_IMPLEMENTED, content={"error": str(exc)}
@@ -97,4 +114,8 @@ async def not_implemented_error_handler(_, exc):
 
 
 async def http_exception_handler(_, exc):
-    return JSONResponse(status_code=exc.status_code, content={"error": exc.detail})
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"error": exc.detail},
+        headers=getattr(exc, "headers", None),
+    )
@@ -0,0 +1,90 @@
+import multiprocessing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# Fields of /proc/<pid>/smaps_rollup, in kB.
+_SHARED_FIELDS = ("Shared_Clean:", "Shared_Dirty:")
+
+
+@dataclass
+class ProcessMemory:
+    """Memory usage of a process, in bytes.
+
+    `pss` counts each page shared with other processes proportionally, so the
+    sum over all server processes is their actual memory footprint, while
+    `rss` counts shared pages in full for every process.
+    """
+
+    rss: int
+    pss: int
+    shared: int
+
+
+def process_memory(pid: int) -> Optional[ProcessMemory]:
+    """Memory usage of the process with `pid`, or None if it's not available.
+
+    Only supported on Linux, where the kernel reports it in /proc.
+    """
+    proc_dir = Path("/proc") / str(pid)
+    # smaps_rollup is only available as of Linux 4.14, summing up smaps gives
+    # the same totals.
+    for filename in ("smaps_rollup", "smaps"):
+        try:
+            lines = (proc_dir / filename).read_text().splitlines()
+        except OSError:
+            continue
+        rss = pss = shared = 0
+        for line in lines:
+            parts = line.split()
+            if len(parts) < 2 or not parts[1].isdigit():
+                continue
+            size = int(parts[1]) * 1024
+            if parts[0] == "Rss:":
+                rss += size
+            elif parts[0] == "Pss:":
+                pss += size
+            elif parts[0] in _SHARED_FIELDS:
+                shared += size
+        return ProcessMemory(rss=rss, pss=pss, shared=shared)
+    return None
+
+
+class WorkerMemory:
+    """Memory usage of the server processes, for any of them to report.
+
+    The pids are kept in shared memory, so this must be created before the
+    server processes are forked, and `set_pid` called once they are started.
+    """
+
+    def __init__(self, num_workers: int):
+        self._pids = multiprocessing.Array("q", num_workers, lock=False)
+
+    def set_pid(self, worker_index: int, pid: int):
+        self._pids[worker_index] = pid
+
+    def usage(self) -> List[Tuple[int, ProcessMemory]]:
+        """Memory usage per worker index, of the workers it is available for."""
+        usage = []
+        for worker_index, pid in enumerate(self._pids):
+            memory = process_memory(pid) if pid else None
+            if memory is not None:
+                usage.append((worker_index, memory))
+        return usage
+
+    def render(self) -> str:
+        """Memory usage per worker, in the Prometheus text format."""
+        usage = self.usage()
+        lines = []
+        for field, documentation in (
+            ("rss", "Resident memory of the server process."),
+            ("pss", "Proportional set size of the server process."),
+            ("shared", "Memory the server process shares with other processes."),
+        ):
+            name = f"truss_worker_{field}_bytes"
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            for worker_index, memory in usage:
+                value = getattr(memory, field)
+                lines.append(f'{name}{{worker="{worker_index}"}} {value}')
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,262 @@
+"""
+Metrics of the inference server, exported in the Prometheus text format.
+
+Metric values live in shared memory that is allocated when this module is
+imported, i.e. in the main server process before the uvicorn server
+processes are forked. Every server process updates the same values, so a
+scrape of any of them returns the aggregate over all of them.
+"""
+import bisect
+import multiprocessing
+import time
+from abc import ABC, abstractmethod
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+# The metrics rendered by `render_metrics`, i.e. served on /metrics.
+REGISTRY: List["_Metric"] = []
+
+
+class _Metric(ABC):
+    type_name = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_name: Optional[str],
+        label_values: Sequence[str],
+        values_per_label: int,
+        registry: List["_Metric"],
+    ):
+        self.name = name
+        self.documentation = documentation
+        self._label_name = label_name
+        self._label_values = list(label_values) if label_name else [""]
+        self._label_index = {value: i for i, value in enumerate(self._label_values)}
+        self._values_per_label = values_per_label
+        self._values = multiprocessing.Array(
+            "d", len(self._label_values) * values_per_label
+        )
+        registry.append(self)
+
+    def _offset(self, label: str) -> int:
+        return self._label_index[label] * self._values_per_label
+
+    def _labels(self, label: str, **extra: str) -> str:
+        pairs = []
+        if self._label_name:
+            pairs.append((self._label_name, label))
+        pairs.extend(extra.items())
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+    def _snapshot(self) -> List[Tuple[str, List[float]]]:
+        with self._values.get_lock():
+            values = list(self._values)
+        size = self._values_per_label
+        return [
+            (label, values[i * size : (i + 1) * size])
+            for i, label in enumerate(self._label_values)
+        ]
+
+    @abstractmethod
+    def _samples(self) -> Iterable[str]:
+        pass
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_name: Optional[str] = None,
+        label_values: Sequence[str] = (),
+        registry: List[_Metric] = REGISTRY,
+    ):
+        super().__init__(name, documentation, label_name, label_values, 1, registry)
+
+    def inc(self, amount: float = 1, label: str = ""):
+        offset = self._offset(label)
+        with self._values.get_lock():
+            self._values[offset] += amount
+
+    def value(self, label: str = "") -> float:
+        return self._values[self._offset(label)]
+
+    def _samples(self) -> Iterable[str]:
+        for label, (value,) in self._snapshot():
+            yield f"{self.name}{self._labels(label)} {_format(value)}"
+
+
+class Gauge(Counter):
+    """A value that can go up and down, summed over all server processes."""
+
+    type_name = "gauge"
+
+    def dec(self, amount: float = 1, label: str = ""):
+        self.inc(-amount, label)
+
+
+class _HistogramTimer:
+    __slots__ = ("_histogram", "_label", "_start")
+
+    def __init__(self, histogram: "Histogram", label: str):
+        self._histogram = histogram
+        self._label = label
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.observe(time.perf_counter() - self._start, self._label)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_name: Optional[str] = None,
+        label_values: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+        registry: List[_Metric] = REGISTRY,
+    ):
+        self._buckets = sorted(buckets)
+        # Per label: one count per bucket, one for +Inf, then the sum.
+        super().__init__(
+            name,
+            documentation,
+            label_name,
+            label_values,
+            len(self._buckets) + 2,
+            registry,
+        )
+
+    def observe(self, value: float, label: str = ""):
+        offset = self._offset(label)
+        bucket = bisect.bisect_left(self._buckets, value)
+        with self._values.get_lock():
+            # Buckets are stored non-cumulative and summed up when rendered.
+            self._values[offset + bucket] += 1
+            self._values[offset + len(self._buckets) + 1] += value
+
+    def time(self, label: str = "") -> _HistogramTimer:
+        """Context manager that observes the duration of the block, in seconds."""
+        return _HistogramTimer(self, label)
+
+    def count(self, label: str = "") -> int:
+        offset = self._offset(label)
+        return int(sum(self._values[offset : offset + len(self._buckets) + 1]))
+
+    def _samples(self) -> Iterable[str]:
+        bounds = [_format(bound) for bound in self._buckets] + ["+Inf"]
+        for label, values in self._snapshot():
+            cumulative = 0.0
+            for bound, count in zip(bounds, values):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket{self._labels(label, le=bound)} "
+                    f"{_format(cumulative)}"
+                )
+            yield f"{self.name}_sum{self._labels(label)} {_format(values[-1])}"
+            yield f"{self.name}_count{self._labels(label)} {_format(cumulative)}"
+
+
+def _format(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def render_metrics() -> str:
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+STAGES = (
+    "body_read",
+    "schema_validation",
+    "preprocess",
+    "predict_queue_wait",
+    "predict",
+    "postprocess",
+    "response_serialization",
+)
+
+STAGE_DURATION = Histogram(
+    "truss_request_stage_duration_seconds",
+    "Time spent in each stage of handling a predict request.",
+    label_name="stage",
+    label_values=STAGES,
+)
+BATCH_SIZE = Histogram(
+    "truss_batch_size",
+    "Number of requests per predict_batch call, with dynamic batching.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+IN_FLIGHT_REQUESTS = Gauge(
+    "truss_in_flight_requests", "Predict requests currently being handled."
+)
+QUEUE_DEPTH = Gauge(
+    "truss_predict_queue_depth", "Requests waiting for a predict concurrency slot."
+)
+ACTIVE_STREAMS = Gauge(
+    "truss_active_streams", "Streaming responses currently being generated."
+)
+REJECTED_REQUESTS = Counter(
+    "truss_rejected_requests_total",
+    "Requests rejected by admission control, because the predict queue was full "
+    "or they waited too long for predict.",
+    label_name="reason",
+    label_values=("queue_full", "queue_timeout"),
+)
+RESPONSE_CACHE_REQUESTS = Counter(
+    "truss_response_cache_requests_total",
+    "Requests looked up in the response cache, by outcome.",
+    label_name="outcome",
+    label_values=("hit", "miss", "coalesced"),
+)
+RESPONSE_CACHE_EVICTIONS = Counter(
+    "truss_response_cache_evictions_total",
+    "Responses evicted from the response cache, because it was full or they "
+    "expired.",
+    label_name="reason",
+    label_values=("size", "ttl"),
+)
+CANCELLED_STREAMS = Counter(
+    "truss_cancelled_streams_total",
+    "Streaming responses cancelled because the client went away.",
+)
@@ -0,0 +1,146 @@
+import asyncio
+import collections
+import time
+from enum import Enum
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    NamedTuple,
+    Optional,
+    OrderedDict,
+    Tuple,
+)
+
+DEFAULT_RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_RESPONSE_CACHE_TTL_SECS = 60
+
+
+class CacheOutcome(Enum):
+    HIT = "hit"
+    MISS = "miss"
+    # Waited for an identical request that was already being computed.
+    COALESCED = "coalesced"
+
+
+class _Entry(NamedTuple):
+    value: Any
+    size: int
+    expires_at: float
+
+
+class ResponseCache:
+    """
+    LRU cache of responses, bounded by their total size in bytes and by
+    their age.
+
+    Concurrent requests for a key that is not cached yet are coalesced: the
+    first one computes the response, and the others wait for it rather than
+    computing it again. The computation runs in its own task, so it isn't
+    cancelled if the request that started it goes away while others wait.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_RESPONSE_CACHE_MAX_BYTES,
+        ttl_secs: float = DEFAULT_RESPONSE_CACHE_TTL_SECS,
+        on_evict: Optional[Callable[[str], None]] = None,
+    ):
+        self._max_bytes = max_bytes
+        self._ttl_secs = ttl_secs
+        self._on_evict = on_evict
+        self._entries: OrderedDict[str, _Entry] = collections.OrderedDict()
+        self._size = 0
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """Total size of the cached responses, in bytes."""
+        return self._size
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return whether `key` is cached, and the cached response if so."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if entry.expires_at <= time.monotonic():
+            self._evict(key, "ttl")
+            return False, None
+        self._entries.move_to_end(key)
+        return True, entry.value
+
+    def clear(self):
+        """Drop all cached responses, e.g. once they're stale."""
+        self._entries.clear()
+        self._size = 0
+
+    def put(self, key: str, value: Any, size: int):
+        if size > self._max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(value, size, time.monotonic() + self._ttl_secs)
+        self._size += size
+        while self._size > self._max_bytes:
+            self._evict(next(iter(self._entries)), "size")
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        size_of: Callable[[Any], Optional[int]],
+    ) -> Tuple[Any, CacheOutcome]:
+        """
+        Return the cached response for `key`, computing it if needed.
+
+        `size_of` returns the size of a computed response in bytes, or None if
+        the response must not be cached. Exceptions raised by `compute` are
+        raised for every request that waited for it, and are not cached.
+        """
+        found, value = self.get(key)
+        if found:
+            self.hits += 1
+            return value, CacheOutcome.HIT
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task), CacheOutcome.COALESCED
+
+        self.misses += 1
+        task = asyncio.create_task(self._compute(key, compute, size_of))
+        self._in_flight[key] = task
+        return await asyncio.shield(task), CacheOutcome.MISS
+
+    async def _compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        size_of: Callable[[Any], Optional[int]],
+    ) -> Any:
+        try:
+            value = await compute()
+            size = size_of(value)
+            if size is not None:
+                self.put(key, value, size)
+            return value
+        finally:
+            del self._in_flight[key]
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._size -= entry.size
+
+    def _evict(self, key: str, reason: str):
+        self._remove(key)
+        self.evictions += 1
+        if self._on_evict is not None:
+            self._on_evict(reason)
@@ -0,0 +1,246 @@
+import asyncio
+import collections
+import threading
+from typing import Any, AsyncIterator, Deque, Generator, List, Optional, Union
+
+DEFAULT_STREAMING_BUFFER_SIZE = 1024
+# How often a pump thread that is blocked on a full buffer checks whether the
+# reader went away.
+PUMP_STOP_CHECK_INTERVAL_SECS = 0.1
+
+# Marks the end of the stream in the buffer, so that the user's generator is
+# free to yield any value, including None.
+_END_OF_STREAM = object()
+
+
+class StreamBuffer:
+    """
+    Bounded buffer between a task producing stream chunks and the response
+    reading them.
+
+    `put` only suspends the producer when `maxsize` chunks are buffered, i.e.
+    when the client reads slower than the model generates. Reading never sets
+    up a timer per chunk: the time since the last chunk was produced is
+    checked against a single deadline, by a timer that is only re-armed when
+    it fires.
+
+    Optionally, adjacent `str` or `bytes` chunks are coalesced when read, up
+    to `coalesce_bytes` characters/bytes. If `flush_interval_ms` is set, a
+    read waits up to that long for more chunks to fill a coalesced chunk,
+    otherwise only chunks that are already buffered are coalesced.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_STREAMING_BUFFER_SIZE,
+        read_timeout: Optional[float] = None,
+        coalesce_bytes: int = 0,
+        flush_interval_ms: float = 0,
+    ):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self._maxsize = maxsize
+        self._read_timeout = read_timeout
+        self._coalesce_bytes = coalesce_bytes
+        self._flush_interval_secs = max(flush_interval_ms, 0) / 1000.0
+        self._chunks: Deque[Any] = collections.deque()
+        self._loop = asyncio.get_running_loop()
+        self._reader: Optional[asyncio.Future] = None
+        self._writer: Optional[asyncio.Future] = None
+        self._last_activity = self._loop.time()
+        self._deadline_timer: Optional[asyncio.TimerHandle] = None
+        self._closed = False
+
+    def qsize(self) -> int:
+        return len(self._chunks)
+
+    async def put(self, chunk: Any):
+        while len(self._chunks) >= self._maxsize:
+            self._writer = self._loop.create_future()
+            try:
+                await self._writer
+            finally:
+                self._writer = None
+        self._append(chunk)
+
+    def close(self):
+        """Mark the end of the stream, once everything buffered is read."""
+        if not self._closed:
+            self._closed = True
+            # The end marker doesn't count towards maxsize, closing never waits.
+            self._append(_END_OF_STREAM)
+
+    def _append(self, item: Any):
+        self._chunks.append(item)
+        self._last_activity = self._loop.time()
+        _wake(self._reader)
+
+    def _popleft(self) -> Any:
+        item = self._chunks.popleft()
+        # Reading counts as activity too: the read timeout is the time a read
+        # waits for the next chunk, as well as the gap between chunks.
+        self._last_activity = self._loop.time()
+        _wake(self._writer)
+        return item
+
+    async def get(self) -> Any:
+        """
+        Return the next chunk, raising StopAsyncIteration at the end of the
+        stream and asyncio.TimeoutError if no chunk is produced within
+        `read_timeout` seconds.
+        """
+        await self._wait_for_chunk(deadline=None)
+        first = self._popleft()
+        if first is _END_OF_STREAM:
+            self._chunks.appendleft(first)
+            raise StopAsyncIteration
+        if self._coalesce_bytes <= 0 or not isinstance(first, (str, bytes)):
+            return first
+        return await self._coalesce(first)
+
+    async def _coalesce(self, first: Union[str, bytes]) -> Union[str, bytes]:
+        parts = [first]
+        size = len(first)
+        flush_at = self._loop.time() + self._flush_interval_secs
+        while size < self._coalesce_bytes:
+            if not self._chunks:
+                if self._loop.time() >= flush_at:
+                    break
+                await self._wait_for_chunk(deadline=flush_at)
+                if not self._chunks:
+                    break
+            chunk = self._chunks[0]
+            if type(chunk) is not type(first):
+                # Also stops at the end of the stream marker.
+                break
+            parts.append(self._popleft())
+            size += len(chunk)
+        return first[:0].join(parts)
+
+    async def _wait_for_chunk(self, deadline: Optional[float]):
+        """
+        Wait until a chunk is buffered. With a deadline, return when it's
+        reached, with or without a chunk.
+        """
+        if self._chunks:
+            return
+        self._reader = self._loop.create_future()
+        flush_timer = None
+        if deadline is not None:
+            flush_timer = self._loop.call_at(deadline, _wake, self._reader)
+        elif self._read_timeout is not None and self._deadline_timer is None:
+            self._arm_read_timeout()
+        try:
+            await self._reader
+        finally:
+            self._reader = None
+            if flush_timer is not None:
+                flush_timer.cancel()
+
+    def _arm_read_timeout(self):
+        self._deadline_timer = self._loop.call_at(
+            self._last_activity + self._read_timeout, self._check_read_timeout
+        )
+
+    def _check_read_timeout(self):
+        self._deadline_timer = None
+        if self._reader is None or self._reader.done():
+            # Not waiting on the producer, the timer is re-armed on next wait.
+            return
+        if self._loop.time() >= self._last_activity + self._read_timeout:
+            self._reader.set_exception(asyncio.TimeoutError())
+        else:
+            self._arm_read_timeout()
+
+    def cancel_timers(self):
+        if self._deadline_timer is not None:
+            self._deadline_timer.cancel()
+            self._deadline_timer = None
+
+
+def _wake(waiter: Optional[asyncio.Future]):
+    if waiter is not None and not waiter.done():
+        waiter.set_result(None)
+
+
+class SyncGeneratorPump:
+    """
+    Drives a synchronous generator on a dedicated thread, so that a slow or
+    blocking generator doesn't block the event loop.
+
+    The thread pushes chunks to the event loop with `call_soon_threadsafe`,
+    once per batch of chunks produced while the previous batch was not
+    picked up yet, rather than doing a thread handoff per chunk. It runs at
+    most `max_pending` chunks ahead of the reader.
+
+    When the reader stops early, the generator is closed on the pump thread
+    once the chunk it is producing, if any, is done.
+    """
+
+    def __init__(
+        self, gen: Generator, max_pending: int = DEFAULT_STREAMING_BUFFER_SIZE
+    ):
+        self._gen = gen
+        self._loop = asyncio.get_running_loop()
+        self._lock = threading.Lock()
+        self._pending: List[Any] = []
+        self._wakeup_scheduled = False
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._space = threading.Semaphore(max_pending)
+        self._stopped = threading.Event()
+        self._ready = asyncio.Event()
+        self._thread = threading.Thread(
+            target=self._pump, name="truss-stream-pump", daemon=True
+        )
+
+    def _pump(self):
+        try:
+            for chunk in self._gen:
+                while not self._space.acquire(timeout=PUMP_STOP_CHECK_INTERVAL_SECS):
+                    if self._stopped.is_set():
+                        return
+                if self._stopped.is_set():
+                    return
+                self._push(chunk)
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._gen.close()
+            self._push(_END_OF_STREAM)
+
+    def _push(self, item: Any):
+        with self._lock:
+            if item is _END_OF_STREAM:
+                self._done = True
+            else:
+                self._pending.append(item)
+            schedule = not self._wakeup_scheduled
+            self._wakeup_scheduled = True
+        if schedule:
+            try:
+                self._loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:
+                # The event loop is closed, nobody is reading anymore.
+                pass
+
+    async def stream(self) -> AsyncIterator[Any]:
+        self._thread.start()
+        try:
+            while True:
+                self._ready.clear()
+                with self._lock:
+                    batch, self._pending = self._pending, []
+                    self._wakeup_scheduled = False
+                    done = self._done
+                for chunk in batch:
+                    self._space.release()
+                    yield chunk
+                if done and not batch:
+                    if self._error is not None:
+                        raise self._error
+                    return
+                if not batch:
+                    await self._ready.wait()
+        finally:
+            self._stopped.set()
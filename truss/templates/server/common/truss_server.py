@@ -1,4 +1,5 @@
 import asyncio
+import gc
 import json
 import logging
 import multiprocessing
@@ -14,6 +15,13 @@ from typing import AsyncGenerator, Dict, List, Optional, Union
 import common.errors as errors
 import shared.util as utils
 import uvicorn
+from common.memory import WorkerMemory, process_memory
+from common.metrics import (
+    IN_FLIGHT_REQUESTS,
+    PROMETHEUS_CONTENT_TYPE,
+    STAGE_DURATION,
+    render_metrics,
+)
 from common.termination_handler_middleware import TerminationHandlerMiddleware
 from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.responses import ORJSONResponse, StreamingResponse
@@ -21,7 +29,8 @@ from fastapi.routing import APIRoute as FastAPIRoute
 from model_wrapper import ModelWrapper
 from shared.logging import setup_logging
 from shared.serialization import (
-    DeepNumpyEncoder,
+    truss_json_deserialize,
+    truss_json_serialize,
     truss_msgpack_deserialize,
     truss_msgpack_serialize,
 )
@@ -37,6 +46,9 @@ DEFAULT_NUM_WORKERS = 1
 DEFAULT_NUM_SERVER_PROCESSES = 1
 WORKER_TERMINATION_TIMEOUT_SECS = 120.0
 WORKER_TERMINATION_CHECK_INTERVAL_SECS = 0.5
+QUEUE_DEPTH_HEADER = "X-Truss-Queue-Depth"
+# Not under /v1, so that the control server doesn't proxy it.
+HOT_RELOAD_PATH = "/internal/hot_reload"
 
 
 async def parse_body(request: Request) -> bytes:
@@ -44,7 +56,8 @@ async def parse_body(request: Request) -> bytes:
     Used by FastAPI to read body in an asynchronous manner
     """
     try:
-        return await request.body()
+        with STAGE_DURATION.time("body_read"):
+            return await request.body()
     except ClientDisconnect as exc:
         error_message = "Client disconnected"
         logging.error(error_message)
@@ -81,8 +94,11 @@ class BasetenEndpoints:
     to functions will rename unused except for backwards compatibility checks.
     """
 
-    def __init__(self, model: ModelWrapper) -> None:
+    def __init__(
+        self, model: ModelWrapper, worker_memory: Optional[WorkerMemory] = None
+    ) -> None:
         self._model = model
+        self._worker_memory = worker_memory
 
     def _safe_lookup_model(self, model_name: str) -> ModelWrapper:
         if model_name != self._model.name:
@@ -98,10 +114,14 @@ class BasetenEndpoints:
         if not model.ready:
             raise errors.ModelNotReady(model.name)
 
-    async def model_ready(self, model_name: str) -> Dict[str, Union[str, bool]]:
-        self.check_healthy(self._safe_lookup_model(model_name))
+    async def model_ready(self, model_name: str, response: Response) -> Dict[str, int]:
+        model = self._safe_lookup_model(model_name)
+        self.check_healthy(model)
 
-        return {}
+        # Lets load balancers and autoscalers back off from a busy replica.
+        queue_depth = model.queue_depth()
+        response.headers[QUEUE_DEPTH_HEADER] = str(queue_depth)
+        return {"queue_depth": queue_depth}
 
     async def invocations_ready(self) -> Dict[str, Union[str, bool]]:
         """
@@ -131,12 +151,21 @@ class BasetenEndpoints:
 
         self.check_healthy(model)
 
+        IN_FLIGHT_REQUESTS.inc()
+        try:
+            return await self._predict(model, request, body_raw)
+        finally:
+            IN_FLIGHT_REQUESTS.dec()
+
+    async def _predict(
+        self, model: ModelWrapper, request: Request, body_raw: bytes
+    ) -> Response:
         body: Dict
         if self.is_binary(request):
             body = truss_msgpack_deserialize(body_raw)
         else:
             try:
-                body = json.loads(body_raw)
+                body = truss_json_deserialize(body_raw)
             except json.JSONDecodeError as e:
                 error_message = f"Invalid JSON payload: {str(e)}"
                 logging.error(error_message)
@@ -146,6 +175,7 @@ class BasetenEndpoints:
         response: Union[Dict, Generator] = await model(
             body,
             headers=utils.transform_keys(request.headers, lambda key: key.lower()),
+            is_disconnected=request.is_disconnected,
         )
 
         # In the case that the model returns a Generator object, return a
@@ -155,17 +185,30 @@ class BasetenEndpoints:
             return StreamingResponse(response, media_type="application/octet-stream")
 
         response_headers = {}
-        if self.is_binary(request):
-            response_headers["Content-Type"] = "application/octet-stream"
-            return Response(
-                content=truss_msgpack_serialize(response), headers=response_headers
-            )
-        else:
-            response_headers["Content-Type"] = "application/json"
-            return Response(
-                content=json.dumps(response, cls=DeepNumpyEncoder),
-                headers=response_headers,
-            )
+        with STAGE_DURATION.time("response_serialization"):
+            if self.is_binary(request):
+                response_headers["Content-Type"] = "application/octet-stream"
+                content = truss_msgpack_serialize(response)
+            else:
+                response_headers["Content-Type"] = "application/json"
+                content = truss_json_serialize(response)
+        return Response(content=content, headers=response_headers)
+
+    async def metrics(self) -> Response:
+        """
+        Metrics of all server processes, in the Prometheus text format.
+        """
+        content = render_metrics()
+        if self._worker_memory is not None:
+            content += self._worker_memory.render()
+        return Response(content=content, media_type=PROMETHEUS_CONTENT_TYPE)
+
+    async def hot_reload(self) -> Dict:
+        """
+        Swaps in the model from the current model code, without loading it again.
+        """
+        await self._model.hot_reload()
+        return {}
 
     async def schema(self, model_name: str) -> Dict:
         model: ModelWrapper = self._safe_lookup_model(model_name)
@@ -205,17 +248,60 @@ class TrussServer:
         http_port: int,
         config: Dict,
         setup_json_logger: bool = True,
+        uds_path: Optional[str] = None,
+        hot_reload: bool = False,
     ):
         self.http_port = http_port
+        # Also listened on if given, e.g. for the control server to proxy to
+        # without going through TCP.
+        self.uds_path = uds_path
+        # Serve the endpoint for reloading model code in place, for the
+        # control server to use after patching it.
+        self._hot_reload = hot_reload
         self._config = config
         self._model = ModelWrapper(self._config)
-        self._endpoints = BasetenEndpoints(self._model)
+        self._worker_memory = WorkerMemory(self._num_server_processes())
+        self._endpoints = BasetenEndpoints(self._model, self._worker_memory)
         self._setup_json_logger = setup_json_logger
 
     def cleanup(self):
         if INFERENCE_SERVER_FAILED_FILE.exists():
             INFERENCE_SERVER_FAILED_FILE.unlink()
 
+    def _num_server_processes(self) -> int:
+        return self._config.get("runtime", {}).get(
+            "num_workers", DEFAULT_NUM_SERVER_PROCESSES
+        )
+
+    def preload_model(self):
+        """
+        Load the model in the main process, before the server processes are
+        forked, so that they share the memory of the model copy-on-write
+        instead of each loading their own copy.
+        """
+        self.cleanup()
+
+        if self._setup_json_logger:
+            setup_logging()
+
+        # Collecting garbage writes to the objects it visits, which would copy
+        # the shared pages holding them into every server process. Freezing
+        # moves everything allocated during the load out of reach of the
+        # collector.
+        gc.disable()
+        try:
+            self._model.load()
+        finally:
+            gc.freeze()
+            gc.enable()
+
+        memory = process_memory(os.getpid())
+        if memory is not None:
+            logging.info(
+                f"Preloaded model, main process memory: rss {memory.rss} bytes, "
+                f"pss {memory.pss} bytes"
+            )
+
     def on_startup(self):
         """
         This method will be started inside the main process, so here is where we want to setup our logging and model
@@ -228,49 +314,58 @@ class TrussServer:
         self._model.start_load()
 
     def create_application(self):
+        routes = [
+            # liveness endpoint
+            FastAPIRoute(r"/", lambda: True),
+            # readiness endpoint
+            FastAPIRoute(
+                r"/v1/models/{model_name}", self._endpoints.model_ready, tags=["V1"]
+            ),
+            FastAPIRoute(
+                r"/v1/models/{model_name}/schema",
+                self._endpoints.schema,
+                methods=["GET"],
+                tags=["V1"],
+            ),
+            FastAPIRoute(
+                r"/v1/models/{model_name}:predict",
+                self._endpoints.predict,
+                methods=["POST"],
+                tags=["V1"],
+            ),
+            FastAPIRoute(
+                r"/v1/models/{model_name}:predict_binary",
+                self._endpoints.predict,
+                methods=["POST"],
+                tags=["V1"],
+            ),
+            # Endpoint aliases for Sagemaker hosting
+            FastAPIRoute(r"/ping", self._endpoints.invocations_ready),
+            FastAPIRoute(r"/metrics", self._endpoints.metrics, methods=["GET"]),
+            FastAPIRoute(
+                r"/invocations",
+                self._endpoints.invocations,
+                methods=["POST"],
+            ),
+        ]
+        if self._hot_reload:
+            routes.append(
+                FastAPIRoute(
+                    HOT_RELOAD_PATH, self._endpoints.hot_reload, methods=["POST"]
+                )
+            )
         app = FastAPI(
             title="Baseten Inference Server",
             docs_url=None,
             redoc_url=None,
             default_response_class=ORJSONResponse,
             on_startup=[self.on_startup],
-            routes=[
-                # liveness endpoint
-                FastAPIRoute(r"/", lambda: True),
-                # readiness endpoint
-                FastAPIRoute(
-                    r"/v1/models/{model_name}", self._endpoints.model_ready, tags=["V1"]
-                ),
-                FastAPIRoute(
-                    r"/v1/models/{model_name}/schema",
-                    self._endpoints.schema,
-                    methods=["GET"],
-                    tags=["V1"],
-                ),
-                FastAPIRoute(
-                    r"/v1/models/{model_name}:predict",
-                    self._endpoints.predict,
-                    methods=["POST"],
-                    tags=["V1"],
-                ),
-                FastAPIRoute(
-                    r"/v1/models/{model_name}:predict_binary",
-                    self._endpoints.predict,
-                    methods=["POST"],
-                    tags=["V1"],
-                ),
-                # Endpoint aliases for Sagemaker hosting
-                FastAPIRoute(r"/ping", self._endpoints.invocations_ready),
-                FastAPIRoute(
-                    r"/invocations",
-                    self._endpoints.invocations,
-                    methods=["POST"],
-                ),
-            ],
+            routes=routes,
             exception_handlers={
                 errors.InferenceError: errors.inference_error_handler,
                 errors.ModelNotFound: errors.model_not_found_handler,
                 errors.ModelNotReady: errors.model_not_ready_handler,
+                errors.HotReloadUnavailable: errors.hot_reload_unavailable_handler,
                 NotImplementedError: errors.not_implemented_error_handler,
                 HTTPException: errors.http_exception_handler,
                 Exception: errors.generic_exception_handler,
@@ -344,20 +439,27 @@ class TrussServer:
         # Call this so uvloop gets used
         cfg.setup_event_loop()
 
+        if self._config.get("runtime", {}).get("preload_model", False):
+            self.preload_model()
+
         async def serve():
             serversocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             serversocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             serversocket.bind((cfg.host, cfg.port))
-            serversocket.listen(5)
-
-            num_server_procs = self._config.get("runtime", {}).get(
-                "num_workers", DEFAULT_NUM_SERVER_PROCESSES
-            )
+            # A short backlog drops connections when many are opened at once,
+            # e.g. by a proxy filling its connection pool.
+            serversocket.listen(cfg.backlog)
+            sockets = [serversocket]
+            if self.uds_path is not None:
+                sockets.append(_unix_server_socket(self.uds_path, cfg.backlog))
+
+            num_server_procs = self._num_server_processes()
             logging.info(f"starting {num_server_procs} uvicorn server processes")
             servers: List[UvicornCustomServer] = []
-            for _ in range(num_server_procs):
-                server = UvicornCustomServer(config=cfg, sockets=[serversocket])
+            for worker_index in range(num_server_procs):
+                server = UvicornCustomServer(config=cfg, sockets=sockets)
                 server.start()
+                self._worker_memory.set_pid(worker_index, server.pid)
                 servers.append(server)
 
             def stop_servers():
@@ -384,3 +486,14 @@ class TrussServer:
             await asyncio.gather(*servers)
 
         asyncio.run(servers_task())
+
+
+def _unix_server_socket(path: str, backlog: int) -> socket.socket:
+    # Left behind by an earlier inference server process.
+    if os.path.exists(path):
+        os.unlink(path)
+    serversocket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    serversocket.bind(path)
+    os.chmod(path, 0o600)
+    serversocket.listen(backlog)
+    return serversocket
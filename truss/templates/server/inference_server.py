@@ -1,5 +1,5 @@
 import os
-from typing import Dict
+from typing import Dict, Optional
 
 import yaml
 from common.truss_server import TrussServer  # noqa: E402
@@ -13,17 +13,36 @@ setup_logging()
 class ConfiguredTrussServer:
     _config: Dict
     _port: int
-
-    def __init__(self, config_path: str, port: int):
+    _uds_path: Optional[str]
+    _hot_reload: bool
+
+    def __init__(
+        self,
+        config_path: str,
+        port: int,
+        uds_path: Optional[str] = None,
+        hot_reload: bool = False,
+    ):
         self._port = port
+        self._uds_path = uds_path
+        self._hot_reload = hot_reload
         with open(config_path, encoding="utf-8") as config_file:
             self._config = yaml.safe_load(config_file)
 
     def start(self):
-        server = TrussServer(http_port=self._port, config=self._config)
+        server = TrussServer(
+            http_port=self._port,
+            config=self._config,
+            uds_path=self._uds_path,
+            hot_reload=self._hot_reload,
+        )
         server.start()
 
 
 if __name__ == "__main__":
     env_port = int(os.environ.get("INFERENCE_SERVER_PORT", "8080"))
-    ConfiguredTrussServer(CONFIG_FILE, env_port).start()
+    env_uds_path = os.environ.get("INFERENCE_SERVER_UDS_PATH")
+    env_hot_reload = (
+        os.environ.get("INFERENCE_SERVER_HOT_RELOAD", "false").lower() == "true"
+    )
+    ConfiguredTrussServer(CONFIG_FILE, env_port, env_uds_path, env_hot_reload).start()
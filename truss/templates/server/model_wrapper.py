@@ -1,7 +1,9 @@
 import asyncio
+import hashlib
 import importlib
 import inspect
 import logging
+import math
 import os
 import sys
 import time
@@ -14,9 +16,11 @@ from threading import Thread
 from typing import (
     Any,
     AsyncGenerator,
+    Awaitable,
     Callable,
     Coroutine,
     Dict,
+    List,
     NoReturn,
     Optional,
     Set,
@@ -25,21 +29,60 @@ from typing import (
 )
 
 import pydantic
-from anyio import Semaphore, to_thread
+from anyio import CapacityLimiter, to_thread
+from common.admission import (
+    AdmissionError,
+    PrioritySemaphore,
+    QueueFullError,
+    QueueTimeoutError,
+)
+from common.batching import (
+    DEFAULT_BATCH_MAX_WAIT_MS,
+    DEFAULT_MAX_BATCH_SIZE,
+    DynamicBatcher,
+)
+from common.errors import HotReloadUnavailable
+from common.metrics import (
+    ACTIVE_STREAMS,
+    BATCH_SIZE,
+    CANCELLED_STREAMS,
+    QUEUE_DEPTH,
+    REJECTED_REQUESTS,
+    RESPONSE_CACHE_EVICTIONS,
+    RESPONSE_CACHE_REQUESTS,
+    STAGE_DURATION,
+)
 from common.patches import apply_patches
+from common.response_cache import (
+    DEFAULT_RESPONSE_CACHE_MAX_BYTES,
+    DEFAULT_RESPONSE_CACHE_TTL_SECS,
+    CacheOutcome,
+    ResponseCache,
+)
 from common.retry import retry
 from common.schema import TrussSchema
+from common.streaming import (
+    DEFAULT_STREAMING_BUFFER_SIZE,
+    StreamBuffer,
+    SyncGeneratorPump,
+)
 from fastapi import HTTPException
 from pydantic import BaseModel
 from shared.lazy_data_resolver import LazyDataResolver
 from shared.secrets_resolver import SecretsResolver
+from shared.serialization import truss_msgpack_serialize
 from typing_extensions import ParamSpec
 
 MODEL_BASENAME = "model"
 
 NUM_LOAD_RETRIES = int(os.environ.get("NUM_LOAD_RETRIES_TRUSS", "1"))
 STREAMING_RESPONSE_QUEUE_READ_TIMEOUT_SECS = 60
+DISCONNECT_CHECK_INTERVAL_SECS = 1.0
 DEFAULT_PREDICT_CONCURRENCY = 1
+DEFAULT_SYNC_THREAD_POOL_SIZE = 40
+# Requests with a higher priority go ahead of others waiting for predict.
+PRIORITY_HEADER = "x-truss-priority"
+DEFAULT_RETRY_AFTER_SECS = 1
 
 
 class DeferredSemaphoreManager:
@@ -47,7 +90,7 @@ class DeferredSemaphoreManager:
     Helper class for supported deferred semaphore release.
     """
 
-    def __init__(self, semaphore: Semaphore):
+    def __init__(self, semaphore: PrioritySemaphore):
         self.semaphore = semaphore
         self.deferred = False
 
@@ -62,8 +105,41 @@ class DeferredSemaphoreManager:
         return self.semaphore.release
 
 
+async def _acquire_predict_slot(
+    semaphore: PrioritySemaphore,
+    num_requests: int = 1,
+    priority: int = 0,
+    max_queue_depth: Optional[int] = None,
+    timeout: Optional[float] = None,
+):
+    QUEUE_DEPTH.inc(num_requests)
+    try:
+        with STAGE_DURATION.time("predict_queue_wait"):
+            await semaphore.acquire(priority, max_queue_depth, timeout)
+    except AdmissionError as e:
+        raise _overloaded(e, timeout) from e
+    finally:
+        QUEUE_DEPTH.dec(num_requests)
+
+
+def _overloaded(error: AdmissionError, queue_wait_secs: Optional[float]):
+    if isinstance(error, QueueFullError):
+        status_code, reason = 429, "queue_full"
+    else:
+        status_code, reason = 503, "queue_timeout"
+    REJECTED_REQUESTS.inc(label=reason)
+    # Waiting about as long as a request may queue for gives the queue a
+    # chance to drain.
+    retry_after = max(DEFAULT_RETRY_AFTER_SECS, math.ceil(queue_wait_secs or 0))
+    return HTTPException(
+        status_code=status_code,
+        detail=f"Model is overloaded: {error}",
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
 @asynccontextmanager
-async def deferred_semaphore(semaphore: Semaphore):
+async def deferred_semaphore(semaphore: PrioritySemaphore, **acquire_kwargs):
     """
     Context manager that allows deferring the release of a semaphore.
     It yields a DeferredSemaphoreManager -- in your use of this context manager,
@@ -71,7 +147,7 @@ async def deferred_semaphore(semaphore: Semaphore):
     the semaphore that you must call.
     """
     semaphore_manager = DeferredSemaphoreManager(semaphore)
-    await semaphore.acquire()
+    await _acquire_predict_slot(semaphore, **acquire_kwargs)
 
     try:
         yield semaphore_manager
@@ -94,13 +170,42 @@ class ModelWrapper:
         self.ready = False
         self._load_lock = Lock()
         self._status = ModelWrapper.Status.NOT_READY
-        self._predict_semaphore = Semaphore(
+        self._predict_semaphore = PrioritySemaphore(
             self._config.get("runtime", {}).get(
                 "predict_concurrency", DEFAULT_PREDICT_CONCURRENCY
             )
         )
+        # Admission control, requests are rejected rather than queued for
+        # predict beyond these limits. Unlimited by default.
+        self._max_queue_depth: Optional[int] = self._config.get("runtime", {}).get(
+            "max_queue_depth"
+        )
+        max_queue_wait_ms = self._config.get("runtime", {}).get("max_queue_wait_ms")
+        self._max_queue_wait_secs: Optional[float] = (
+            None if max_queue_wait_ms is None else max_queue_wait_ms / 1000.0
+        )
         self._background_tasks: Set[asyncio.Task] = set()
+        self._response_cache: Optional[ResponseCache] = None
+        if self._config.get("runtime", {}).get("enable_response_cache", False):
+            runtime = self._config["runtime"]
+            self._response_cache = ResponseCache(
+                max_bytes=runtime.get(
+                    "response_cache_max_bytes", DEFAULT_RESPONSE_CACHE_MAX_BYTES
+                ),
+                ttl_secs=runtime.get(
+                    "response_cache_ttl_secs", DEFAULT_RESPONSE_CACHE_TTL_SECS
+                ),
+                on_evict=lambda reason: RESPONSE_CACHE_EVICTIONS.inc(label=reason),
+            )
+        self._batcher: Optional[DynamicBatcher] = None
+        self.num_cancelled_streams = 0
+        self._sync_thread_limiter: Optional[CapacityLimiter] = None
         self.truss_schema: TrussSchema = None
+        # For swapping in a reloaded model between requests, see `hot_reload`.
+        self._calls_in_flight = 0
+        self._calls_drained: Optional[asyncio.Event] = None
+        self._model_swapped: Optional[asyncio.Event] = None
+        self._hot_reload_lock: Optional[asyncio.Lock] = None
 
     def load(self) -> bool:
         if self.ready:
@@ -149,14 +254,35 @@ class ModelWrapper:
             bundled_packages_path = Path("/packages")
             if bundled_packages_path.exists():
                 sys.path.append(str(bundled_packages_path))
+        model_class = self._import_model_class()
+        apply_patches(
+            self._config.get("apply_library_patches", True),
+            self._config["requirements"],
+        )
+        self._model = self._create_model(model_class, data_dir)
+
+        self.set_truss_schema()
+        self.set_batcher()
+
+        if hasattr(self._model, "load"):
+            retry(
+                self._model.load,
+                NUM_LOAD_RETRIES,
+                self._logger.warn,
+                "Failed to load model.",
+                gap_seconds=1.0,
+            )
+
+    def _import_model_class(self) -> type:
         model_module_name = str(
             Path(self._config["model_class_filename"]).with_suffix("")
         )
-
         module = importlib.import_module(
             f"{self._config['model_module_dir']}.{model_module_name}"
         )
-        model_class = getattr(module, self._config["model_class_name"])
+        return getattr(module, self._config["model_class_name"])
+
+    def _create_model(self, model_class: type, data_dir: Path) -> Any:
         model_class_signature = inspect.signature(model_class)
         model_init_params = {}
         if _signature_accepts_keyword_arg(model_class_signature, "config"):
@@ -167,24 +293,100 @@ class ModelWrapper:
             model_init_params["secrets"] = SecretsResolver.get_secrets(self._config)
         if _signature_accepts_keyword_arg(model_class_signature, "lazy_data_resolver"):
             model_init_params["lazy_data_resolver"] = LazyDataResolver(data_dir).fetch()
-        apply_patches(
-            self._config.get("apply_library_patches", True),
-            self._config["requirements"],
-        )
-        self._model = model_class(**model_init_params)
+        return model_class(**model_init_params)
 
-        self.set_truss_schema()
+    async def hot_reload(self):
+        """Swap in a model created from the current model code.
 
-        if hasattr(self._model, "load"):
-            retry(
-                self._model.load,
-                NUM_LOAD_RETRIES,
-                self._logger.warn,
-                "Failed to load model.",
-                gap_seconds=1.0,
+        Instead of loading, the new model takes over what the running one has
+        loaded, e.g. weights, through its `reload(previous_model)` hook, so
+        that a code change doesn't wait for a full load. The swap happens
+        between requests: new requests wait while those in flight finish with
+        the running model. Streams that have started keep generating with it.
+
+        Raises:
+            HotReloadUnavailable: If the model can't be swapped in place, in
+                which case the running one is kept.
+        """
+        if self._status != ModelWrapper.Status.READY:
+            raise HotReloadUnavailable("Model isn't loaded")
+        if self._config.get("runtime", {}).get("num_workers", 1) > 1:
+            # Only the server process that got the request would reload.
+            raise HotReloadUnavailable("Model runs in multiple server processes")
+
+        if self._hot_reload_lock is None:
+            self._hot_reload_lock = asyncio.Lock()
+        async with self._hot_reload_lock:
+            start_time = time.perf_counter()
+            # Imported afresh along with the rest of the model package, which
+            # the model module may import from.
+            package_name = self._config["model_module_dir"]
+            previous_modules = _pop_package_modules(package_name)
+            try:
+                new_model = await self._reloaded_model()
+            except BaseException:
+                # Later imports by the running model resolve to its own code.
+                _pop_package_modules(package_name)
+                sys.modules.update(previous_modules)
+                raise
+
+            await self._swap_model(new_model)
+            self._logger.info(
+                f"Completed model.reload() execution in {_elapsed_ms(start_time)} ms"
+            )
+
+    async def _reloaded_model(self) -> Any:
+        try:
+            importlib.invalidate_caches()
+            model_class = await self._run_in_thread(self._import_model_class)
+            new_model = await self._run_in_thread(
+                self._create_model, model_class, Path("data")
             )
+        except Exception as exc:
+            raise HotReloadUnavailable(
+                f"Failed to create model from the new code: {exc}"
+            ) from exc
+        if not hasattr(new_model, "reload"):
+            raise HotReloadUnavailable("Model doesn't define reload")
+        if hasattr(new_model, "predict_batch") != hasattr(self._model, "predict_batch"):
+            raise HotReloadUnavailable("Model changes whether it batches")
+
+        try:
+            if inspect.iscoroutinefunction(new_model.reload):
+                await new_model.reload(self._model)
+            else:
+                await self._run_in_thread(new_model.reload, self._model)
+        except Exception as exc:
+            self._logger.exception("Exception while reloading model")
+            raise HotReloadUnavailable(f"model.reload() failed: {exc}") from exc
+        return new_model
+
+    async def _swap_model(self, new_model: Any):
+        model_swapped = asyncio.Event()
+        self._model_swapped = model_swapped
+        try:
+            while self._calls_in_flight > 0:
+                self._calls_drained = asyncio.Event()
+                await self._calls_drained.wait()
+            self._model = new_model
+            self.truss_schema = None
+            self.set_truss_schema()
+            if self._response_cache is not None:
+                # Responses of the previous code.
+                self._response_cache.clear()
+        finally:
+            self._model_swapped = None
+            self._calls_drained = None
+            model_swapped.set()
 
     def set_truss_schema(self):
+        if not hasattr(self._model, "predict") and not (
+            hasattr(self._model, "preprocess") and hasattr(self._model, "postprocess")
+        ):
+            # Models that only implement `predict_batch` have no per-request
+            # signature to derive a schema from.
+            return
+
         parameters = (
             inspect.signature(self._model.preprocess).parameters
             if hasattr(self._model, "preprocess")
@@ -199,6 +401,76 @@ class ModelWrapper:
 
         self.truss_schema = TrussSchema.from_signature(parameters, outputs_annotation)
 
+    def set_batcher(self):
+        if not hasattr(self._model, "predict_batch"):
+            return
+
+        runtime = self._config.get("runtime", {})
+        self._batcher = DynamicBatcher(
+            self.predict_batch,
+            max_batch_size=runtime.get("max_batch_size", DEFAULT_MAX_BATCH_SIZE),
+            max_wait_ms=runtime.get("max_wait_ms", DEFAULT_BATCH_MAX_WAIT_MS),
+            acquire_slot=self._acquire_batch_slot,
+            release_slot=self._predict_semaphore.release,
+        )
+
+    async def _acquire_batch_slot(self):
+        # The batcher keeps adding requests to the batch while it waits.
+        with STAGE_DURATION.time("predict_queue_wait"):
+            await self._predict_semaphore.acquire()
+
+    @property
+    def batching_enabled(self) -> bool:
+        return self._batcher is not None
+
+    def batch_size_distribution(self) -> Dict[int, int]:
+        if self._batcher is None:
+            return {}
+        return self._batcher.batch_size_distribution()
+
+    def queue_depth(self) -> int:
+        """Number of requests waiting for predict."""
+        if self._batcher is not None:
+            # Only the batcher waits for the predict semaphore, on behalf of
+            # the requests in the batch it gathers.
+            return self._batcher.pending()
+        return self._predict_semaphore.queue_depth
+
+    def _check_queue_depth(self):
+        # Rejects before spending time on validation and preprocessing, the
+        # limit is enforced again when queueing for predict.
+        if self._max_queue_depth is not None:
+            depth = self.queue_depth()
+            if depth >= self._max_queue_depth:
+                raise _overloaded(
+                    QueueFullError(f"{depth} requests are already queued"),
+                    self._max_queue_wait_secs,
+                )
+
+    @staticmethod
+    def _priority(headers: Optional[Dict[str, str]]) -> int:
+        if not headers or PRIORITY_HEADER not in headers:
+            return 0
+        try:
+            return int(headers[PRIORITY_HEADER])
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid {PRIORITY_HEADER} header, must be an integer",
+            )
+
+    async def _run_in_thread(self, func: Callable[..., Any], *args: Any) -> Any:
+        # Sync preprocess/predict/postprocess get their own limiter, rather than
+        # sharing anyio's default one, which is also used by other libraries.
+        # It's created lazily, since it has to be created in the event loop.
+        if self._sync_thread_limiter is None:
+            self._sync_thread_limiter = CapacityLimiter(
+                self._config.get("runtime", {}).get(
+                    "sync_thread_pool_size", DEFAULT_SYNC_THREAD_POOL_SIZE
+                )
+            )
+        return await to_thread.run_sync(func, *args, limiter=self._sync_thread_limiter)
+
     async def preprocess(
         self,
         payload: Any,
@@ -210,7 +482,7 @@ class ModelWrapper:
         if inspect.iscoroutinefunction(self._model.preprocess):
             return await _intercept_exceptions_async(self._model.preprocess)(payload)
         else:
-            return await to_thread.run_sync(
+            return await self._run_in_thread(
                 _intercept_exceptions_sync(self._model.preprocess), payload
             )
 
@@ -235,10 +507,23 @@ class ModelWrapper:
         if inspect.iscoroutinefunction(self._model.predict):
             return await _intercept_exceptions_async(self._model.predict)(payload)
 
-        return await to_thread.run_sync(
+        return await self._run_in_thread(
             _intercept_exceptions_sync(self._model.predict), payload
         )
 
+    async def predict_batch(self, payloads: List[Any]) -> List[Any]:
+        # Called by the batcher with the preprocessed payloads of several
+        # concurrent requests. The batcher holds the predict semaphore per
+        # batch, so `predict_concurrency` bounds the number of batches in
+        # flight.
+        BATCH_SIZE.observe(len(payloads))
+        with STAGE_DURATION.time("predict"):
+            if inspect.iscoroutinefunction(self._model.predict_batch):
+                results = await self._model.predict_batch(payloads)
+            else:
+                results = await self._run_in_thread(self._model.predict_batch, payloads)
+        return list(results)
+
     async def postprocess(
         self,
         response: Any,
@@ -261,53 +546,155 @@ class ModelWrapper:
         if inspect.iscoroutinefunction(self._model.postprocess):
             return await _intercept_exceptions_async(self._model.postprocess)(response)
 
-        return await to_thread.run_sync(
+        return await self._run_in_thread(
             _intercept_exceptions_sync(self._model.postprocess), response
         )
 
     async def write_response_to_queue(
-        self, queue: asyncio.Queue, generator: AsyncGenerator
+        self, queue: StreamBuffer, generator: AsyncGenerator
     ):
         try:
             async for chunk in generator:
-                await queue.put(ResponseChunk(chunk))
+                await queue.put(chunk)
+        except asyncio.CancelledError:
+            self._record_cancelled_stream()
+            self._logger.info("Client disconnected, cancelled stream response.")
+            raise
         except Exception as e:
             self._logger.exception("Exception while reading stream response: " + str(e))
         finally:
-            await queue.put(None)
+            # Closing the generator runs the user's cleanup (e.g. `finally`
+            # blocks) right away, rather than whenever it's garbage collected.
+            await generator.aclose()
+            queue.close()
+
+    async def _cancel_on_disconnect(
+        self, task: asyncio.Task, is_disconnected: Callable[[], Awaitable[bool]]
+    ):
+        while not task.done():
+            if await is_disconnected():
+                task.cancel()
+                return
+            await asyncio.sleep(DISCONNECT_CHECK_INTERVAL_SECS)
+
+    def _record_cancelled_stream(self):
+        self.num_cancelled_streams += 1
+        CANCELLED_STREAMS.inc()
+
+    def _watch_for_disconnect(
+        self,
+        task: asyncio.Task,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]],
+    ):
+        if is_disconnected is None:
+            return
+        watcher = asyncio.create_task(self._cancel_on_disconnect(task, is_disconnected))
+        self._background_tasks.add(watcher)
+        watcher.add_done_callback(self._background_tasks.discard)
+        task.add_done_callback(lambda _: watcher.cancel())
 
     async def __call__(
-        self, body: Any, headers: Optional[Dict[str, str]] = None
+        self,
+        body: Any,
+        headers: Optional[Dict[str, str]] = None,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
     ) -> Union[Dict, Generator]:
         """Method to call predictor or explainer with the given input.
 
         Args:
             body (Any): Request payload body.
             headers (Dict): Request headers.
+            is_disconnected (Callable): Returns whether the client has gone away,
+                used to cancel streaming responses that nobody will read.
 
         Returns:
             Dict: Response output from preprocess -> predictor -> postprocess
             Generator: In case of streaming response
         """
+        # Requests wait while a reloaded model is swapped in, see `hot_reload`.
+        while self._model_swapped is not None:
+            await self._model_swapped.wait()
+        self._calls_in_flight += 1
+        try:
+            return await self._handle_call(body, headers, is_disconnected)
+        finally:
+            self._calls_in_flight -= 1
+            if self._calls_in_flight == 0 and self._calls_drained is not None:
+                self._calls_drained.set()
 
-        # The streaming read timeout is the amount of time in between streamed chunks before a timeout is triggered
-        streaming_read_timeout = self._config.get("runtime", {}).get(
-            "streaming_read_timeout", STREAMING_RESPONSE_QUEUE_READ_TIMEOUT_SECS
-        )
+    async def _handle_call(
+        self,
+        body: Any,
+        headers: Optional[Dict[str, str]],
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]],
+    ) -> Union[Dict, Generator]:
+        priority = self._priority(headers)
+        self._check_queue_depth()
 
         if self.truss_schema is not None:
             try:
-                body = self.truss_schema.input_type(**body)
+                with STAGE_DURATION.time("schema_validation"):
+                    body = self.truss_schema.input_type(**body)
             except pydantic.ValidationError as e:
                 self._logger.info("Request Validation Error")
                 raise HTTPException(
                     status_code=400, detail=f"Request Validation Error, {str(e)}"
                 ) from e
 
-        payload = await self.preprocess(body, headers)
+        cache_key = None
+        if self._response_cache is not None:
+            cache_key = _response_cache_key(body, headers)
+        if cache_key is None:
+            return await self._call(body, headers, priority, is_disconnected)
+
+        response, outcome = await self._response_cache.get_or_compute(
+            cache_key,
+            lambda: self._call(body, headers, priority, is_disconnected),
+            _cached_response_size,
+        )
+        RESPONSE_CACHE_REQUESTS.inc(label=outcome.value)
+        if outcome == CacheOutcome.COALESCED and _is_stream(response):
+            # A stream can only be read by the request that started it.
+            return await self._call(body, headers, priority, is_disconnected)
+        return response
+
+    async def _call(
+        self,
+        body: Any,
+        headers: Optional[Dict[str, str]],
+        priority: int,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]],
+    ) -> Union[Dict, Generator]:
+        runtime = self._config.get("runtime", {})
+        # The streaming read timeout is the amount of time in between streamed chunks before a timeout is triggered
+        streaming_read_timeout = runtime.get(
+            "streaming_read_timeout", STREAMING_RESPONSE_QUEUE_READ_TIMEOUT_SECS
+        )
+
+        with STAGE_DURATION.time("preprocess"):
+            payload = await self.preprocess(body, headers)
 
-        async with deferred_semaphore(self._predict_semaphore) as semaphore_manager:
-            response = await self.predict(payload, headers)
+        if self._batcher is not None:
+            try:
+                response = await self._batcher.submit(
+                    payload, priority=priority, timeout=self._max_queue_wait_secs
+                )
+            except asyncio.TimeoutError as e:
+                raise _overloaded(
+                    QueueTimeoutError(str(e)), self._max_queue_wait_secs
+                ) from e
+            except Exception as e:
+                _handle_exception(e)
+            return await self._postprocess_response(response)
+
+        async with deferred_semaphore(
+            self._predict_semaphore,
+            priority=priority,
+            max_queue_depth=self._max_queue_depth,
+            timeout=self._max_queue_wait_secs,
+        ) as semaphore_manager:
+            with STAGE_DURATION.time("predict"):
+                response = await self.predict(payload, headers)
 
             # Streaming cases
             if inspect.isgenerator(response) or inspect.isasyncgen(response):
@@ -317,20 +704,50 @@ class ModelWrapper:
                         "Note that in this case, the postprocess will run within the predict lock."
                     )
 
-                    response = await self.postprocess(response)
+                    with STAGE_DURATION.time("postprocess"):
+                        response = await self.postprocess(response)
 
-                async_generator = _force_async_generator(response)
+                async_generator = _force_async_generator(
+                    response,
+                    max_pending=runtime.get(
+                        "streaming_buffer_size", DEFAULT_STREAMING_BUFFER_SIZE
+                    ),
+                )
 
                 if headers and headers.get("accept") == "application/json":
                     # In the case of a streaming response, consume stream
                     # if the http accept header is set, and json is requested.
-                    return await _convert_streamed_response_to_string(async_generator)
+                    consume_task = asyncio.create_task(
+                        _convert_streamed_response_to_string(async_generator)
+                    )
+                    self._watch_for_disconnect(consume_task, is_disconnected)
+                    _track_active_stream(consume_task)
+                    try:
+                        return await consume_task
+                    except asyncio.CancelledError:
+                        if not consume_task.done():
+                            # This request itself got cancelled.
+                            consume_task.cancel()
+                            raise
+                        self._record_cancelled_stream()
+                        raise HTTPException(
+                            status_code=499, detail="Client disconnected"
+                        )
 
-                # To ensure that a partial read from a client does not cause the semaphore
-                # to stay claimed, we immediately write all of the data from the stream to a
-                # queue. We then return a new generator that reads from the queue, and then
-                # exit the semaphore block.
-                response_queue: asyncio.Queue = asyncio.Queue()
+                # The stream is written to a bounded buffer by a background task, and
+                # we return a new generator that reads from the buffer, and then exit
+                # the semaphore block. The semaphore is released once the whole stream
+                # has been buffered, so a client that reads slower than the model
+                # generates holds it only while more than `streaming_buffer_size`
+                # chunks are pending.
+                response_queue = StreamBuffer(
+                    maxsize=runtime.get(
+                        "streaming_buffer_size", DEFAULT_STREAMING_BUFFER_SIZE
+                    ),
+                    read_timeout=streaming_read_timeout,
+                    coalesce_bytes=runtime.get("streaming_coalesce_bytes", 0),
+                    flush_interval_ms=runtime.get("streaming_flush_interval_ms", 0),
+                )
 
                 # This task will be triggered and run in the background.
                 task = asyncio.create_task(
@@ -347,21 +764,32 @@ class ModelWrapper:
                 semaphore_release_function = semaphore_manager.defer()
                 task.add_done_callback(lambda _: semaphore_release_function())
                 task.add_done_callback(self._background_tasks.discard)
+                self._watch_for_disconnect(task, is_disconnected)
+                _track_active_stream(task)
 
                 # The gap between responses in a stream must be < streaming_read_timeout
                 async def _response_generator():
-                    while True:
-                        chunk = await asyncio.wait_for(
-                            response_queue.get(),
-                            timeout=streaming_read_timeout,
-                        )
-                        if chunk is None:
-                            return
-                        yield chunk.value
+                    try:
+                        while True:
+                            try:
+                                chunk = await response_queue.get()
+                            except StopAsyncIteration:
+                                return
+                            yield chunk
+                    finally:
+                        response_queue.cancel_timers()
+                        # If the response stops being read before the end of the
+                        # stream, e.g. because the client disconnected and the
+                        # streaming response got cancelled, stop generating.
+                        task.cancel()
 
                 return _response_generator()
 
-        processed_response = await self.postprocess(response)
+        return await self._postprocess_response(response)
+
+    async def _postprocess_response(self, response: Any) -> Any:
+        with STAGE_DURATION.time("postprocess"):
+            processed_response = await self.postprocess(response)
 
         if isinstance(processed_response, BaseModel):
             # If we return a pydantic object, convert it back to a dict
@@ -369,39 +797,64 @@ class ModelWrapper:
         return processed_response
 
 
-class ResponseChunk:
-    def __init__(self, value):
-        self.value = value
+def _pop_package_modules(package_name: str) -> Dict[str, Any]:
+    """Removes the modules of a package from `sys.modules` and returns them."""
+    return {
+        module_name: sys.modules.pop(module_name)
+        for module_name in list(sys.modules)
+        if module_name == package_name or module_name.startswith(f"{package_name}.")
+    }
+
+
+def _is_stream(response: Any) -> bool:
+    return inspect.isgenerator(response) or inspect.isasyncgen(response)
+
+
+def _response_cache_key(body: Any, headers: Optional[Dict[str, str]]) -> Optional[str]:
+    """Hash of the validated input, or None if it can't be serialized."""
+    if isinstance(body, BaseModel):
+        body = body.dict()
+    # Streamed responses are consumed into a string when JSON is accepted.
+    accept = headers.get("accept") if headers else None
+    try:
+        serialized = truss_msgpack_serialize([accept, body])
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha256(serialized).hexdigest()
+
+
+def _cached_response_size(response: Any) -> Optional[int]:
+    if _is_stream(response):
+        return None
+    try:
+        return len(truss_msgpack_serialize(response))
+    except (TypeError, ValueError):
+        return None
+
+
+def _track_active_stream(task: asyncio.Task):
+    ACTIVE_STREAMS.inc()
+    task.add_done_callback(lambda _: ACTIVE_STREAMS.dec())
 
 
 async def _convert_streamed_response_to_string(response: AsyncGenerator):
     return "".join([str(chunk) async for chunk in response])
 
 
-def _force_async_generator(gen: Union[Generator, AsyncGenerator]) -> AsyncGenerator:
+def _force_async_generator(
+    gen: Union[Generator, AsyncGenerator],
+    max_pending: int = DEFAULT_STREAMING_BUFFER_SIZE,
+) -> AsyncGenerator:
     """
     Takes a generator, and converts it into an async generator if it is not already.
+
+    Sync generators are driven by a dedicated thread per stream, to ensure the
+    main loop is not blocked by anything blocking in the generator.
     """
     if inspect.isasyncgen(gen):
         return gen
 
-    async def _convert_generator_to_async():
-        """
-        Runs each iteration of the generator in an offloaded thread, to ensure
-        the main loop is not blocked, and yield to create an async generator.
-        """
-        FINAL_GENERATOR_VALUE = object()
-        while True:
-            # Note that this is the equivalent of running:
-            # next(gen, FINAL_GENERATOR_VALUE) on a separate thread,
-            # ensuring that if there is anything blocking in the generator,
-            # it does not block the main loop.
-            chunk = await to_thread.run_sync(next, gen, FINAL_GENERATOR_VALUE)
-            if chunk == FINAL_GENERATOR_VALUE:
-                break
-            yield chunk
-
-    return _convert_generator_to_async()
+    return SyncGeneratorPump(gen, max_pending=max_pending).stream()
 
 
 def _signature_accepts_keyword_arg(signature: inspect.Signature, kwarg: str) -> bool:
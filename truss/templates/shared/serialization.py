@@ -1,8 +1,14 @@
 import json
+import re
 import uuid
 from datetime import date, datetime, time, timedelta
 from decimal import Decimal
-from typing import Any, Callable, Dict, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
 
 
 # mostly cribbed from django.core.serializer.DjangoJSONEncoder
@@ -102,3 +108,123 @@ class DeepNumpyEncoder(json.JSONEncoder):
             return obj.tolist()
         else:
             return super(DeepNumpyEncoder, self).default(obj)
+
+
+# Formatting differences between orjson and `float.__repr__`, which is what
+# the stdlib json encoder uses. orjson writes exponents as `e16`/`e-7` where
+# repr writes `e+16`/`e-07`, and writes values in [1e-5, 1e-4) positionally
+# where repr switches to scientific notation. Everything else, including the
+# shortest round-trip digits, is identical.
+_ORJSON_EXPONENT_RE = re.compile(rb"e(-?)(\d+)")
+_ORJSON_SMALL_FLOAT_RE = re.compile(rb"(?<![\d.])0\.0000([1-9])(\d*)")
+_NDARRAY_PLACEHOLDER_RE = re.compile(r'"__truss_ndarray_([0-9a-f]{32})_(\d+)__"')
+
+
+def _repr_exponent(match: "re.Match") -> bytes:
+    return b"e" + (match.group(1) or b"+") + match.group(2).rjust(2, b"0")
+
+
+def _repr_small_float(match: "re.Match") -> bytes:
+    fraction = b"." + match.group(2) if match.group(2) else b""
+    return match.group(1) + fraction + b"e-05"
+
+
+def _orjson_encode_ndarray(obj) -> Optional[bytes]:
+    """
+    Encode a numeric array directly with orjson, producing the same bytes as
+    `json.dumps(obj.tolist())`. Returns None if the array can't be encoded
+    this way, in which case callers should fall back to `tolist()`.
+    """
+    import numpy as np
+
+    if obj.ndim == 0 or obj.dtype.kind not in "biuf":
+        return None
+    if obj.dtype.kind == "f":
+        # `tolist()` converts to python floats, i.e. doubles, so the digits
+        # printed for e.g. float32 are those of the widened value.
+        obj = obj.astype(np.float64, copy=False)
+        # The stdlib encoder writes NaN/Infinity, orjson writes null.
+        if not np.isfinite(obj).all():
+            return None
+
+    try:
+        encoded = orjson.dumps(
+            np.ascontiguousarray(obj), option=orjson.OPT_SERIALIZE_NUMPY
+        )
+    except orjson.JSONEncodeError:
+        return None
+
+    if obj.dtype.kind == "f":
+        if b"e" in encoded:
+            encoded = _ORJSON_EXPONENT_RE.sub(_repr_exponent, encoded)
+        if b"0.0000" in encoded:
+            encoded = _ORJSON_SMALL_FLOAT_RE.sub(_repr_small_float, encoded)
+    # Numeric arrays contain no strings, so every comma is a separator.
+    return encoded.replace(b",", b", ")
+
+
+class _FastNumpyEncoder(DeepNumpyEncoder):
+    """
+    Like DeepNumpyEncoder, but numeric arrays are encoded by orjson and
+    spliced into the output, instead of being converted to nested python
+    lists first. The stdlib encoder still walks the rest of the object, so
+    the output is byte-for-byte what DeepNumpyEncoder produces.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._token = uuid.uuid4().hex
+        self.encoded_arrays: List[str] = []
+
+    def default(self, obj):
+        import numpy as np
+
+        if isinstance(obj, np.ndarray):
+            encoded = _orjson_encode_ndarray(obj)
+            if encoded is not None:
+                self.encoded_arrays.append(encoded.decode("ascii"))
+                return f"__truss_ndarray_{self._token}_{len(self.encoded_arrays) - 1}__"
+        return super().default(obj)
+
+    def splice(self, output: str) -> str:
+        if not self.encoded_arrays:
+            return output
+
+        def _replace(match: "re.Match") -> str:
+            if match.group(1) != self._token:
+                return match.group(0)
+            return self.encoded_arrays[int(match.group(2))]
+
+        return _NDARRAY_PLACEHOLDER_RE.sub(_replace, output)
+
+
+def truss_json_serialize(obj: Any) -> bytes:
+    """
+    Serialize a predict response to JSON bytes.
+
+    The output is identical to `json.dumps(obj, cls=DeepNumpyEncoder)`, but
+    numpy arrays are encoded natively when orjson is available, without a
+    `tolist()` round trip.
+    """
+    if orjson is None:
+        return json.dumps(obj, cls=DeepNumpyEncoder).encode("utf-8")
+
+    encoder = _FastNumpyEncoder()
+    return encoder.splice(encoder.encode(obj)).encode("utf-8")
+
+
+def truss_json_deserialize(data: Union[bytes, str]) -> Any:
+    """
+    Deserialize a JSON request body, straight from the raw bytes.
+
+    orjson is stricter than the stdlib decoder, e.g. it rejects `NaN` and
+    integers that don't fit in 64 bits, so such payloads are decoded with the
+    stdlib decoder to keep accepting everything that was accepted before.
+    Raises `json.JSONDecodeError` on invalid JSON.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
@@ -0,0 +1,89 @@
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+from truss.contexts.image_builder.build_context_cache import BuildContextCache
+from truss.contexts.image_builder.serving_image_builder import (
+    BUILD_DIR_LINK_MIN_SIZE,
+    ServingImageBuilderContext,
+)
+
+
+def _prepare_fn(calls):
+    def prepare(build_dir: Path):
+        calls.append(build_dir)
+        (build_dir / "Dockerfile").write_text("FROM scratch")
+
+    return prepare
+
+
+def test_reuse_context(tmp_path):
+    cache = BuildContextCache(tmp_path)
+    calls: list = []
+
+    context_dir = cache.get_or_create("key", _prepare_fn(calls))
+    assert cache.get_or_create("key", _prepare_fn(calls)) == context_dir
+    assert len(calls) == 1
+    assert (context_dir / "Dockerfile").read_text() == "FROM scratch"
+
+
+def test_modified_context_is_rebuilt(tmp_path):
+    cache = BuildContextCache(tmp_path)
+    calls: list = []
+    context_dir = cache.get_or_create("key", _prepare_fn(calls))
+
+    (context_dir / "Dockerfile").write_text("FROM changed")
+
+    assert cache.get_or_create("key", _prepare_fn(calls)) == context_dir
+    assert len(calls) == 2
+    assert (context_dir / "Dockerfile").read_text() == "FROM scratch"
+
+
+def test_failed_prepare_leaves_nothing(tmp_path):
+    cache = BuildContextCache(tmp_path)
+
+    def prepare(build_dir: Path):
+        raise RuntimeError()
+
+    try:
+        cache.get_or_create("key", prepare)
+    except RuntimeError:
+        pass
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_least_recently_used_contexts_removed(tmp_path):
+    cache = BuildContextCache(tmp_path, max_contexts=2)
+    calls: list = []
+    first = cache.get_or_create("first", _prepare_fn(calls))
+    second = cache.get_or_create("second", _prepare_fn(calls))
+    os.utime(first, (0, 0))
+
+    third = cache.get_or_create("third", _prepare_fn(calls))
+
+    assert not first.exists()
+    assert second.exists()
+    assert third.exists()
+
+
+def test_serving_image_build_dir_reused(custom_model_truss_dir, tmp_path):
+    weights = custom_model_truss_dir / "data" / "weights.bin"
+    weights.parent.mkdir(exist_ok=True)
+    weights.write_bytes(b"\0" * BUILD_DIR_LINK_MIN_SIZE)
+    config = (custom_model_truss_dir / "config.yaml").read_text()
+
+    with patch(
+        "truss.local.local_config_handler.LocalConfigHandler.TRUSS_CONFIG_DIR",
+        tmp_path / ".truss",
+    ):
+        image_builder = ServingImageBuilderContext.run(custom_model_truss_dir)
+        build_dir = image_builder.prepare_image_build_dir()
+        assert image_builder.prepare_image_build_dir() == build_dir
+        assert (build_dir / "data" / "weights.bin").read_bytes() == weights.read_bytes()
+        # Files written to in the build dir are not linked to the truss.
+        assert (custom_model_truss_dir / "config.yaml").read_text() == config
+
+        (custom_model_truss_dir / "model" / "model.py").write_text("# changed")
+        changed_build_dir = image_builder.prepare_image_build_dir()
+        assert changed_build_dir != build_dir
+        assert (changed_build_dir / "model" / "model.py").read_text() == "# changed"
@@ -0,0 +1,183 @@
+import os
+import sys
+import time
+import types
+
+import pytest
+from truss.contexts.local_loader import model_session
+from truss.truss_handle import TrussHandle
+from truss.util import mtime_tracker
+
+COUNTING_MODEL_CODE = """
+NUM_LOADS = 0
+
+class Model:
+    def load(self):
+        global NUM_LOADS
+        NUM_LOADS += 1
+        self.num_loads = NUM_LOADS
+
+    def predict(self, request):
+        return {"x": request["x"], "num_loads": self.num_loads, "version": 1}
+"""
+
+ASYNC_STREAMING_MODEL_CODE = """
+class Model:
+    async def predict(self, request):
+        async def stream():
+            for i in range(request["n"]):
+                yield str(i)
+        return stream()
+"""
+
+FAILING_MODEL_CODE = """
+class Model:
+    def predict(self, request):
+        raise ValueError("bad request")
+"""
+
+
+def _write_model(truss_dir, code):
+    model_file = TrussHandle(truss_dir).spec.model_class_filepath
+    model_file.write_text(code)
+    # Make sure the truss counts as changed, even on coarse mtime filesystems.
+    mod_time = time.time() + 10
+    os.utime(model_file, (mod_time, mod_time))
+
+
+def test_model_is_loaded_once_and_reloaded_on_change(
+    custom_model_truss_dir, monkeypatch
+):
+    # Check for changes on every prediction, by walking the truss.
+    monkeypatch.setattr(model_session, "CHANGE_CHECK_TTL_SECS", 0)
+    monkeypatch.setenv(mtime_tracker.DISABLE_FILE_EVENTS_ENV_VAR, "1")
+    _write_model(custom_model_truss_dir, COUNTING_MODEL_CODE)
+    handle = TrussHandle(custom_model_truss_dir)
+
+    assert handle.server_predict({"x": 1}) == {"x": 1, "num_loads": 1, "version": 1}
+    assert handle.server_predict({"x": 2}) == {"x": 2, "num_loads": 1, "version": 1}
+
+    _write_model(
+        custom_model_truss_dir,
+        COUNTING_MODEL_CODE.replace('"version": 1', '"version": 2'),
+    )
+    assert handle.server_predict({"x": 3}) == {"x": 3, "num_loads": 1, "version": 2}
+    handle.local_session.close()
+
+
+def test_truss_is_not_walked_on_every_prediction(custom_model_truss_dir, monkeypatch):
+    _write_model(custom_model_truss_dir, COUNTING_MODEL_CODE)
+    num_walks = 0
+    get_max_modified_time_of_dir = mtime_tracker.get_max_modified_time_of_dir
+
+    def counting_get_max_modified_time_of_dir(path):
+        nonlocal num_walks
+        num_walks += 1
+        return get_max_modified_time_of_dir(path)
+
+    monkeypatch.setattr(
+        mtime_tracker,
+        "get_max_modified_time_of_dir",
+        counting_get_max_modified_time_of_dir,
+    )
+    handle = TrussHandle(custom_model_truss_dir)
+
+    for x in range(100):
+        assert handle.server_predict({"x": x})["x"] == x
+    assert num_walks == 1
+
+    # Writes through the handle are noticed right away.
+    handle.update_examples([])
+    handle.server_predict({"x": 0})
+    assert num_walks == 2
+    handle.local_session.close()
+
+
+def test_changes_are_noticed_through_file_events(custom_model_truss_dir, monkeypatch):
+    monkeypatch.setattr(model_session, "CHANGE_CHECK_TTL_SECS", 0.05)
+    monkeypatch.delenv(mtime_tracker.DISABLE_FILE_EVENTS_ENV_VAR, raising=False)
+    model_file = TrussHandle(custom_model_truss_dir).spec.model_class_filepath
+    model_file.write_text(COUNTING_MODEL_CODE)
+    # So that the edit below is the latest change, even on coarse mtime
+    # filesystems.
+    mod_time = time.time() - 10
+    os.utime(model_file, (mod_time, mod_time))
+    num_walks = 0
+    get_max_modified_time_of_dir = mtime_tracker.get_max_modified_time_of_dir
+
+    def counting_get_max_modified_time_of_dir(path):
+        nonlocal num_walks
+        num_walks += 1
+        return get_max_modified_time_of_dir(path)
+
+    monkeypatch.setattr(
+        mtime_tracker,
+        "get_max_modified_time_of_dir",
+        counting_get_max_modified_time_of_dir,
+    )
+    session = TrussHandle(custom_model_truss_dir).local_session
+
+    assert session.predict({"x": 1})["version"] == 1
+    time.sleep(0.1)
+    # Used for longer than the TTL, the session starts watching the truss.
+    assert session.predict({"x": 1})["version"] == 1
+    time.sleep(0.5)
+
+    model_file.write_text(COUNTING_MODEL_CODE.replace('"version": 1', '"version": 2'))
+    time.sleep(0.5)
+    assert session.predict({"x": 1})["version"] == 2
+    assert num_walks == 2
+    session.close()
+
+
+def test_predict_many(custom_model_truss_dir):
+    _write_model(custom_model_truss_dir, COUNTING_MODEL_CODE)
+    session = TrussHandle(custom_model_truss_dir).local_session
+
+    responses = session.predict_many([{"x": x} for x in range(100)], concurrency=8)
+
+    assert responses == [{"x": x, "num_loads": 1, "version": 1} for x in range(100)]
+    session.close()
+
+
+def test_async_streaming_model(custom_model_truss_dir):
+    _write_model(custom_model_truss_dir, ASYNC_STREAMING_MODEL_CODE)
+    session = TrussHandle(custom_model_truss_dir).local_session
+
+    assert list(session.predict({"n": 3})) == ["0", "1", "2"]
+    assert [list(stream) for stream in session.predict_many([{"n": 1}, {"n": 2}])] == [
+        ["0"],
+        ["0", "1"],
+    ]
+    session.close()
+
+
+def test_model_errors_are_raised(custom_model_truss_dir):
+    _write_model(custom_model_truss_dir, FAILING_MODEL_CODE)
+    session = TrussHandle(custom_model_truss_dir).local_session
+
+    with pytest.raises(ValueError, match="bad request"):
+        session.predict({})
+    session.close()
+
+
+def test_server_modules_are_not_exposed(custom_model_truss_dir, monkeypatch):
+    _write_model(custom_model_truss_dir, COUNTING_MODEL_CODE)
+    # Imported afresh, while the caller has a `common` module of its own.
+    monkeypatch.setattr(model_session, "_model_wrapper_module", None)
+    sys_path = list(sys.path)
+    user_common = types.ModuleType("common")
+    monkeypatch.setitem(sys.modules, "common", user_common)
+    # Other tests may have imported the server code themselves.
+    module_names = set(sys.modules)
+
+    session = TrussHandle(custom_model_truss_dir).local_session
+    assert session.predict({"x": 1})["x"] == 1
+    session.close()
+
+    assert sys.path == sys_path
+    assert sys.modules["common"] is user_common
+    assert not any(
+        name.startswith("common.") or name in ("shared", "model_wrapper")
+        for name in set(sys.modules) - module_names
+    )
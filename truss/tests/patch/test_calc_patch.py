@@ -53,6 +53,25 @@ def test_calc_truss_patch_add_file(custom_model_truss_dir: Path):
     )
 
 
+def test_calc_truss_patch_add_binary_file(custom_model_truss_dir: Path):
+    prev_sign = calc_truss_signature(custom_model_truss_dir)
+    (custom_model_truss_dir / "model" / "weights.bin").write_bytes(b"\xff\x00")
+
+    # Only the binary patch format can carry files that aren't UTF-8.
+    assert calc_truss_patch(custom_model_truss_dir, prev_sign) is None
+    patches = calc_truss_patch(custom_model_truss_dir, prev_sign, binary_content=True)
+    assert patches == [
+        Patch(
+            type=PatchType.MODEL_CODE,
+            body=ModelCodePatch(
+                action=Action.ADD,
+                path="weights.bin",
+                binary_content=b"\xff\x00",
+            ),
+        )
+    ]
+
+
 def test_calc_truss_patch_add_under_new_directory(custom_model_truss_dir: Path):
     prev_sign = calc_truss_signature(custom_model_truss_dir)
     new_dir = custom_model_truss_dir / "model" / "dir"
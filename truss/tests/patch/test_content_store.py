@@ -0,0 +1,46 @@
+import os
+from pathlib import Path
+
+from blake3 import blake3
+from truss.patch.content_store import ContentStore
+
+
+def _digest(content: bytes) -> str:
+    return blake3(content).hexdigest()
+
+
+def test_put_and_get(tmp_path: Path):
+    store = ContentStore(tmp_path / "store")
+    file = tmp_path / "file.py"
+    file.write_bytes(b"content")
+    store.put_files([file, tmp_path / "missing.py"])
+
+    assert store.get(_digest(b"content")) == b"content"
+    assert store.get(_digest(b"other")) is None
+
+
+def test_corrupt_content_is_dropped(tmp_path: Path):
+    store = ContentStore(tmp_path / "store")
+    file = tmp_path / "file.py"
+    file.write_bytes(b"content")
+    store.put_files([file])
+    (tmp_path / "store" / _digest(b"content")).write_bytes(b"corrupt")
+
+    assert store.get(_digest(b"content")) is None
+    assert not (tmp_path / "store" / _digest(b"content")).exists()
+
+
+def test_least_recently_used_evicted(tmp_path: Path):
+    store = ContentStore(tmp_path / "store", max_total_bytes=10)
+    files = []
+    for index, content in enumerate([b"aaaa", b"bbbb", b"cccc"]):
+        file = tmp_path / f"file{index}"
+        file.write_bytes(content)
+        files.append(file)
+    store.put_files(files[:2])
+    os.utime(tmp_path / "store" / _digest(b"aaaa"), ns=(0, 0))
+    store.put_files(files[2:])
+
+    assert store.get(_digest(b"aaaa")) is None
+    assert store.get(_digest(b"bbbb")) == b"bbbb"
+    assert store.get(_digest(b"cccc")) == b"cccc"
@@ -1,13 +1,17 @@
+import os
 import random
 import string
 from pathlib import Path
 from typing import Callable, List
 
 import pytest
+from blake3 import blake3
+from truss.patch import hash as truss_hash
 from truss.patch.hash import (
     directory_content_hash,
     file_content_hash,
     file_content_hash_str,
+    file_content_hashes,
 )
 
 
@@ -160,6 +164,28 @@ def test_file_content_hash_str(tmp_path):
     assert final_hash == orig_hash
 
 
+@pytest.mark.parametrize("size", [0, 1, 4096, 1024 * 1024 + 7])
+def test_mmap_and_chunked_hashes_are_identical(tmp_path, monkeypatch, size):
+    file = tmp_path / "blob"
+    content = os.urandom(size)
+    file.write_bytes(content)
+    expected = blake3(content).digest()
+
+    assert file_content_hash(file) == expected
+    monkeypatch.setattr(truss_hash, "MMAP_THRESHOLD_BYTES", 1)
+    assert file_content_hash(file) == expected
+
+
+def test_file_content_hashes_keeps_order(tmp_path):
+    files = []
+    for i in range(50):
+        file = tmp_path / f"file{i}"
+        _update_file_content(file)
+        files.append(file)
+
+    assert file_content_hashes(files) == [file_content_hash(file) for file in files]
+
+
 def _verify_with_dir_modification(
     target_dir: Path,
     op: Callable[[Path], Path],
@@ -0,0 +1,143 @@
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+import pytest
+from truss.patch.hash import directory_content_hash, file_content_hash
+from truss.patch import hash_cache
+from truss.patch.hash_cache import FileHashCache
+
+
+@pytest.fixture
+def db_path(tmp_path: Path) -> Path:
+    return tmp_path / "cache" / "file_hashes.sqlite"
+
+
+def _write(path: Path, content: str, age_secs: float = 60):
+    path.write_text(content)
+    mod_time = time.time() - age_secs
+    os.utime(path, (mod_time, mod_time))
+
+
+class CountingHasher:
+    def __init__(self):
+        self.num_calls = 0
+
+    def __call__(self, file: Path) -> bytes:
+        self.num_calls += 1
+        return file_content_hash(file)
+
+
+def _hash_with_cache(db_path: Path, file: Path, hasher: CountingHasher) -> bytes:
+    cache = FileHashCache(db_path)
+    try:
+        return cache.file_hash(file, hasher)
+    finally:
+        cache.close()
+
+
+def test_unchanged_files_are_not_read_again(tmp_path, db_path):
+    file = tmp_path / "weights.bin"
+    _write(file, "a" * 1000)
+    hasher = CountingHasher()
+
+    first = _hash_with_cache(db_path, file, hasher)
+    second = _hash_with_cache(db_path, file, hasher)
+
+    assert first == second == file_content_hash(file)
+    assert hasher.num_calls == 1
+
+
+def test_changed_files_are_hashed_again(tmp_path, db_path):
+    file = tmp_path / "model.py"
+    _write(file, "a", age_secs=120)
+    hasher = CountingHasher()
+    _hash_with_cache(db_path, file, hasher)
+
+    # Same size, only the mtime changes.
+    _write(file, "b", age_secs=60)
+
+    assert _hash_with_cache(db_path, file, hasher) == file_content_hash(file)
+    assert hasher.num_calls == 2
+
+
+def test_recently_modified_files_are_not_cached(tmp_path, db_path):
+    file = tmp_path / "model.py"
+    _write(file, "a", age_secs=0)
+    hasher = CountingHasher()
+
+    _hash_with_cache(db_path, file, hasher)
+    _hash_with_cache(db_path, file, hasher)
+
+    assert hasher.num_calls == 2
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, db_path):
+    files = [tmp_path / f"file{i}" for i in range(3)]
+    for file in files:
+        _write(file, file.name)
+    hasher = CountingHasher()
+
+    cache = FileHashCache(db_path, max_entries=2)
+    for file in files:
+        cache.file_hash(file, hasher)
+    cache.close()
+
+    with sqlite3.connect(str(db_path)) as conn:
+        rows = conn.execute("SELECT path FROM file_hashes").fetchall()
+    assert sorted(Path(path).name for (path,) in rows) == ["file1", "file2"]
+
+
+def test_unusable_database_falls_back_to_hashing(tmp_path):
+    db_path = tmp_path / "not_a_database"
+    db_path.write_text("garbage" * 100)
+    file = tmp_path / "model.py"
+    _write(file, "a")
+    hasher = CountingHasher()
+
+    assert _hash_with_cache(db_path, file, hasher) == file_content_hash(file)
+    assert _hash_with_cache(db_path, file, hasher) == file_content_hash(file)
+    assert hasher.num_calls == 2
+
+
+def test_database_failing_while_looking_up_falls_back_to_hashing(
+    tmp_path, db_path, monkeypatch
+):
+    monkeypatch.setattr(hash_cache, "SQLITE_TIMEOUT_SECS", 0.01)
+    files = [tmp_path / f"file{i}" for i in range(3)]
+    for file in files:
+        _write(file, file.name)
+    hasher = CountingHasher()
+    cache = FileHashCache(db_path)
+    # Another process holding the lock makes the first lookup fail.
+    with sqlite3.connect(str(db_path)) as conn:
+        conn.execute("BEGIN EXCLUSIVE")
+        try:
+            digests = cache.file_hashes(
+                files, lambda files: [hasher(file) for file in files]
+            )
+        finally:
+            conn.rollback()
+    cache.close()
+
+    assert digests == [file_content_hash(file) for file in files]
+    assert hasher.num_calls == 3
+
+
+def test_directory_hash_is_unchanged_by_cache(tmp_path, monkeypatch):
+    truss_dir = tmp_path / "truss"
+    (truss_dir / "data").mkdir(parents=True)
+    _write(truss_dir / "config.yaml", "model_name: test")
+    _write(truss_dir / "data" / "weights.bin", "w" * 10000)
+    monkeypatch.setenv("TRUSS_DISABLE_HASH_CACHE", "1")
+    uncached = directory_content_hash(truss_dir)
+    monkeypatch.delenv("TRUSS_DISABLE_HASH_CACHE")
+    monkeypatch.setattr(
+        "truss.local.local_config_handler.LocalConfigHandler.TRUSS_CONFIG_DIR",
+        tmp_path / "dot_truss",
+    )
+
+    assert directory_content_hash(truss_dir) == uncached
+    assert directory_content_hash(truss_dir) == uncached
+    assert (tmp_path / "dot_truss" / "file_hashes.sqlite").exists()
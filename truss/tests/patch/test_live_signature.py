@@ -0,0 +1,113 @@
+import shutil
+from pathlib import Path
+
+from truss.patch.calc_patch import calc_truss_patch
+from truss.patch.hash import directory_content_hash
+from truss.patch.live_signature import LiveTrussSignature
+from truss.patch.signature import calc_truss_signature
+from truss.templates.control.control.helpers.types import (
+    Action,
+    ModelCodePatch,
+    Patch,
+    PatchType,
+)
+
+IGNORE_PATTERNS = ["__pycache__/", "*.tmp", "data/*"]
+
+
+def _assert_in_sync(live_signature: LiveTrussSignature, truss_dir: Path):
+    assert live_signature.content_hash() == directory_content_hash(
+        truss_dir, IGNORE_PATTERNS
+    )
+    assert (
+        live_signature.signature().to_dict()
+        == calc_truss_signature(truss_dir, IGNORE_PATTERNS).to_dict()
+    )
+
+
+def test_initial_scan(custom_model_truss_dir: Path):
+    (custom_model_truss_dir / "model" / "__pycache__").mkdir()
+    (custom_model_truss_dir / "model" / "__pycache__" / "model.pyc").write_text("")
+    (custom_model_truss_dir / "data").mkdir(exist_ok=True)
+    (custom_model_truss_dir / "data" / "weights").write_text("weights")
+
+    _assert_in_sync(
+        LiveTrussSignature(custom_model_truss_dir, IGNORE_PATTERNS),
+        custom_model_truss_dir,
+    )
+
+
+def test_update(custom_model_truss_dir: Path):
+    truss_dir = custom_model_truss_dir
+    live_signature = LiveTrussSignature(truss_dir, IGNORE_PATTERNS)
+
+    model_file = truss_dir / "model" / "model.py"
+    model_file.write_text("class Model:\n    pass\n")
+    live_signature.update([model_file])
+    _assert_in_sync(live_signature, truss_dir)
+
+    # Files added in a new directory, reported with or without the directory.
+    (truss_dir / "model" / "utils" / "nested").mkdir(parents=True)
+    (truss_dir / "model" / "utils" / "nested" / "helpers.py").write_text("x = 1")
+    (truss_dir / "model" / "utils" / "scratch.tmp").write_text("")
+    live_signature.update([truss_dir / "model" / "utils"])
+    _assert_in_sync(live_signature, truss_dir)
+    (truss_dir / "model" / "utils" / "nested" / "more.py").write_text("y = 1")
+    live_signature.update([truss_dir / "model" / "utils" / "nested" / "more.py"])
+    _assert_in_sync(live_signature, truss_dir)
+
+    # A directory replaced by a file of the same name.
+    shutil.rmtree(truss_dir / "model" / "utils")
+    (truss_dir / "model" / "utils").write_text("utils")
+    live_signature.update([truss_dir / "model" / "utils" / "nested" / "helpers.py"])
+    live_signature.update([truss_dir / "model" / "utils"])
+    _assert_in_sync(live_signature, truss_dir)
+
+    # Renames, reported as removal and addition, the same path more than once.
+    renamed = truss_dir / "model" / "renamed.py"
+    model_file.rename(renamed)
+    live_signature.update([model_file, renamed, renamed, truss_dir / "model"])
+    _assert_in_sync(live_signature, truss_dir)
+
+    # Ignored and outside paths don't change anything.
+    content_hash = live_signature.content_hash()
+    (truss_dir / "model" / "scratch.tmp").write_text("")
+    (truss_dir / "data").mkdir(exist_ok=True)
+    (truss_dir / "data" / "weights").write_text("weights")
+    assert live_signature.update(
+        [
+            truss_dir / "model" / "scratch.tmp",
+            truss_dir / "data" / "weights",
+            truss_dir.parent / "elsewhere.py",
+        ]
+    ) == {"model/scratch.tmp", "data/weights"}
+    assert live_signature.content_hash() == content_hash
+    _assert_in_sync(live_signature, truss_dir)
+
+
+def test_calc_patch(custom_model_truss_dir: Path):
+    prev_signature = calc_truss_signature(custom_model_truss_dir, IGNORE_PATTERNS)
+    live_signature = LiveTrussSignature(custom_model_truss_dir, IGNORE_PATTERNS)
+    model_file = custom_model_truss_dir / "model" / "model.py"
+    model_file.write_text("class Model:\n    pass\n")
+    live_signature.update([model_file])
+
+    patch_details = live_signature.calc_patch("prev_hash", prev_signature)
+
+    assert patch_details.prev_hash == "prev_hash"
+    assert patch_details.next_hash == directory_content_hash(
+        custom_model_truss_dir, IGNORE_PATTERNS
+    )
+    assert patch_details.patch_ops == [
+        Patch(
+            type=PatchType.MODEL_CODE,
+            body=ModelCodePatch(
+                action=Action.UPDATE,
+                path="model.py",
+                content="class Model:\n    pass\n",
+            ),
+        )
+    ]
+    assert patch_details.patch_ops == calc_truss_patch(
+        custom_model_truss_dir, prev_signature, IGNORE_PATTERNS
+    )
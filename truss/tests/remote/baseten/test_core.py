@@ -1,9 +1,13 @@
+import io
+import tarfile
 from tempfile import NamedTemporaryFile
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 from truss.remote.baseten import core
 from truss.remote.baseten.api import BasetenApi
 from truss.remote.baseten.error import ApiError
+from truss.tests.remote.baseten.test_transfer import FakeS3Client
+from truss.truss_handle import TrussHandle
 
 
 def test_exists_model():
@@ -84,3 +88,31 @@ def test_get_prod_version_from_versions_error():
     ]
     prod_version = core.get_prod_version_from_versions(versions)
     assert prod_version is None
+
+
+def test_archive_and_upload_truss(custom_model_truss_dir_with_pre_and_post):
+    api = MagicMock()
+    api.model_s3_upload_credentials.return_value = {
+        "s3_key": "key",
+        "s3_bucket": "bucket",
+        "aws_access_key_id": "id",
+    }
+    s3_client = FakeS3Client()
+    truss_handle = TrussHandle(custom_model_truss_dir_with_pre_and_post)
+
+    with patch.object(core.boto3, "client", return_value=s3_client) as client:
+        assert core.archive_and_upload_truss(api, truss_handle) == "key"
+
+    client.assert_called_once_with("s3", aws_access_key_id="id")
+    archive = s3_client.objects[("bucket", "key")]
+    with tarfile.open(fileobj=io.BytesIO(archive), mode="r:gz") as tar:
+        names = tar.getnames()
+        model_file = tar.extractfile("model/model.py")
+        assert model_file is not None
+        assert (
+            model_file.read()
+            == (
+                custom_model_truss_dir_with_pre_and_post / "model" / "model.py"
+            ).read_bytes()
+        )
+    assert "config.yaml" in names
@@ -0,0 +1,125 @@
+import json
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from truss.remote.baseten.error import Error
+from truss.remote.baseten.utils.manifest import (
+    TrussManifest,
+    build_manifest,
+    pushed_blob_cache,
+    upload_manifest,
+)
+from truss.tests.remote.baseten.test_transfer import FakeS3Client
+
+
+@pytest.fixture(autouse=True)
+def truss_config_dir(tmp_path):
+    with mock.patch(
+        "truss.local.local_config_handler.LocalConfigHandler.TRUSS_CONFIG_DIR",
+        tmp_path / ".truss",
+    ):
+        yield
+
+
+def _truss_dir(tmp_path: Path) -> Path:
+    truss_dir = tmp_path / "truss"
+    (truss_dir / "model").mkdir(parents=True)
+    (truss_dir / "data").mkdir()
+    (truss_dir / "config.yaml").write_text("model_name: test\n")
+    (truss_dir / "model" / "model.py").write_text("class Model:\n    pass\n")
+    (truss_dir / "data" / "weights").write_bytes(b"\x00" * 1024)
+    (truss_dir / "data" / "same_weights").write_bytes(b"\x00" * 1024)
+    (truss_dir / "model" / "scratch.tmp").write_text("")
+    return truss_dir
+
+
+def test_build_manifest(tmp_path):
+    truss_dir = _truss_dir(tmp_path)
+
+    manifest = build_manifest(truss_dir, "models/blobs", ["*.tmp"])
+
+    assert [entry.path for entry in manifest.files] == [
+        "config.yaml",
+        "data/same_weights",
+        "data/weights",
+        "model/model.py",
+    ]
+    assert manifest.files[1].digest == manifest.files[2].digest
+    assert manifest.files[2].size == 1024
+    assert TrussManifest.from_dict(manifest.to_dict()) == manifest
+
+
+def test_upload_manifest_only_uploads_missing_blobs(tmp_path):
+    truss_dir = _truss_dir(tmp_path)
+    s3_client = FakeS3Client()
+
+    manifest = build_manifest(truss_dir, "models/blobs")
+    uploaded = upload_manifest(s3_client, "bucket", "models/1", truss_dir, manifest)
+    assert len(uploaded) == 4
+    assert json.loads(s3_client.objects[("bucket", "models/1")]) == manifest.to_dict()
+    for entry in manifest.files:
+        assert (
+            s3_client.objects[("bucket", manifest.blob_key(entry.digest))]
+            == (truss_dir / entry.path).read_bytes()
+        )
+
+    (truss_dir / "model" / "model.py").write_text("class Model:\n    x = 1\n")
+    manifest = build_manifest(truss_dir, "models/blobs")
+    with mock.patch.object(
+        s3_client, "head_object", wraps=s3_client.head_object
+    ) as head_object:
+        uploaded = upload_manifest(s3_client, "bucket", "models/2", truss_dir, manifest)
+    # The other blobs are known to be pushed from the local cache.
+    head_object.assert_called_once()
+    assert len(uploaded) == 1
+    assert (
+        s3_client.objects[("bucket", manifest.blob_key(uploaded[0]))]
+        == b"class Model:\n    x = 1\n"
+    )
+
+
+def test_upload_manifest_checks_remote_blobs(tmp_path):
+    truss_dir = _truss_dir(tmp_path)
+    s3_client = FakeS3Client()
+    manifest = build_manifest(truss_dir, "models/blobs")
+    for entry in manifest.files:
+        s3_client.objects[("bucket", manifest.blob_key(entry.digest))] = b""
+
+    assert upload_manifest(s3_client, "bucket", "models/1", truss_dir, manifest) == []
+
+
+def test_upload_manifest_rejects_files_changed_since_built(tmp_path):
+    truss_dir = _truss_dir(tmp_path)
+    s3_client = FakeS3Client()
+    manifest = build_manifest(truss_dir, "models/blobs")
+
+    (truss_dir / "model" / "model.py").write_text("class Model:\n    x = 1\n")
+    with pytest.raises(Error, match="model/model.py changed"):
+        upload_manifest(s3_client, "bucket", "models/1", truss_dir, manifest)
+    assert s3_client.objects == {}
+
+
+def test_upload_manifest_rejects_files_changed_while_uploaded(tmp_path):
+    truss_dir = _truss_dir(tmp_path)
+    s3_client = FakeS3Client()
+    manifest = build_manifest(truss_dir, "models/blobs")
+    model_entry = next(f for f in manifest.files if f.path == "model/model.py")
+    upload_file = s3_client.upload_file
+
+    def upload_file_then_edit(Filename, Bucket, Key, Callback=None):
+        upload_file(Filename, Bucket, Key, Callback)
+        if Filename.endswith("model.py"):
+            Path(Filename).write_text("class Model:\n    x = 1\n")
+
+    with mock.patch.object(s3_client, "upload_file", upload_file_then_edit):
+        with pytest.raises(Error, match="model/model.py changed"):
+            upload_manifest(
+                s3_client, "bucket", "models/1", truss_dir, manifest, max_concurrency=1
+            )
+
+    # The blob may not have the content of its digest.
+    blob = ("bucket", manifest.blob_key(model_entry.digest))
+    assert blob not in s3_client.objects
+    assert model_entry.digest not in pushed_blob_cache("bucket", "models/blobs")
+    assert ("bucket", "models/1") not in s3_client.objects
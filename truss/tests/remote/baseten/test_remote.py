@@ -1,6 +1,10 @@
+import json
+
 import click
 import pytest
 import requests_mock
+from truss.patch.hash import directory_content_hash
+from truss.patch.signature import calc_truss_signature
 from truss.remote.baseten.core import ModelId, ModelName, ModelVersionId
 from truss.remote.baseten.remote import BasetenRemote
 from truss.truss_handle import TrussHandle
@@ -269,3 +273,48 @@ def test_push_raised_value_error_when_keep_previous_prod_settings_and_not_promot
             match="preserve-previous-production-deployment can only be used with the '--promote' option",
         ):
             remote.push(th, "model_name", False, False, False, True)
+
+
+def test_patch_keeps_live_signature(custom_model_truss_dir):
+    remote = BasetenRemote(_TEST_REMOTE_URL, "api_key")
+    handle = TrussHandle(custom_model_truss_dir)
+    ignore_patterns = handle.spec.hash_ignore_patterns
+    dev_version = {
+        "id": "version_id",
+        "is_draft": True,
+        "is_primary": False,
+        "truss_hash": directory_content_hash(custom_model_truss_dir, ignore_patterns),
+        "truss_signature": json.dumps(
+            calc_truss_signature(custom_model_truss_dir, ignore_patterns).to_dict()
+        ),
+    }
+    model_response = {
+        "data": {
+            "model": {"name": "model", "id": "model_id", "versions": [dev_version]}
+        }
+    }
+    patch_response = {"data": {"patch_draft_truss": {"succeeded": True}}}
+
+    with requests_mock.Mocker() as m:
+        m.post(
+            _TEST_REMOTE_GRAPHQL_PATH,
+            [{"json": model_response}] * 2 + [{"json": patch_response}],
+        )
+        watched_truss = remote.patch(custom_model_truss_dir, [])
+        assert watched_truss.synced_hash == dev_version["truss_hash"]
+        assert m.call_count == 1
+
+        # Unchanged since synced, the remote isn't queried.
+        assert remote.patch(custom_model_truss_dir, [], watched_truss) is watched_truss
+        assert m.call_count == 1
+
+        model_file = custom_model_truss_dir / "model" / "model.py"
+        model_file.write_text("class Model:\n    pass\n")
+        watched_truss.signature.update([model_file])
+        remote.patch(custom_model_truss_dir, [], watched_truss)
+
+    assert m.call_count == 3
+    assert "patch_draft_truss" in m.request_history[2].text
+    assert watched_truss.synced_hash == directory_content_hash(
+        custom_model_truss_dir, ignore_patterns
+    )
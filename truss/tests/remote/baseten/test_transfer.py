@@ -0,0 +1,150 @@
+import gc
+import threading
+from pathlib import Path
+
+import pytest
+from botocore.exceptions import ClientError
+from truss.remote.baseten.utils.transfer import MIN_PART_SIZE, MultipartUploadWriter
+
+
+class FakeS3Client:
+    """In-memory stand-in for the upload API of an S3 client."""
+
+    def __init__(self, fail_on_part=None):
+        self.objects = {}
+        self.aborted = []
+        self.max_parts_in_flight = 0
+        self._uploads = {}
+        self._fail_on_part = fail_on_part
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def create_multipart_upload(self, Bucket, Key):
+        if self._fail_on_part == 0:
+            raise RuntimeError("create failed")
+        upload_id = str(len(self._uploads))
+        self._uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        with self._lock:
+            self._in_flight += 1
+            self.max_parts_in_flight = max(self.max_parts_in_flight, self._in_flight)
+        try:
+            if PartNumber == self._fail_on_part:
+                raise RuntimeError("upload failed")
+            self._uploads[UploadId][PartNumber] = Body
+            return {"ETag": f"etag-{PartNumber}"}
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self._uploads.pop(UploadId)
+        assert [part["PartNumber"] for part in MultipartUpload["Parts"]] == sorted(
+            parts
+        )
+        self.objects[(Bucket, Key)] = b"".join(
+            parts[part["PartNumber"]] for part in MultipartUpload["Parts"]
+        )
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self._uploads.pop(UploadId)
+        self.aborted.append(Key)
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        return {"ContentLength": len(self.objects[(Bucket, Key)])}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[(Bucket, Key)] = Body
+
+    def upload_file(self, Filename, Bucket, Key, Callback=None):
+        self.objects[(Bucket, Key)] = Path(Filename).read_bytes()
+        if Callback is not None:
+            Callback(len(self.objects[(Bucket, Key)]))
+
+
+def test_upload_in_parts():
+    s3_client = FakeS3Client()
+    data = bytes(range(256)) * (MIN_PART_SIZE // 100)
+    with MultipartUploadWriter(
+        s3_client, "bucket", "key", part_size=MIN_PART_SIZE, max_concurrency=2
+    ) as writer:
+        for start in range(0, len(data), 1000):
+            writer.write(data[start : start + 1000])
+
+    assert s3_client.objects[("bucket", "key")] == data
+    assert s3_client.max_parts_in_flight <= 2
+
+
+def test_upload_empty():
+    s3_client = FakeS3Client()
+    with MultipartUploadWriter(s3_client, "bucket", "key"):
+        pass
+
+    assert s3_client.objects[("bucket", "key")] == b""
+
+
+def test_upload_aborted_on_error():
+    s3_client = FakeS3Client()
+    with pytest.raises(ValueError):
+        with MultipartUploadWriter(s3_client, "bucket", "key") as writer:
+            writer.write(b"data")
+            raise ValueError()
+
+    assert s3_client.objects == {}
+    assert s3_client.aborted == ["key"]
+
+
+def test_upload_aborted_on_failed_part():
+    s3_client = FakeS3Client(fail_on_part=1)
+    with pytest.raises(RuntimeError):
+        with MultipartUploadWriter(
+            s3_client, "bucket", "key", part_size=MIN_PART_SIZE
+        ) as writer:
+            for _ in range(3):
+                writer.write(b"x" * MIN_PART_SIZE)
+
+    assert s3_client.objects == {}
+    assert s3_client.aborted == ["key"]
+
+
+def test_part_size_too_small():
+    with pytest.raises(ValueError):
+        MultipartUploadWriter(FakeS3Client(), "bucket", "key", part_size=1024)
+
+
+def test_abandoned_upload_aborted():
+    s3_client = FakeS3Client()
+    writer = MultipartUploadWriter(s3_client, "bucket", "key")
+    writer.write(b"data")
+    del writer
+    gc.collect()
+
+    assert s3_client.objects == {}
+    assert s3_client.aborted == ["key"]
+
+
+@pytest.mark.parametrize(
+    "s3_client, kwargs",
+    [
+        (FakeS3Client(), {"part_size": 1024}),
+        (FakeS3Client(), {"max_concurrency": 0}),
+        (FakeS3Client(fail_on_part=0), {}),
+    ],
+)
+def test_close_after_failed_init(s3_client, kwargs):
+    # Like closing it when it's garbage collected.
+    writer = MultipartUploadWriter.__new__(MultipartUploadWriter)
+    with pytest.raises((ValueError, RuntimeError)):
+        writer.__init__(s3_client, "bucket", "key", **kwargs)
+    writer.close()
+
+    assert writer.closed
+    assert s3_client.objects == {}
+    assert s3_client.aborted == []
@@ -0,0 +1,97 @@
+import logging
+import sys
+from pathlib import Path
+from typing import List
+
+import pytest
+
+# Needed to simulate the set up on the model docker container
+sys.path.append(
+    str(
+        Path(__file__).parent.parent.parent.parent.parent.parent
+        / "templates"
+        / "control"
+        / "control"
+    )
+)
+
+from helpers.inference_server_controller import InferenceServerController  # noqa
+from helpers.types import (  # noqa
+    Action,
+    ModelCodePatch,
+    Patch,
+    PatchType,
+    PythonRequirementPatch,
+)
+
+
+class FakeProcessController:
+    def __init__(self, hot_reload_succeeds: bool = True):
+        self.hot_reload_succeeds = hot_reload_succeeds
+        self.running = True
+        self.calls: List[str] = []
+
+    def start(self, inf_env: dict):
+        self.calls.append("start")
+        self.running = True
+
+    def stop(self):
+        self.calls.append("stop")
+        self.running = False
+
+    def hot_reload(self) -> bool:
+        self.calls.append("hot_reload")
+        return self.hot_reload_succeeds
+
+    def is_inference_server_running(self) -> bool:
+        return self.running
+
+
+def _patch_request(patches: List[Patch]) -> dict:
+    return {
+        "hash": "new",
+        "prev_hash": None,
+        "patches": [patch.to_dict() for patch in patches],
+    }
+
+
+MODEL_CODE_PATCH = Patch(
+    type=PatchType.MODEL_CODE,
+    body=ModelCodePatch(action=Action.UPDATE, path="model.py", content=""),
+)
+PYTHON_REQUIREMENT_PATCH = Patch(
+    type=PatchType.PYTHON_REQUIREMENT,
+    body=PythonRequirementPatch(action=Action.ADD, requirement="a"),
+)
+
+
+@pytest.mark.parametrize(
+    "hot_reload_succeeds, patches, expected_calls",
+    [
+        (True, [MODEL_CODE_PATCH], ["hot_reload"]),
+        # Falls back to restarting.
+        (False, [MODEL_CODE_PATCH], ["hot_reload", "stop", "start"]),
+        # Only model code is reloaded in place.
+        (True, [MODEL_CODE_PATCH, PYTHON_REQUIREMENT_PATCH], ["stop", "start"]),
+    ],
+)
+def test_apply_patch_hot_reload(
+    monkeypatch, hot_reload_succeeds, patches, expected_calls
+):
+    monkeypatch.delenv("HASH_TRUSS", raising=False)
+    process_controller = FakeProcessController(hot_reload_succeeds)
+    applied_patches = []
+    controller = InferenceServerController(
+        process_controller,
+        lambda patch, inf_env: applied_patches.append(patch),
+        logging.getLogger(__name__),
+        oversee_inference_server=False,
+        hot_reload=True,
+    )
+
+    controller.apply_patch(_patch_request(patches))
+
+    assert len(applied_patches) == len(patches)
+    assert process_controller.calls == expected_calls
+    assert process_controller.running
+    assert controller.truss_hash() == "new"
@@ -0,0 +1,108 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+# Needed to simulate the set up on the model docker container
+sys.path.append(
+    str(
+        Path(__file__).parent.parent.parent.parent.parent.parent
+        / "templates"
+        / "control"
+        / "control"
+    )
+)
+
+from helpers.inference_server_readiness import (  # noqa
+    READINESS_PATH,
+    InferenceServerReadiness,
+)
+
+
+class FakeProcessController:
+    def __init__(self):
+        self.running = True
+        self.intentionally_stopped = False
+
+    def inference_server_ever_started(self) -> bool:
+        return True
+
+    def is_inference_server_running(self) -> bool:
+        return self.running
+
+    def is_inference_server_intentionally_stopped(self) -> bool:
+        return self.intentionally_stopped
+
+
+class FakeInferenceServer:
+    def __init__(self, not_ready_probes: int = 0):
+        self.not_ready_probes = not_ready_probes
+        self.probes = 0
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        assert request.url.path == READINESS_PATH
+        self.probes += 1
+        if self.probes <= self.not_ready_probes:
+            return httpx.Response(503, json={"error": "model is not ready"})
+        return httpx.Response(200, json={})
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def _readiness(server: FakeInferenceServer, process_controller=None):
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(server.handle), base_url="http://localhost"
+    )
+    return InferenceServerReadiness(
+        client, process_controller or FakeProcessController(), poll_interval_secs=0.01
+    )
+
+
+@pytest.mark.anyio
+async def test_waiting_requests_share_probes():
+    server = FakeInferenceServer(not_ready_probes=3)
+    readiness = _readiness(server)
+    assert not readiness.is_ready()
+
+    results = await asyncio.gather(*[readiness.wait(5) for _ in range(20)])
+    assert all(results)
+    assert readiness.is_ready()
+    assert server.probes == 4
+
+    # Ready, no need to probe again.
+    assert await readiness.wait(5)
+    assert server.probes == 4
+
+
+@pytest.mark.anyio
+async def test_wait_again_after_reset():
+    server = FakeInferenceServer()
+    readiness = _readiness(server)
+    assert await readiness.wait(5)
+    readiness.reset()
+    assert not readiness.is_ready()
+    assert await readiness.wait(5)
+    assert server.probes == 2
+
+
+@pytest.mark.anyio
+async def test_wait_times_out():
+    server = FakeInferenceServer(not_ready_probes=1000)
+    readiness = _readiness(server)
+    assert not await readiness.wait(0.1)
+    assert not readiness.is_ready()
+
+
+@pytest.mark.anyio
+async def test_stopped_inference_server_wakes_waiters():
+    process_controller = FakeProcessController()
+    process_controller.running = False
+    server = FakeInferenceServer(not_ready_probes=1000)
+    readiness = _readiness(server, process_controller)
+    assert await readiness.wait(5)
+    assert server.probes == 0
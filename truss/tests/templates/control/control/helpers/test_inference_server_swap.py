@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import os
+import socket
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+# Needed to simulate the set up on the model docker container
+sys.path.append(
+    str(
+        Path(__file__).parent.parent.parent.parent.parent.parent
+        / "templates"
+        / "control"
+        / "control"
+    )
+)
+
+from helpers import inference_server_process_controller  # noqa
+from helpers.inference_server_process_controller import (  # noqa
+    InferenceServerProcessController,
+)
+from helpers.inference_server_transport import InferenceServerTransport  # noqa
+
+# Answers every request with the port it listens on.
+SERVER_SCRIPT = """
+import os
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+PORT = int(os.environ["INFERENCE_SERVER_PORT"])
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = str(PORT).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+HTTPServer(("localhost", PORT), Handler).serve_forever()
+"""
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def process_controller(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        inference_server_process_controller, "SWAP_READY_TIMEOUT_SECS", 10.0
+    )
+    monkeypatch.setattr(
+        inference_server_process_controller, "SWAP_READY_CHECK_INTERVAL_SECS", 0.05
+    )
+    script = tmp_path / "server.py"
+    script.write_text(SERVER_SCRIPT)
+    controller = InferenceServerProcessController(
+        str(tmp_path),
+        [sys.executable, str(script)],
+        _free_port(),
+        logging.getLogger(__name__),
+        inference_server_alternate_port=_free_port(),
+    )
+    yield controller, script
+    controller.stop()
+
+
+def test_swap(process_controller):
+    controller, _ = process_controller
+    controller.start(os.environ.copy())
+    old_process = controller._inference_server_process
+
+    assert controller.swap(os.environ.copy())
+    assert controller.active_slot() == 1
+    assert controller.is_inference_server_running()
+    assert old_process.wait(10) is not None
+
+    assert controller.swap(os.environ.copy())
+    assert controller.active_slot() == 0
+
+
+def test_swap_keeps_current_if_new_fails(process_controller):
+    controller, script = process_controller
+    controller.start(os.environ.copy())
+    old_process = controller._inference_server_process
+    assert controller._wait_until_ready(old_process, 0)
+
+    script.write_text("raise SystemExit(1)")
+    assert not controller.swap(os.environ.copy())
+    assert controller.active_slot() == 0
+    assert controller._inference_server_process is old_process
+    assert old_process.poll() is None
+
+
+@pytest.mark.anyio
+async def test_transport_follows_swap(process_controller):
+    controller, _ = process_controller
+    controller.start(os.environ.copy())
+    transport = InferenceServerTransport(controller, httpx.Limits())
+    async with httpx.AsyncClient(
+        base_url=f"http://localhost:{controller.port(0)}",
+        transport=transport,
+        timeout=10,
+    ) as client:
+        await _wait_until_up(client)
+        assert (await client.get("/")).text == str(controller.port(0))
+        assert controller.swap(os.environ.copy())
+        assert (await client.get("/")).text == str(controller.port(1))
+
+
+async def _wait_until_up(client: httpx.AsyncClient):
+    for _ in range(100):
+        try:
+            await client.get("/")
+            return
+        except httpx.ConnectError:
+            await asyncio.sleep(0.05)
+    raise RuntimeError("Inference server didn't come up")
@@ -1,3 +1,4 @@
+import hashlib
 import os
 import sys
 from pathlib import Path
@@ -17,14 +18,17 @@ sys.path.append(
 )
 
 # Have to use imports in this form, otherwise isinstance checks fail on helper classes
+from helpers.errors import DeltaBaseMismatch  # noqa
 from helpers.truss_patch.model_container_patch_applier import (  # noqa
     ModelContainerPatchApplier,
 )
+from helpers.truss_patch.wire_format import compute_delta  # noqa
 from helpers.types import (  # noqa
     Action,
     ConfigPatch,
     EnvVarPatch,
     ExternalDataPatch,
+    FileDelta,
     ModelCodePatch,
     PackagePatch,
     Patch,
@@ -217,3 +221,69 @@ def test_patch_applier_external_data_patch_add(
     )
     patch_applier(patch, os.environ.copy())
     assert (truss_container_fs / "app" / "data" / "truss_icon").exists()
+
+
+def test_patch_applier_resolve_delta(
+    patch_applier: ModelContainerPatchApplier, truss_container_fs
+):
+    model_file = truss_container_fs / "app" / "model" / "model.py"
+    base = model_file.read_bytes()
+    new_content = base + b"\n# appended\n"
+    patch = Patch(
+        type=PatchType.MODEL_CODE,
+        body=ModelCodePatch(
+            action=Action.UPDATE,
+            path="model.py",
+            delta=FileDelta(
+                base_sha256=hashlib.sha256(base).hexdigest(),
+                ops=compute_delta(base, new_content),
+            ),
+        ),
+    )
+    resolved = patch_applier.resolve_delta(patch)
+    assert resolved.body.delta is None
+    assert resolved.body.content == new_content.decode("utf-8")
+    patch_applier(resolved, os.environ.copy())
+    assert model_file.read_bytes() == new_content
+
+
+def test_patch_applier_resolve_delta_binary(
+    patch_applier: ModelContainerPatchApplier, truss_container_fs
+):
+    model_file = truss_container_fs / "app" / "model" / "weights.bin"
+    base = bytes(range(256)) * 16
+    model_file.write_bytes(base)
+    new_content = base + b"\xff\xfe"
+    patch = Patch(
+        type=PatchType.MODEL_CODE,
+        body=ModelCodePatch(
+            action=Action.UPDATE,
+            path="weights.bin",
+            delta=FileDelta(
+                base_sha256=hashlib.sha256(base).hexdigest(),
+                ops=compute_delta(base, new_content),
+            ),
+        ),
+    )
+    resolved = patch_applier.resolve_delta(patch)
+    assert resolved.body.binary_content == new_content
+    patch_applier(resolved, os.environ.copy())
+    assert model_file.read_bytes() == new_content
+
+
+def test_patch_applier_resolve_delta_base_mismatch(
+    patch_applier: ModelContainerPatchApplier,
+):
+    patch = Patch(
+        type=PatchType.MODEL_CODE,
+        body=ModelCodePatch(
+            action=Action.UPDATE,
+            path="model.py",
+            delta=FileDelta(
+                base_sha256=hashlib.sha256(b"other").hexdigest(),
+                ops=compute_delta(b"other", b"new"),
+            ),
+        ),
+    )
+    with pytest.raises(DeltaBaseMismatch):
+        patch_applier.resolve_delta(patch)
@@ -0,0 +1,46 @@
+import pytest
+from truss.templates.control.control.helpers.request_body import ReplayableRequestBody
+
+
+async def _source(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+async def _read(stream, max_chunks=None):
+    chunks = []
+    async for chunk in stream:
+        chunks.append(chunk)
+        if max_chunks is not None and len(chunks) == max_chunks:
+            break
+    return chunks
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.mark.anyio
+async def test_replay_after_partial_read():
+    body = ReplayableRequestBody(_source([b"a", b"b", b"c"]), max_buffer_bytes=10)
+    assert await _read(body.stream(), max_chunks=2) == [b"a", b"b"]
+    assert body.can_replay()
+    assert await _read(body.stream()) == [b"a", b"b", b"c"]
+    assert await _read(body.stream()) == [b"a", b"b", b"c"]
+
+
+@pytest.mark.anyio
+async def test_no_replay_beyond_buffer():
+    body = ReplayableRequestBody(_source([b"ab", b"cd", b"ef"]), max_buffer_bytes=3)
+    assert await _read(body.stream()) == [b"ab", b"cd", b"ef"]
+    assert not body.can_replay()
+    with pytest.raises(RuntimeError):
+        await _read(body.stream())
+
+
+@pytest.mark.anyio
+async def test_replay_unread_body():
+    body = ReplayableRequestBody(_source([b"ab", b"cd"]), max_buffer_bytes=1)
+    assert body.can_replay()
+    assert await _read(body.stream()) == [b"ab", b"cd"]
@@ -0,0 +1,118 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Needed to simulate the set up on the model docker container
+sys.path.append(
+    str(
+        Path(__file__).parent.parent.parent.parent.parent.parent
+        / "templates"
+        / "control"
+        / "control"
+    )
+)
+
+from helpers.truss_patch.wire_format import (  # noqa
+    apply_delta,
+    compute_delta,
+    decode_patch_request,
+    encode_patch_request,
+)
+from helpers.types import (  # noqa
+    Action,
+    EnvVarPatch,
+    ModelCodePatch,
+    PackagePatch,
+    Patch,
+    PatchType,
+)
+
+
+@pytest.mark.parametrize(
+    "base, content",
+    [
+        (b"", b""),
+        (b"", b"a\nb\n"),
+        (b"a\nb\n", b""),
+        (b"a\nb\nc\n", b"a\nB\nc\nd"),
+        (b"no newline", b"no newline at all"),
+        (bytes(range(256)) * 8, b"\x00" + bytes(range(256)) * 8),
+    ],
+)
+def test_delta_round_trip(base, content):
+    assert apply_delta(base, compute_delta(base, content)) == content
+
+
+def test_delta_of_small_change_is_small():
+    base = b"".join(f"line {i}\n".encode() for i in range(10_000))
+    content = base.replace(b"line 5000\n", b"changed line\n")
+    assert len(compute_delta(base, content)) < 100
+
+
+def test_apply_delta_invalid_op():
+    with pytest.raises(ValueError):
+        apply_delta(b"", b"X")
+
+
+def test_patch_request_round_trip():
+    patches = [
+        Patch(
+            type=PatchType.MODEL_CODE,
+            body=ModelCodePatch(action=Action.UPDATE, path="model.py", content="x"),
+        ),
+        Patch(
+            type=PatchType.MODEL_CODE,
+            body=ModelCodePatch(
+                action=Action.ADD, path="weights.bin", binary_content=b"\xff\x00"
+            ),
+        ),
+        Patch(
+            type=PatchType.PACKAGE,
+            body=PackagePatch(action=Action.REMOVE, path="pkg/__init__.py"),
+        ),
+        Patch(
+            type=PatchType.ENVIRONMENT_VARIABLE,
+            body=EnvVarPatch(action=Action.ADD, item={"key": "value"}),
+        ),
+    ]
+
+    request = decode_patch_request(encode_patch_request("hash", "prev", patches))
+
+    assert request["hash"] == "hash"
+    assert request["prev_hash"] == "prev"
+    assert [Patch.from_dict(patch) for patch in request["patches"]] == patches
+
+
+def test_patch_request_with_delta():
+    base = b"".join(f"line {i}\n".encode() for i in range(1000))
+    content = base + b"one more line\n"
+    patch = Patch(
+        type=PatchType.MODEL_CODE,
+        body=ModelCodePatch(
+            action=Action.UPDATE, path="model.py", content=content.decode()
+        ),
+    )
+
+    body = encode_patch_request("hash", "prev", [patch], lambda _: base)
+    request = decode_patch_request(body)
+
+    decoded = Patch.from_dict(request["patches"][0])
+    assert decoded.body.content is None
+    assert apply_delta(base, decoded.body.delta.ops) == content
+    assert len(body) < len(
+        encode_patch_request("hash", "prev", [patch], lambda _: None)
+    )
+
+
+def test_patch_request_without_useful_delta():
+    patch = Patch(
+        type=PatchType.MODEL_CODE,
+        body=ModelCodePatch(action=Action.UPDATE, path="model.py", content="new"),
+    )
+
+    request = decode_patch_request(
+        encode_patch_request("hash", "prev", [patch], lambda _: b"completely different")
+    )
+
+    assert Patch.from_dict(request["patches"][0]) == patch
@@ -1,10 +1,13 @@
+import asyncio
 import os
 import sys
 from contextlib import contextmanager
 from pathlib import Path
 from typing import Dict, List
 
+import httpx
 import pytest
+import uvicorn
 from httpx import AsyncClient
 from truss.types import PatchRequest
 
@@ -24,6 +27,14 @@ sys.path.append(
 )
 
 from truss.templates.control.control.application import create_app  # noqa
+from truss.templates.control.control.helpers.inference_server_readiness import (  # noqa
+    InferenceServerReadiness,
+)
+from truss.templates.control.control.helpers.truss_patch.wire_format import (  # noqa
+    ACCEPT_PATCH_HEADER,
+    PATCH_BINARY_MEDIA_TYPE,
+    encode_patch_request,
+)
 from truss.templates.control.control.helpers.types import (  # noqa
     Action,
     ModelCodePatch,
@@ -169,6 +180,29 @@ async def test_patch_model_code_create_in_new_dir(app, client):
     ).exists()
 
 
+@pytest.mark.anyio
+async def test_patch_binary_with_delta(app, client):
+    model_file = app.state.inference_server_home / "model" / "model.py"
+    base = model_file.read_bytes()
+    new_content = base.decode() + "\n# patched\n"
+    patch = Patch(
+        type=PatchType.MODEL_CODE,
+        body=ModelCodePatch(action=Action.UPDATE, path="model.py", content=new_content),
+    )
+
+    resp = await client.options("/control/patch")
+    assert PATCH_BINARY_MEDIA_TYPE in resp.headers[ACCEPT_PATCH_HEADER]
+
+    resp = await _apply_binary_patches(client, [patch], base + b"# stale\n")
+    assert resp.json()["error"]["type"] == "delta_base_mismatch"
+    assert model_file.read_bytes() == base
+
+    resp = await _apply_binary_patches(client, [patch], base)
+    assert resp.status_code == 200
+    assert "error" not in resp.json()
+    assert model_file.read_text() == new_content
+
+
 @pytest.mark.anyio
 async def test_404(client):
     resp = await client.post("/control/nonexitant")
@@ -217,6 +251,136 @@ async def test_patch_failed_unrecoverable(client):
     assert resp.json()["error"]["type"] == "patch_failed_unrecoverable"
 
 
+class FakeInferenceServer:
+    def __init__(self, connect_failures: int = 0):
+        self.connect_failures = connect_failures
+        self.requests: List[httpx.Request] = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/v1/models/model":
+            return httpx.Response(200, json={})
+        self.requests.append(request)
+        if self.connect_failures > 0:
+            self.connect_failures -= 1
+            raise httpx.ConnectError("Connection refused", request=request)
+
+        async def stream_body():
+            yield b"echo: "
+            yield request.content
+
+        return httpx.Response(
+            200,
+            headers={"x-model-header": "1", "content-type": "text/plain"},
+            content=stream_body(),
+        )
+
+
+@pytest.fixture
+def fake_inference_server():
+    return FakeInferenceServer()
+
+
+@pytest.fixture
+async def proxy_client(truss_container_fs, fake_inference_server):
+    control_app = create_app(
+        {
+            "inference_server_home": truss_container_fs / "app",
+            "inference_server_process_args": ["python", "inference_server.py"],
+            "control_server_host": "*",
+            "control_server_port": 8081,
+            "inference_server_port": 8082,
+            "oversee_inference_server": False,
+        }
+    )
+    inference_server_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(fake_inference_server.handle),
+        base_url="http://localhost:8082",
+    )
+    control_app.state.proxy_client = inference_server_client
+    control_app.state.inference_server_readiness = InferenceServerReadiness(
+        inference_server_client,
+        control_app.state.inference_server_process_controller,
+        poll_interval_secs=0.01,
+    )
+    async with AsyncClient(
+        app=control_app, base_url="http://localhost:8080"
+    ) as async_client:
+        yield async_client
+
+
+@pytest.mark.anyio
+async def test_proxy_streams_request_body(proxy_client, fake_inference_server):
+    async def request_body():
+        for _ in range(4):
+            yield b"x" * 1024
+
+    resp = await proxy_client.post("/v1/models/model:predict", content=request_body())
+    assert resp.status_code == 200
+    assert resp.content == b"echo: " + b"x" * 4096
+    # Response headers are passed through, connection specific ones are set by
+    # the control server.
+    assert resp.headers["x-model-header"] == "1"
+    assert resp.headers["content-type"] == "text/plain"
+    assert fake_inference_server.requests[0].headers["transfer-encoding"] == "chunked"
+
+
+@pytest.mark.anyio
+async def test_proxy_resends_body_after_connect_error(
+    proxy_client, fake_inference_server
+):
+    fake_inference_server.connect_failures = 2
+    resp = await proxy_client.post("/v1/models/model:predict", content=b"body")
+    assert resp.status_code == 200
+    assert resp.content == b"echo: body"
+    assert [r.content for r in fake_inference_server.requests] == [b"body"] * 3
+
+
+@pytest.mark.anyio
+async def test_proxy_request_without_body(proxy_client, fake_inference_server):
+    resp = await proxy_client.get("/v1/models/model/schema")
+    assert resp.status_code == 200
+    assert resp.content == b"echo: "
+    headers = fake_inference_server.requests[0].headers
+    assert "transfer-encoding" not in headers
+
+
+@pytest.mark.anyio
+async def test_proxy_over_unix_socket(truss_container_fs, tmp_path):
+    uds_path = str(tmp_path / "inference_server.sock")
+
+    async def inference_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"over uds"})
+
+    server = uvicorn.Server(
+        uvicorn.Config(inference_app, uds=uds_path, lifespan="off", log_level="error")
+    )
+    serve_task = asyncio.create_task(server.serve())
+    try:
+        while not server.started:
+            await asyncio.sleep(0.01)
+        control_app = create_app(
+            {
+                "inference_server_home": truss_container_fs / "app",
+                "inference_server_process_args": ["python", "inference_server.py"],
+                "control_server_host": "*",
+                "control_server_port": 8081,
+                "inference_server_port": 8082,
+                "inference_server_uds_path": uds_path,
+                "oversee_inference_server": False,
+            }
+        )
+        async with AsyncClient(
+            app=control_app, base_url="http://localhost:8080"
+        ) as async_client:
+            resp = await async_client.post("/v1/models/model:predict", json={})
+        assert resp.status_code == 200
+        assert resp.content == b"over uds"
+    finally:
+        server.should_exit = True
+        await serve_task
+
+
 async def _verify_apply_patch_success(client, patch: Patch):
     resp = await client.get("/control/truss_hash")
     original_hash = resp.json()["result"]
@@ -236,6 +400,17 @@ async def _apply_patches(client, patches: List[Patch]):
     return await client.post("/control/patch", json=patch_request.to_dict())
 
 
+async def _apply_binary_patches(client, patches: List[Patch], base: bytes):
+    resp = await client.get("/control/truss_hash")
+    original_hash = resp.json()["result"]
+    body = encode_patch_request("dummy", original_hash, patches, lambda _: base)
+    return await client.post(
+        "/control/patch",
+        content=body,
+        headers={"Content-Type": PATCH_BINARY_MEDIA_TYPE},
+    )
+
+
 @contextmanager
 def _env_var(kvs: Dict[str, str]):
     orig_env = os.environ.copy()
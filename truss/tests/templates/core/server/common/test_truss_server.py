@@ -8,6 +8,7 @@ from multiprocessing import Process
 from pathlib import Path
 
 import pytest
+import requests
 import yaml
 
 
@@ -51,3 +52,41 @@ def _is_port_available(port):
     except socket.error:
         # Port is already in use
         return False
+
+
+@pytest.mark.integration
+def test_truss_server_preload_model(truss_container_fs):
+    port = 10124
+
+    def start_truss_server():
+        app_path = truss_container_fs / "app"
+        sys.path.append(str(app_path))
+
+        from common.truss_server import TrussServer
+
+        config = yaml.safe_load((app_path / "config.yaml").read_text())
+        config.setdefault("runtime", {}).update(num_workers=2, preload_model=True)
+        server = TrussServer(http_port=port, config=config, setup_json_logger=False)
+        server.start()
+
+    subproc = Process(target=start_truss_server)
+    subproc.start()
+    try:
+        metrics = ""
+        for _ in range(20):
+            time.sleep(0.5)
+            try:
+                ready = requests.get(f"http://localhost:{port}/v1/models/model")
+                metrics = requests.get(f"http://localhost:{port}/metrics").text
+            except requests.exceptions.ConnectionError:
+                continue
+            if ready.status_code == 200 and 'worker="1"' in metrics:
+                break
+        # The model was loaded before forking, so it's ready in both workers
+        # without loading it again.
+        assert ready.status_code == 200
+        assert 'truss_worker_pss_bytes{worker="0"}' in metrics
+        assert 'truss_worker_pss_bytes{worker="1"}' in metrics
+    finally:
+        os.kill(subproc.pid, signal.SIGTERM)
+        subproc.join(timeout=10)
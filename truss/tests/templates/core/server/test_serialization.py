@@ -0,0 +1,55 @@
+import json
+
+import numpy as np
+import pytest
+from truss.templates.shared.serialization import (
+    DeepNumpyEncoder,
+    truss_json_deserialize,
+    truss_json_serialize,
+)
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        {"a": 1, "b": "héllo", "c": [1.5, None, True]},
+        np.array([10.00001, 1e-5, 2.5e-5, 1e-4, 1e16, 1e15, -0.0, 1e-300, 5e-324]),
+        np.arange(10, dtype=np.int8),
+        np.array([2**63 - 1, 0], dtype=np.uint64),
+        np.array([True, False]),
+        np.array(3.5),
+        np.array([np.nan, np.inf, 1.0]),
+        np.array(["a", "b"]),
+        np.zeros((2, 0)),
+        np.arange(35, dtype=np.float64).reshape(5, 7).T / 3,
+        np.arange(6, dtype=">i4"),
+        np.linspace(-1, 1, 64, dtype=np.float16),
+        {"scalars": [np.float32(0.1), np.int64(3), np.float64(2.5)]},
+        [{"embedding": np.random.default_rng(0).standard_normal(4096)}] * 4,
+        [
+            {"embedding": np.random.default_rng(abs(i)).standard_normal(512) * 10.0**i}
+            for i in range(-12, 12)
+        ],
+        {"embedding": np.random.default_rng(0).standard_normal(512, np.float32)},
+    ],
+)
+def test_json_serialize_matches_deep_numpy_encoder(obj):
+    expected = json.dumps(obj, cls=DeepNumpyEncoder).encode("utf-8")
+    assert truss_json_serialize(obj) == expected
+
+
+def test_json_serialize_placeholder_like_strings_untouched():
+    obj = {"text": '"__truss_ndarray_0123456789abcdef0123456789abcdef_0__"'}
+    obj["array"] = np.arange(3)
+    expected = json.dumps(obj, cls=DeepNumpyEncoder).encode("utf-8")
+    assert truss_json_serialize(obj) == expected
+
+
+def test_json_deserialize():
+    assert truss_json_deserialize(b'{"a": [1, 2.5, "x"]}') == {"a": [1, 2.5, "x"]}
+    # Accepted by the stdlib decoder, but not by orjson.
+    decoded = truss_json_deserialize(b'{"a": NaN, "b": 123456789012345678901234567890}')
+    assert np.isnan(decoded["a"])
+    assert decoded["b"] == 123456789012345678901234567890
+    with pytest.raises(json.JSONDecodeError):
+        truss_json_deserialize(b"{invalid")
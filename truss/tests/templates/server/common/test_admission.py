@@ -0,0 +1,108 @@
+import asyncio
+from typing import List
+
+import pytest
+from truss.templates.server.common.admission import (
+    PrioritySemaphore,
+    QueueFullError,
+    QueueTimeoutError,
+)
+
+
+async def _hold(semaphore: PrioritySemaphore, order: List[str], name: str, **kwargs):
+    await semaphore.acquire(**kwargs)
+    order.append(name)
+    await asyncio.sleep(0.01)
+    semaphore.release()
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_admitted_by_priority_then_arrival():
+    semaphore = PrioritySemaphore(1)
+    order: List[str] = []
+    await semaphore.acquire()
+
+    tasks = []
+    for name, priority in [("batch1", 0), ("interactive1", 10), ("batch2", 0)]:
+        tasks.append(
+            asyncio.create_task(_hold(semaphore, order, name, priority=priority))
+        )
+        await asyncio.sleep(0)
+    tasks.append(
+        asyncio.create_task(_hold(semaphore, order, "interactive2", priority=10))
+    )
+    await asyncio.sleep(0)
+    assert semaphore.queue_depth == 4
+
+    semaphore.release()
+    await asyncio.gather(*tasks)
+
+    assert order == ["interactive1", "interactive2", "batch1", "batch2"]
+    assert semaphore.value == 1
+    assert semaphore.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_full_is_rejected_right_away():
+    semaphore = PrioritySemaphore(1)
+    await semaphore.acquire()
+    waiter = asyncio.create_task(semaphore.acquire(max_queue_depth=1))
+    await asyncio.sleep(0)
+
+    with pytest.raises(QueueFullError):
+        await semaphore.acquire(max_queue_depth=1)
+
+    semaphore.release()
+    await waiter
+    semaphore.release()
+    assert semaphore.value == 1
+
+
+@pytest.mark.asyncio
+async def test_queue_wait_timeout_gives_up_its_place():
+    semaphore = PrioritySemaphore(1)
+    await semaphore.acquire()
+
+    with pytest.raises(QueueTimeoutError):
+        await semaphore.acquire(timeout=0.01)
+    assert semaphore.queue_depth == 0
+
+    semaphore.release()
+    assert semaphore.value == 1
+
+
+@pytest.mark.asyncio
+async def test_timed_out_waiter_does_not_leak_the_slot(monkeypatch):
+    semaphore = PrioritySemaphore(1)
+    await semaphore.acquire()
+
+    async def wait_for(waiter, timeout):
+        # The slot is handed to the waiter in the loop iteration in which
+        # its timeout fires.
+        semaphore.release()
+        assert waiter.done()
+        raise asyncio.TimeoutError()
+
+    monkeypatch.setattr(asyncio, "wait_for", wait_for)
+    with pytest.raises(QueueTimeoutError):
+        await semaphore.acquire(timeout=1)
+    monkeypatch.undo()
+
+    assert semaphore.value == 1
+    assert semaphore.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_the_slot():
+    semaphore = PrioritySemaphore(1)
+    await semaphore.acquire()
+    waiter = asyncio.create_task(semaphore.acquire())
+    await asyncio.sleep(0)
+
+    # The slot is handed to the waiter, which is cancelled before it runs.
+    semaphore.release()
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert semaphore.value == 1
@@ -0,0 +1,196 @@
+import asyncio
+from typing import Any, List
+
+import pytest
+from truss.templates.server.common.batching import (
+    BatchSizeMismatchError,
+    DynamicBatcher,
+)
+
+
+class RecordingBatchFn:
+    def __init__(self):
+        self.batches: List[List[Any]] = []
+
+    async def __call__(self, items: List[Any]) -> List[Any]:
+        self.batches.append(list(items))
+        results: List[Any] = []
+        for item in items:
+            if item == "bad":
+                results.append(ValueError("bad input"))
+            else:
+                results.append(item * 2)
+        return results
+
+
+@pytest.mark.asyncio
+async def test_concurrent_submissions_are_batched():
+    batch_fn = RecordingBatchFn()
+    batcher = DynamicBatcher(batch_fn, max_batch_size=4, max_wait_ms=50)
+
+    results = await asyncio.gather(*[batcher.submit(i) for i in range(8)])
+
+    assert results == [i * 2 for i in range(8)]
+    assert [len(batch) for batch in batch_fn.batches] == [4, 4]
+    assert batcher.batch_size_distribution() == {4: 2}
+    batcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_partial_batch_flushed_after_max_wait():
+    batch_fn = RecordingBatchFn()
+    batcher = DynamicBatcher(batch_fn, max_batch_size=16, max_wait_ms=10)
+
+    results = await asyncio.wait_for(
+        asyncio.gather(batcher.submit(1), batcher.submit(2)), timeout=1
+    )
+
+    assert results == [2, 4]
+    assert batch_fn.batches == [[1, 2]]
+    batcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_per_item_exception_fails_only_that_request():
+    batcher = DynamicBatcher(RecordingBatchFn(), max_batch_size=3, max_wait_ms=50)
+
+    results = await asyncio.gather(
+        batcher.submit(1),
+        batcher.submit("bad"),
+        batcher.submit(3),
+        return_exceptions=True,
+    )
+
+    assert results[0] == 2
+    assert isinstance(results[1], ValueError)
+    assert results[2] == 6
+    batcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_failing_batch_is_retried_item_by_item():
+    calls: List[List[int]] = []
+
+    async def batch_fn(items):
+        calls.append(list(items))
+        if 13 in items:
+            raise RuntimeError("unlucky")
+        return items
+
+    batcher = DynamicBatcher(batch_fn, max_batch_size=3, max_wait_ms=50)
+    results = await asyncio.gather(
+        batcher.submit(1),
+        batcher.submit(13),
+        batcher.submit(3),
+        return_exceptions=True,
+    )
+
+    assert results[0] == 1
+    assert isinstance(results[1], RuntimeError)
+    assert results[2] == 3
+    assert calls[0] == [1, 13, 3]
+    assert sorted(calls[1:]) == [[1], [3], [13]]
+    batcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_result_length_mismatch():
+    async def batch_fn(items):
+        return []
+
+    batcher = DynamicBatcher(batch_fn, max_batch_size=1, max_wait_ms=0)
+    with pytest.raises(BatchSizeMismatchError):
+        await batcher.submit(1)
+    batcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_batches_grow_while_slot_is_busy():
+    slot = asyncio.Semaphore(1)
+    batch_sizes: List[int] = []
+
+    async def batch_fn(items):
+        batch_sizes.append(len(items))
+        await asyncio.sleep(0.1)
+        return items
+
+    batcher = DynamicBatcher(
+        batch_fn,
+        max_batch_size=32,
+        max_wait_ms=10,
+        acquire_slot=slot.acquire,
+        release_slot=slot.release,
+    )
+
+    async def submit_at(i):
+        await asyncio.sleep(i * 0.005)
+        return await batcher.submit(i)
+
+    results = await asyncio.gather(*[submit_at(i) for i in range(100)])
+
+    assert results == list(range(100))
+    # While a batch runs, the requests arriving meanwhile, about 20, gather
+    # into the next batch rather than into batches cut by `max_wait_ms`.
+    assert len(batch_sizes) <= 8
+    assert max(batch_sizes) >= 15
+    batcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_higher_priority_items_are_batched_first():
+    slot = asyncio.Semaphore(1)
+    batches: List[List[Any]] = []
+
+    async def batch_fn(items):
+        batches.append(list(items))
+        await asyncio.sleep(0.05)
+        return items
+
+    batcher = DynamicBatcher(
+        batch_fn,
+        max_batch_size=2,
+        max_wait_ms=0,
+        acquire_slot=slot.acquire,
+        release_slot=slot.release,
+    )
+    first = asyncio.create_task(batcher.submit("first"))
+    await asyncio.sleep(0.01)
+    await asyncio.gather(
+        first,
+        batcher.submit("low"),
+        batcher.submit("low"),
+        batcher.submit("high", priority=1),
+    )
+
+    assert batches[0] == ["first"]
+    assert batches[1][0] == "high"
+    batcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_submit_times_out_waiting_for_a_batch():
+    slot = asyncio.Semaphore(1)
+    batches: List[List[Any]] = []
+
+    async def batch_fn(items):
+        batches.append(list(items))
+        await asyncio.sleep(0.2)
+        return items
+
+    batcher = DynamicBatcher(
+        batch_fn,
+        max_batch_size=1,
+        max_wait_ms=0,
+        acquire_slot=slot.acquire,
+        release_slot=slot.release,
+    )
+    first = asyncio.create_task(batcher.submit(1, timeout=0.05))
+    await asyncio.sleep(0.01)
+    with pytest.raises(asyncio.TimeoutError):
+        await batcher.submit(2, timeout=0.05)
+    # A batch that got to run isn't timed out.
+    assert await first == 1
+    await asyncio.sleep(0.01)
+    assert batches == [[1]]
+    assert batcher.pending() == 0
+    batcher.stop()
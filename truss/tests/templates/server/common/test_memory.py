@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+from truss.templates.server.common.memory import WorkerMemory, process_memory
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Needs /proc")
+def test_process_memory():
+    memory = process_memory(os.getpid())
+
+    assert memory is not None
+    assert memory.rss > 0
+    assert 0 < memory.pss <= memory.rss
+
+
+def test_process_memory_of_missing_process():
+    assert process_memory(-1) is None
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Needs /proc")
+def test_worker_memory_renders_started_workers():
+    worker_memory = WorkerMemory(num_workers=2)
+    worker_memory.set_pid(0, os.getpid())
+
+    rendered = worker_memory.render()
+
+    assert 'truss_worker_rss_bytes{worker="0"}' in rendered
+    assert 'truss_worker_pss_bytes{worker="0"}' in rendered
+    assert 'worker="1"' not in rendered
@@ -0,0 +1,99 @@
+import multiprocessing
+
+import pytest
+from truss.templates.server.common.metrics import (
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+)
+
+
+def test_counter_and_gauge_render():
+    counter = Counter("test_requests_total", "Requests.", registry=[])
+    gauge = Gauge(
+        "test_in_flight",
+        "In flight.",
+        label_name="kind",
+        label_values=("a", "b"),
+        registry=[],
+    )
+    counter.inc()
+    counter.inc(2)
+    gauge.inc(label="a")
+    gauge.inc(label="b")
+    gauge.dec(label="b")
+
+    assert counter.render() == (
+        "# HELP test_requests_total Requests.\n"
+        "# TYPE test_requests_total counter\n"
+        "test_requests_total 3"
+    )
+    assert gauge.render().splitlines()[2:] == [
+        'test_in_flight{kind="a"} 1',
+        'test_in_flight{kind="b"} 0',
+    ]
+
+
+def test_metrics_are_added_to_their_registry():
+    registry = []
+    counter = Counter("test_registered_total", "Registered.", registry=registry)
+
+    assert registry == [counter]
+    assert counter not in REGISTRY
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(
+        "test_latency_seconds", "Latency.", buckets=(0.1, 1.0), registry=[]
+    )
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    assert histogram.count() == 4
+    assert histogram.render().splitlines()[2:] == [
+        'test_latency_seconds_bucket{le="0.1"} 2',
+        'test_latency_seconds_bucket{le="1"} 3',
+        'test_latency_seconds_bucket{le="+Inf"} 4',
+        "test_latency_seconds_sum 2.65",
+        "test_latency_seconds_count 4",
+    ]
+
+
+def test_histogram_timer_observes_per_label():
+    histogram = Histogram(
+        "test_stage_seconds",
+        "Stages.",
+        label_name="stage",
+        label_values=("x", "y"),
+        registry=[],
+    )
+    with histogram.time("y"):
+        pass
+
+    assert histogram.count("x") == 0
+    assert histogram.count("y") == 1
+
+
+def _increment(counter: Counter, times: int):
+    for _ in range(times):
+        counter.inc()
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(),
+    reason="Metrics are shared with forked server processes",
+)
+def test_values_are_aggregated_across_forked_processes():
+    counter = Counter("test_shared_total", "Shared.", registry=[])
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=_increment, args=(counter, 100)) for _ in range(2)
+    ]
+    for process in processes:
+        process.start()
+    _increment(counter, 100)
+    for process in processes:
+        process.join()
+
+    assert counter.value() == 300
@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+import pytest
+from truss.templates.server.common.response_cache import CacheOutcome, ResponseCache
+
+
+def test_least_recently_used_entries_are_evicted_beyond_max_bytes():
+    evicted = []
+    cache = ResponseCache(max_bytes=10, ttl_secs=60, on_evict=evicted.append)
+    cache.put("a", "A", 4)
+    cache.put("b", "B", 4)
+    assert cache.get("a") == (True, "A")
+
+    cache.put("c", "C", 4)
+
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, "A")
+    assert cache.get("c") == (True, "C")
+    assert cache.size == 8
+    assert evicted == ["size"]
+
+
+def test_entries_larger_than_max_bytes_are_not_cached():
+    cache = ResponseCache(max_bytes=10, ttl_secs=60)
+    cache.put("a", "A", 11)
+
+    assert len(cache) == 0
+
+
+def test_expired_entries_are_evicted(monkeypatch):
+    cache = ResponseCache(max_bytes=10, ttl_secs=60)
+    cache.put("a", "A", 1)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+
+    assert cache.get("a") == (False, None)
+    assert cache.evictions == 1
+    assert cache.size == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_coalesced():
+    cache = ResponseCache(max_bytes=100, ttl_secs=60)
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"y": 1}
+
+    results = await asyncio.gather(
+        *[cache.get_or_compute("k", compute, lambda _: 1) for _ in range(5)]
+    )
+
+    assert calls == 1
+    assert [value for value, _ in results] == [{"y": 1}] * 5
+    assert [outcome for _, outcome in results] == [CacheOutcome.MISS] + [
+        CacheOutcome.COALESCED
+    ] * 4
+    assert await cache.get_or_compute("k", compute, lambda _: 1) == (
+        {"y": 1},
+        CacheOutcome.HIT,
+    )
+
+
+@pytest.mark.asyncio
+async def test_uncacheable_responses_and_errors_are_not_cached():
+    cache = ResponseCache(max_bytes=100, ttl_secs=60)
+
+    async def compute():
+        return "stream"
+
+    async def fail():
+        raise ValueError("boom")
+
+    await cache.get_or_compute("stream", compute, lambda _: None)
+    with pytest.raises(ValueError):
+        await cache.get_or_compute("fail", fail, lambda _: 1)
+
+    assert len(cache) == 0
+    assert cache.misses == 2
@@ -0,0 +1,157 @@
+import asyncio
+import threading
+import time
+from typing import Any, List
+
+import pytest
+from truss.templates.server.common.streaming import StreamBuffer, SyncGeneratorPump
+
+
+async def _read_all(buffer: StreamBuffer) -> List[Any]:
+    chunks = []
+    while True:
+        try:
+            chunks.append(await buffer.get())
+        except StopAsyncIteration:
+            return chunks
+
+
+async def _produce(buffer: StreamBuffer, chunks: List[Any], delay: float = 0):
+    for chunk in chunks:
+        await buffer.put(chunk)
+        if delay:
+            await asyncio.sleep(delay)
+    buffer.close()
+
+
+@pytest.mark.asyncio
+async def test_chunks_are_read_in_order_including_none():
+    buffer = StreamBuffer(maxsize=4)
+    chunks = [1, None, "a", b"b", {"c": 1}]
+    producer = asyncio.create_task(_produce(buffer, chunks))
+
+    assert await _read_all(buffer) == chunks
+    await producer
+
+
+@pytest.mark.asyncio
+async def test_producer_waits_when_buffer_is_full():
+    buffer = StreamBuffer(maxsize=2)
+    producer = asyncio.create_task(_produce(buffer, list(range(5))))
+    await asyncio.sleep(0.01)
+
+    assert not producer.done()
+    assert buffer.qsize() == 2
+
+    assert await _read_all(buffer) == list(range(5))
+    await producer
+
+
+@pytest.mark.asyncio
+async def test_read_timeout():
+    buffer = StreamBuffer(read_timeout=0.05)
+    await buffer.put("a")
+
+    assert await buffer.get() == "a"
+    with pytest.raises(asyncio.TimeoutError):
+        await buffer.get()
+
+
+@pytest.mark.asyncio
+async def test_read_timeout_is_per_gap_not_total():
+    buffer = StreamBuffer(read_timeout=0.05)
+    # Takes longer than the timeout in total, but each gap is shorter.
+    producer = asyncio.create_task(_produce(buffer, list(range(10)), delay=0.02))
+
+    assert await _read_all(buffer) == list(range(10))
+    await producer
+    buffer.cancel_timers()
+
+
+@pytest.mark.asyncio
+async def test_coalesces_buffered_chunks():
+    buffer = StreamBuffer(coalesce_bytes=4)
+    for chunk in ["a", "b", "c", "d", "e", b"f", b"g"]:
+        await buffer.put(chunk)
+    buffer.close()
+
+    assert await _read_all(buffer) == ["abcd", "e", b"fg"]
+
+
+@pytest.mark.asyncio
+async def test_coalesces_within_flush_interval():
+    buffer = StreamBuffer(coalesce_bytes=1000, flush_interval_ms=200)
+    producer = asyncio.create_task(_produce(buffer, ["a", "b", "c"], delay=0.01))
+
+    assert await _read_all(buffer) == ["abc"]
+    await producer
+
+
+async def _collect(stream) -> List[Any]:
+    return [chunk async for chunk in stream]
+
+
+def _iter_gen(chunks):
+    yield from chunks
+
+
+@pytest.mark.asyncio
+async def test_sync_generator_pump_yields_all_chunks():
+    chunks = list(range(1000)) + [None]
+    assert await _collect(SyncGeneratorPump(_iter_gen(chunks)).stream()) == chunks
+
+
+@pytest.mark.asyncio
+async def test_sync_generator_pump_does_not_block_loop():
+    def slow_gen():
+        for i in range(3):
+            time.sleep(0.05)
+            yield i
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    ticker_task = asyncio.create_task(ticker())
+    assert await _collect(SyncGeneratorPump(slow_gen()).stream()) == [0, 1, 2]
+    ticker_task.cancel()
+    assert ticks >= 5
+
+
+@pytest.mark.asyncio
+async def test_sync_generator_pump_propagates_exceptions():
+    def failing_gen():
+        yield 1
+        raise ValueError("boom")
+
+    stream = SyncGeneratorPump(failing_gen()).stream()
+    assert await stream.__anext__() == 1
+    with pytest.raises(ValueError, match="boom"):
+        await stream.__anext__()
+
+
+@pytest.mark.asyncio
+async def test_sync_generator_pump_backpressure_and_close():
+    produced = 0
+    closed = threading.Event()
+
+    def gen():
+        nonlocal produced
+        try:
+            while True:
+                produced += 1
+                yield produced
+        finally:
+            closed.set()
+
+    stream = SyncGeneratorPump(gen(), max_pending=8).stream()
+    assert await stream.__anext__() == 1
+    await asyncio.sleep(0.05)
+    # At most max_pending chunks are produced ahead of the reader.
+    assert produced <= 1 + 8 + 1
+    await stream.aclose()
+    assert await asyncio.get_running_loop().run_in_executor(None, closed.wait, 1)
@@ -1,3 +1,4 @@
+import asyncio
 import importlib
 import sys
 import time
@@ -6,6 +7,7 @@ from typing import Any
 
 import pytest
 import yaml
+from fastapi import HTTPException
 
 
 @pytest.fixture
@@ -85,3 +87,326 @@ async def test_model_wrapper_streaming_timeout(app_path):
     model_wrapper = model_wraper_class(config)
     model_wrapper.load()
     assert model_wrapper._config.get("runtime").get("streaming_read_timeout") == 5
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_model_wrapper_dynamic_batching(truss_container_fs: Path, helpers: Any):
+    app_path = truss_container_fs / "app"
+    model_file_content = """
+class Model:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict_batch(self, requests):
+        self.batch_sizes.append(len(requests))
+        return [
+            ValueError("negative") if request["x"] < 0 else {"y": request["x"] * 2}
+            for request in requests
+        ]
+    """
+    with helpers.file_content(
+        app_path / "model" / "model.py", model_file_content
+    ), helpers.sys_path(app_path):
+        model_wrapper_module = _import_model_wrapper_module()
+        config = yaml.safe_load((app_path / "config.yaml").read_text())
+        config["runtime"]["max_batch_size"] = 4
+        config["runtime"]["max_wait_ms"] = 100
+        model_wrapper = model_wrapper_module.ModelWrapper(config)
+        model_wrapper.load()
+        assert model_wrapper.batching_enabled
+
+        results = await asyncio.gather(
+            *[model_wrapper({"x": x}) for x in [1, 2, -1, 3]],
+            return_exceptions=True,
+        )
+
+        assert results[0] == {"y": 2}
+        assert results[1] == {"y": 4}
+        assert isinstance(results[2], HTTPException)
+        assert results[2].status_code == 500
+        assert results[3] == {"y": 6}
+        assert model_wrapper._model.batch_sizes == [4]
+        assert model_wrapper.batch_size_distribution() == {4: 1}
+        model_wrapper._batcher.stop()
+        await asyncio.sleep(0)
+
+
+def _import_model_wrapper_module():
+    # Each test writes its own model code, so drop previously imported models.
+    for module_name in list(sys.modules):
+        if module_name == "model" or module_name.startswith("model."):
+            del sys.modules[module_name]
+    if "model_wrapper" in sys.modules:
+        model_wrapper_module = sys.modules["model_wrapper"]
+        importlib.reload(model_wrapper_module)
+    else:
+        model_wrapper_module = importlib.import_module("model_wrapper")
+    return model_wrapper_module
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_model_wrapper_cancels_stream_on_disconnect(
+    truss_container_fs: Path, helpers: Any
+):
+    app_path = truss_container_fs / "app"
+    model_file_content = """
+import time
+
+class Model:
+    def __init__(self):
+        self.num_chunks = 0
+        self.closed = False
+
+    def predict(self, request):
+        try:
+            for i in range(1000):
+                time.sleep(0.01)
+                self.num_chunks += 1
+                yield str(i)
+        finally:
+            self.closed = True
+    """
+    with helpers.file_content(
+        app_path / "model" / "model.py", model_file_content
+    ), helpers.sys_path(app_path):
+        model_wrapper_module = _import_model_wrapper_module()
+        config = yaml.safe_load((app_path / "config.yaml").read_text())
+        model_wrapper = model_wrapper_module.ModelWrapper(config)
+        model_wrapper.load()
+
+        # The response stops being read, as happens when the streaming response
+        # gets cancelled on client disconnect.
+        response = await model_wrapper({})
+        assert await response.__anext__() == "0"
+        await response.aclose()
+        await asyncio.sleep(0.1)
+        assert model_wrapper._model.closed
+        assert model_wrapper._model.num_chunks < 1000
+        assert model_wrapper.num_cancelled_streams == 1
+        assert model_wrapper._predict_semaphore.value == 1
+
+        # Disconnect is detected while the response is being consumed as json.
+        model_wrapper._model.closed = False
+        start = time.monotonic()
+
+        async def is_disconnected():
+            return time.monotonic() - start > 0.2
+
+        with pytest.raises(HTTPException) as exc_info:
+            await model_wrapper(
+                {},
+                headers={"accept": "application/json"},
+                is_disconnected=is_disconnected,
+            )
+        assert exc_info.value.status_code == 499
+        # The generator is closed on the thread driving it.
+        await asyncio.sleep(0.1)
+        assert model_wrapper._model.closed
+        assert model_wrapper.num_cancelled_streams == 2
+        assert model_wrapper._predict_semaphore.value == 1
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_model_wrapper_rejects_requests_beyond_queue_limits(
+    truss_container_fs: Path, helpers: Any
+):
+    app_path = truss_container_fs / "app"
+    model_file_content = """
+import asyncio
+
+class Model:
+    async def predict(self, request):
+        await asyncio.sleep(0.2)
+        return request
+    """
+    with helpers.file_content(
+        app_path / "model" / "model.py", model_file_content
+    ), helpers.sys_path(app_path):
+        model_wrapper_module = _import_model_wrapper_module()
+        config = yaml.safe_load((app_path / "config.yaml").read_text())
+        config["runtime"]["max_queue_depth"] = 1
+        config["runtime"]["max_queue_wait_ms"] = 300
+        model_wrapper = model_wrapper_module.ModelWrapper(config)
+        model_wrapper.load()
+
+        first = asyncio.create_task(model_wrapper({"x": 1}))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(model_wrapper({"x": 2}))
+        await asyncio.sleep(0.01)
+        assert model_wrapper.queue_depth() == 1
+
+        with pytest.raises(HTTPException) as exc_info:
+            await model_wrapper({"x": 3})
+        assert exc_info.value.status_code == 429
+        assert exc_info.value.headers["Retry-After"] == "1"
+
+        assert await first == {"x": 1}
+        assert await second == {"x": 2}
+
+        config["runtime"]["max_queue_depth"] = None
+        config["runtime"]["max_queue_wait_ms"] = 100
+        model_wrapper = model_wrapper_module.ModelWrapper(config)
+        model_wrapper.load()
+
+        first = asyncio.create_task(model_wrapper({"x": 1}))
+        await asyncio.sleep(0.01)
+        with pytest.raises(HTTPException) as exc_info:
+            await model_wrapper({"x": 2})
+        assert exc_info.value.status_code == 503
+        assert await first == {"x": 1}
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_model_wrapper_admission_control_with_batching(
+    truss_container_fs: Path, helpers: Any
+):
+    app_path = truss_container_fs / "app"
+    model_file_content = """
+import asyncio
+
+class Model:
+    async def predict_batch(self, requests):
+        await asyncio.sleep(0.2)
+        return requests
+    """
+    with helpers.file_content(
+        app_path / "model" / "model.py", model_file_content
+    ), helpers.sys_path(app_path):
+        model_wrapper_module = _import_model_wrapper_module()
+        config = yaml.safe_load((app_path / "config.yaml").read_text())
+        config["runtime"]["max_batch_size"] = 4
+        config["runtime"]["max_wait_ms"] = 0
+        config["runtime"]["max_queue_depth"] = 2
+        config["runtime"]["max_queue_wait_ms"] = 100
+        model_wrapper = model_wrapper_module.ModelWrapper(config)
+        model_wrapper.load()
+
+        first = asyncio.create_task(model_wrapper({"x": 1}))
+        await asyncio.sleep(0.01)
+        waiting = [asyncio.create_task(model_wrapper({"x": x})) for x in range(2, 4)]
+        await asyncio.sleep(0.01)
+        # Requests, rather than batches, waiting for predict.
+        assert model_wrapper.queue_depth() == 2
+
+        with pytest.raises(HTTPException) as exc_info:
+            await model_wrapper({"x": 4})
+        assert exc_info.value.status_code == 429
+
+        assert await first == {"x": 1}
+        for task in waiting:
+            with pytest.raises(HTTPException) as exc_info:
+                await task
+            assert exc_info.value.status_code == 503
+        assert model_wrapper.queue_depth() == 0
+        model_wrapper._batcher.stop()
+        await asyncio.sleep(0)
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_model_wrapper_response_cache(truss_container_fs: Path, helpers: Any):
+    app_path = truss_container_fs / "app"
+    model_file_content = """
+import asyncio
+
+class Model:
+    def __init__(self):
+        self.num_predicts = 0
+
+    async def predict(self, request):
+        self.num_predicts += 1
+        await asyncio.sleep(0.01)
+        if request.get("stream"):
+            return (chunk for chunk in ["a", "b"])
+        return {"y": request["x"] * 2}
+    """
+    with helpers.file_content(
+        app_path / "model" / "model.py", model_file_content
+    ), helpers.sys_path(app_path):
+        model_wrapper_module = _import_model_wrapper_module()
+        config = yaml.safe_load((app_path / "config.yaml").read_text())
+        config["runtime"]["enable_response_cache"] = True
+        config["runtime"]["predict_concurrency"] = 4
+        model_wrapper = model_wrapper_module.ModelWrapper(config)
+        model_wrapper.load()
+
+        results = await asyncio.gather(*[model_wrapper({"x": 1}) for _ in range(4)])
+        assert results == [{"y": 2}] * 4
+        assert await model_wrapper({"x": 1}) == {"y": 2}
+        assert model_wrapper._model.num_predicts == 1
+
+        assert await model_wrapper({"x": 2}) == {"y": 4}
+        assert model_wrapper._model.num_predicts == 2
+
+        # Streams are neither cached nor shared between requests.
+        streams = await asyncio.gather(
+            *[model_wrapper({"stream": True}) for _ in range(2)]
+        )
+        for stream in streams:
+            assert [chunk async for chunk in stream] == ["a", "b"]
+        assert model_wrapper._model.num_predicts == 4
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_model_wrapper_hot_reload(truss_container_fs: Path, helpers: Any):
+    app_path = truss_container_fs / "app"
+    model_file_content = """
+import asyncio
+
+class Model:
+    def __init__(self):
+        self.weights = None
+
+    def load(self):
+        self.weights = object()
+
+    async def predict(self, request):
+        await asyncio.sleep(request.get("sleep", 0))
+        return {"version": 1}
+    """
+    reloadable_model_file_content = """
+class Model:
+    def __init__(self):
+        self.weights = None
+
+    def reload(self, previous_model):
+        self.weights = previous_model.weights
+
+    def predict(self, request):
+        return {"version": 2}
+    """
+    with helpers.file_content(
+        app_path / "model" / "model.py", model_file_content
+    ), helpers.sys_path(app_path):
+        model_wrapper_module = _import_model_wrapper_module()
+        errors_module = importlib.import_module("common.errors")
+        config = yaml.safe_load((app_path / "config.yaml").read_text())
+        model_wrapper = model_wrapper_module.ModelWrapper(config)
+        model_wrapper.load()
+        weights = model_wrapper._model.weights
+        model_module = sys.modules["model.model"]
+
+        # The new model code can't take over the loaded model.
+        (app_path / "model" / "model.py").write_text(
+            model_file_content.replace("version", "new_version")
+        )
+        with pytest.raises(errors_module.HotReloadUnavailable):
+            await model_wrapper.hot_reload()
+        assert await model_wrapper({}) == {"version": 1}
+        # Imports by the running model still get its own code.
+        assert sys.modules["model.model"] is model_module
+
+        (app_path / "model" / "model.py").write_text(reloadable_model_file_content)
+        in_flight = asyncio.create_task(model_wrapper({"sleep": 0.2}))
+        await asyncio.sleep(0.05)
+        await model_wrapper.hot_reload()
+        # The swap waits for requests in flight.
+        assert in_flight.done()
+        assert await in_flight == {"version": 1}
+        assert await model_wrapper({}) == {"version": 2}
+        assert model_wrapper._model.weights is weights
@@ -3,6 +3,7 @@ from typing import List
 
 from truss.patch.dir_signature import directory_content_signature
 from truss.truss_gatherer import gather
+from truss.truss_handle import TrussHandle
 
 
 def test_gather(custom_model_with_external_package):
@@ -35,3 +36,23 @@ def _same_dir_content(dir1: Path, dir2: Path, ignore_paths: List[str]) -> bool:
     for path in ignore_paths:
         del sig2[path]
     return sig1 == sig2
+
+
+def test_gather_syncs_changes(custom_model_with_external_package):
+    truss_dir = custom_model_with_external_package
+    gathered_truss_path = gather(truss_dir)
+    ext_pkg_path = truss_dir.parent / "ext_pkg"
+
+    (ext_pkg_path / "top_module.py").write_text("x = 1")
+    (ext_pkg_path / "subdir" / "sub_module.py").unlink()
+    (truss_dir / "model" / "helpers.py").write_text("y = 1")
+
+    assert gather(truss_dir) == gathered_truss_path
+    packages_dir = gathered_truss_path / "packages"
+    assert (packages_dir / "top_module.py").read_text() == "x = 1"
+    assert not (packages_dir / "subdir" / "sub_module.py").exists()
+    assert (packages_dir / "subdir").is_dir()
+    assert (gathered_truss_path / "model" / "helpers.py").read_text() == "y = 1"
+    # The original config still has the external packages.
+    assert TrussHandle(truss_dir).spec.external_package_dirs_paths
+    assert not TrussHandle(gathered_truss_path).spec.external_package_dirs_paths
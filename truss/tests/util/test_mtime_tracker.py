@@ -0,0 +1,102 @@
+import os
+import time
+from pathlib import Path
+
+from truss.util.mtime_tracker import (
+    MaxModifiedTimeTracker,
+    invalidate_max_modified_time_of_dir,
+    max_modified_time_tracking,
+    tracked_max_modified_time_of_dir,
+)
+from truss.util.path import get_max_modified_time_of_dir
+
+
+def _set_mtime(path: Path, mtime: float):
+    os.utime(path, (mtime, mtime))
+
+
+def _wait_for(condition, timeout_secs: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout_secs
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def _make_tree(root: Path) -> Path:
+    (root / "model").mkdir()
+    (root / "model" / "model.py").write_text("1")
+    (root / ".hidden").write_text("1")
+    for path in [root / "model" / "model.py", root / "model", root / ".hidden", root]:
+        _set_mtime(path, 1000)
+    return root / "model" / "model.py"
+
+
+def test_reuses_walk_within_ttl(tmp_path):
+    model_file = _make_tree(tmp_path)
+    tracker = MaxModifiedTimeTracker(tmp_path, ttl_secs=60, use_events=False)
+    assert tracker.get() == 1000
+
+    _set_mtime(model_file, 2000)
+    assert tracker.get() == 1000
+    tracker.invalidate()
+    assert tracker.get() == 2000
+
+
+def test_walks_again_after_ttl(tmp_path):
+    model_file = _make_tree(tmp_path)
+    tracker = MaxModifiedTimeTracker(tmp_path, ttl_secs=0, use_events=False)
+    assert tracker.get() == 1000
+
+    _set_mtime(model_file, 2000)
+    assert tracker.get() == 2000
+    _set_mtime(model_file, 1500)
+    assert tracker.get() == 1500
+
+
+def test_file_events(tmp_path):
+    model_file = _make_tree(tmp_path)
+    tracker = MaxModifiedTimeTracker(tmp_path, ttl_secs=0)
+    try:
+        assert tracker.get() == 1000
+        # Asked for again, so the watcher is started.
+        assert tracker.get() == 1000
+        assert _wait_for(lambda: tracker._watching)
+        time.sleep(0.2)
+
+        model_file.write_text("2")
+        assert _wait_for(lambda: tracker.get() == model_file.stat().st_mtime)
+        assert tracker.get() == get_max_modified_time_of_dir(tmp_path)
+
+        mtime = tracker.get()
+        (tmp_path / ".hidden").write_text("2")
+        time.sleep(0.3)
+        assert tracker.get() == mtime
+
+        (tmp_path / "model" / "other.py").write_text("1")
+        assert _wait_for(lambda: tracker.get() > mtime)
+        assert tracker.get() == get_max_modified_time_of_dir(tmp_path)
+
+        # Going back in time needs a walk.
+        for path in tmp_path.rglob("*"):
+            _set_mtime(path, 1000)
+        _set_mtime(tmp_path, 1000)
+        assert _wait_for(lambda: tracker.get() == 1000)
+    finally:
+        tracker.close()
+
+
+def test_tracking_context(tmp_path):
+    model_file = _make_tree(tmp_path)
+    assert tracked_max_modified_time_of_dir(tmp_path) == 1000
+    with max_modified_time_tracking():
+        assert tracked_max_modified_time_of_dir(tmp_path) == 1000
+        _set_mtime(model_file, 2000)
+        with max_modified_time_tracking():
+            assert tracked_max_modified_time_of_dir(tmp_path) == 1000
+        invalidate_max_modified_time_of_dir(tmp_path)
+        assert tracked_max_modified_time_of_dir(tmp_path) == 2000
+        _set_mtime(model_file, 3000)
+    # Outside of the context, the directory is always walked.
+    assert tracked_max_modified_time_of_dir(tmp_path) == 3000
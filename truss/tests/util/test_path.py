@@ -230,3 +230,115 @@ def test_get_ignored_relative_paths_from_root(custom_model_truss_dir_with_hidden
         all_relative_path_strs
         == ignored_relative_paths_strs | unignored_relative_path_strs
     )
+
+
+def _glob_unignored_relative_paths(root, ignore_patterns):
+    # How unignored paths were listed before pruning ignored directories.
+    root_relative_paths = set(p.relative_to(root) for p in root.glob("**/*"))
+    return root_relative_paths - set(
+        path.get_ignored_relative_paths(root_relative_paths, ignore_patterns)
+    )
+
+
+def _make_tree(root: Path):
+    for relative_path in [
+        "config.yaml",
+        "model/model.py",
+        "model/__pycache__/model.cpython-311.pyc",
+        ".git/objects/ab/cdef",
+        "node_modules/pkg/index.js",
+        "data/keep.py",
+        "data/weights.tmp",
+        "data/nested/deep/file.txt",
+    ]:
+        (root / relative_path).parent.mkdir(parents=True, exist_ok=True)
+        (root / relative_path).write_text(relative_path)
+    (root / "model_link").symlink_to(root / "model", target_is_directory=True)
+
+
+def test_ignore_matcher_walk_matches_glob(tmp_path):
+    _make_tree(tmp_path)
+    patterns_lists = [
+        None,
+        [],
+        path.load_trussignore_patterns(),
+        ["node_modules/", "data/*", "*.tmp"],
+        ["data", "!keep.py"],
+        ["/model/", "deep/"],
+    ]
+    for patterns in patterns_lists:
+        assert path.get_unignored_relative_paths_from_root(
+            tmp_path, patterns
+        ) == _glob_unignored_relative_paths(tmp_path, patterns)
+
+
+def test_ignore_matcher_walk_prunes_ignored_directories(tmp_path, monkeypatch):
+    _make_tree(tmp_path)
+    scanned = []
+    scandir = os.scandir
+
+    def recording_scandir(dir_path):
+        scanned.append(Path(dir_path).relative_to(tmp_path))
+        return scandir(dir_path)
+
+    monkeypatch.setattr(os, "scandir", recording_scandir)
+    matcher = path.IgnoreMatcher([".git", "node_modules/", "__pycache__/"])
+    relative_paths = {relative_path for relative_path, _ in matcher.walk(tmp_path)}
+
+    assert Path("node_modules") in relative_paths
+    assert Path("model/__pycache__") in relative_paths
+    assert Path(".git") not in relative_paths
+    assert not {Path(".git"), Path("node_modules"), Path("model/__pycache__")} & set(
+        scanned
+    )
+
+
+def test_sync_tree(tmp_path):
+    src = tmp_path / "src"
+    (src / "pkg").mkdir(parents=True)
+    (src / "pkg" / "module.py").write_text("x = 1")
+    (src / "config.yaml").write_text("a: 1")
+    dest = tmp_path / "dest"
+    (dest / "stale_dir").mkdir(parents=True)
+    (dest / "stale_dir" / "stale.py").write_text("")
+    (dest / "pkg").write_text("a file where a directory should be")
+    files = {
+        "pkg/module.py": src / "pkg" / "module.py",
+        "config.yaml": src / "config.yaml",
+    }
+
+    assert path.sync_tree(dest, files, ["empty"], copy_only={"config.yaml"}) == 2
+
+    assert sorted(p.relative_to(dest).as_posix() for p in dest.glob("**/*")) == [
+        "config.yaml",
+        "empty",
+        "pkg",
+        "pkg/module.py",
+    ]
+    assert (dest / "pkg" / "module.py").read_text() == "x = 1"
+    # Files written to in the destination are never linked to their source.
+    (dest / "config.yaml").write_text("a: 2")
+    assert (src / "config.yaml").read_text() == "a: 1"
+
+    # Only changed files are synced again.
+    assert path.sync_tree(dest, files, ["empty"], copy_only={"config.yaml"}) == 1
+    time.sleep(0.01)
+    (src / "pkg" / "module.py").unlink()
+    (src / "pkg" / "module.py").write_text("x = 22")
+    assert path.sync_tree(dest, files, copy_only={"config.yaml"}) == 2
+    assert (dest / "pkg" / "module.py").read_text() == "x = 22"
+    assert not (dest / "empty").exists()
+
+
+def test_link_or_copy_file_replaces_dest(tmp_path):
+    src = tmp_path / "src.py"
+    src.write_text("new")
+    old_src = tmp_path / "old_src.py"
+    old_src.write_text("old")
+    dest = tmp_path / "dest.py"
+    path.link_or_copy_file(old_src, dest)
+
+    path.link_or_copy_file(src, dest)
+
+    assert dest.read_text() == "new"
+    assert old_src.read_text() == "old"
@@ -31,7 +31,13 @@ DEFAULT_EXAMPLES_FILENAME = "examples.yaml"
 DEFAULT_SPEC_VERSION = "2.0"
 DEFAULT_PREDICT_CONCURRENCY = 1
 DEFAULT_NUM_WORKERS = 1
+DEFAULT_SYNC_THREAD_POOL_SIZE = 40
 DEFAULT_STREAMING_RESPONSE_READ_TIMEOUT = 60
+DEFAULT_STREAMING_BUFFER_SIZE = 1024
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_BATCH_MAX_WAIT_MS = 10
+DEFAULT_RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_RESPONSE_CACHE_TTL_SECS = 60
 
 DEFAULT_CPU = "1"
 DEFAULT_MEMORY = "2Gi"
@@ -140,27 +146,92 @@ class ModelCache:
 class Runtime:
     predict_concurrency: int = DEFAULT_PREDICT_CONCURRENCY
     num_workers: int = DEFAULT_NUM_WORKERS
+    # Load the model once before starting the `num_workers` server processes,
+    # which then share its memory copy-on-write.
+    preload_model: bool = False
+    # Max number of threads running sync preprocess/predict/postprocess.
+    sync_thread_pool_size: int = DEFAULT_SYNC_THREAD_POOL_SIZE
     streaming_read_timeout: int = DEFAULT_STREAMING_RESPONSE_READ_TIMEOUT
+    streaming_buffer_size: int = DEFAULT_STREAMING_BUFFER_SIZE
+    # Coalescing of small str/bytes stream chunks, off by default.
+    streaming_coalesce_bytes: int = 0
+    streaming_flush_interval_ms: int = 0
+    # Dynamic batching, only used by models that implement `predict_batch`.
+    max_batch_size: int = DEFAULT_MAX_BATCH_SIZE
+    max_wait_ms: int = DEFAULT_BATCH_MAX_WAIT_MS
+    # Admission control, requests beyond these limits are rejected with a 429
+    # or 503 rather than queued for predict. Unlimited by default.
+    max_queue_depth: Optional[int] = None
+    max_queue_wait_ms: Optional[int] = None
+    # Cache of non-streaming responses keyed by the validated input, for
+    # deterministic models. Concurrent identical requests share one predict.
+    enable_response_cache: bool = False
+    response_cache_max_bytes: int = DEFAULT_RESPONSE_CACHE_MAX_BYTES
+    response_cache_ttl_secs: int = DEFAULT_RESPONSE_CACHE_TTL_SECS
 
     @staticmethod
     def from_dict(d):
         predict_concurrency = d.get("predict_concurrency", DEFAULT_PREDICT_CONCURRENCY)
         num_workers = d.get("num_workers", DEFAULT_NUM_WORKERS)
+        preload_model = d.get("preload_model", False)
+        sync_thread_pool_size = d.get(
+            "sync_thread_pool_size", DEFAULT_SYNC_THREAD_POOL_SIZE
+        )
         streaming_read_timeout = d.get(
             "streaming_read_timeout", DEFAULT_STREAMING_RESPONSE_READ_TIMEOUT
         )
+        streaming_buffer_size = d.get(
+            "streaming_buffer_size", DEFAULT_STREAMING_BUFFER_SIZE
+        )
+        streaming_coalesce_bytes = d.get("streaming_coalesce_bytes", 0)
+        streaming_flush_interval_ms = d.get("streaming_flush_interval_ms", 0)
+        max_batch_size = d.get("max_batch_size", DEFAULT_MAX_BATCH_SIZE)
+        max_wait_ms = d.get("max_wait_ms", DEFAULT_BATCH_MAX_WAIT_MS)
+        max_queue_depth = d.get("max_queue_depth")
+        max_queue_wait_ms = d.get("max_queue_wait_ms")
+        enable_response_cache = d.get("enable_response_cache", False)
+        response_cache_max_bytes = d.get(
+            "response_cache_max_bytes", DEFAULT_RESPONSE_CACHE_MAX_BYTES
+        )
+        response_cache_ttl_secs = d.get(
+            "response_cache_ttl_secs", DEFAULT_RESPONSE_CACHE_TTL_SECS
+        )
 
         return Runtime(
             predict_concurrency=predict_concurrency,
             num_workers=num_workers,
+            preload_model=preload_model,
+            sync_thread_pool_size=sync_thread_pool_size,
             streaming_read_timeout=streaming_read_timeout,
+            streaming_buffer_size=streaming_buffer_size,
+            streaming_coalesce_bytes=streaming_coalesce_bytes,
+            streaming_flush_interval_ms=streaming_flush_interval_ms,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            max_queue_depth=max_queue_depth,
+            max_queue_wait_ms=max_queue_wait_ms,
+            enable_response_cache=enable_response_cache,
+            response_cache_max_bytes=response_cache_max_bytes,
+            response_cache_ttl_secs=response_cache_ttl_secs,
         )
 
     def to_dict(self):
         return {
             "predict_concurrency": self.predict_concurrency,
             "num_workers": self.num_workers,
+            "preload_model": self.preload_model,
+            "sync_thread_pool_size": self.sync_thread_pool_size,
             "streaming_read_timeout": self.streaming_read_timeout,
+            "streaming_buffer_size": self.streaming_buffer_size,
+            "streaming_coalesce_bytes": self.streaming_coalesce_bytes,
+            "streaming_flush_interval_ms": self.streaming_flush_interval_ms,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "max_queue_depth": self.max_queue_depth,
+            "max_queue_wait_ms": self.max_queue_wait_ms,
+            "enable_response_cache": self.enable_response_cache,
+            "response_cache_max_bytes": self.response_cache_max_bytes,
+            "response_cache_ttl_secs": self.response_cache_ttl_secs,
         }
 
 
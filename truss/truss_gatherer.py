@@ -1,13 +1,21 @@
 from pathlib import Path
+from typing import Dict, List, Tuple
 
 import yaml
+from truss.constants import CONFIG_FILE
 from truss.local.local_config_handler import LocalConfigHandler
 from truss.patch.hash import str_hash_str
 from truss.truss_handle import TrussHandle
-from truss.util.path import copy_file_path, copy_tree_path, remove_tree_path
+from truss.util.path import IgnoreMatcher, load_trussignore_patterns, sync_tree
 
 
 def gather(truss_path: Path) -> Path:
+    """
+    Gather a scattered truss, and its external packages, into a shadow truss.
+
+    The shadow truss is kept across calls and synced incrementally: only
+    files that changed are linked or copied again, see `sync_tree`.
+    """
     handle = TrussHandle(truss_path)
     shadow_truss_dir_name = calc_shadow_truss_dirname(truss_path)
     shadow_truss_metdata_file_path = (
@@ -24,15 +32,43 @@ def gather(truss_path: Path) -> Path:
         if max_mod_time == handle.max_modified_time:
             return shadow_truss_path
 
-        # Shadow truss is out of sync, clear it
+        # Shadow truss is out of sync, it's only valid again once synced.
         shadow_truss_metdata_file_path.unlink()
-        remove_tree_path(shadow_truss_path)
 
-    copy_tree_path(truss_path, shadow_truss_path)
-    packages_dir_path_in_shadow = (
-        shadow_truss_path / handle.spec.config.bundled_packages_dir
-    )
-    packages_dir_path_in_shadow.mkdir(exist_ok=True)
+    files, dirs = _shadow_truss_sources(handle, truss_path)
+    # The config of the shadow truss is rewritten below, so it must not be
+    # linked to the original one.
+    sync_tree(shadow_truss_path, files, dirs, copy_only={CONFIG_FILE})
+
+    # Don't run validation because they will fail until we clear external
+    # packages. We do it after.
+    shadow_handle = TrussHandle(shadow_truss_path, validate=False)
+    shadow_handle.clear_external_packages()
+    shadow_handle.validate()
+    with shadow_truss_metdata_file_path.open("w") as fp:
+        yaml.safe_dump({"max_mod_time": handle.max_modified_time}, fp)
+    return shadow_truss_path
+
+
+def _shadow_truss_sources(
+    handle: TrussHandle, truss_path: Path
+) -> Tuple[Dict[str, Path], List[str]]:
+    """Source files by path in the shadow truss, and directories to create."""
+    files: Dict[str, Path] = {}
+    dirs: List[str] = []
+    matcher = IgnoreMatcher(load_trussignore_patterns())
+
+    def add_tree(src: Path, dest_prefix: str):
+        for relative_path, entry in matcher.walk(src):
+            dest_path = f"{dest_prefix}{relative_path.as_posix()}"
+            if entry.is_dir():
+                dirs.append(dest_path)
+            else:
+                files[dest_path] = src / relative_path
+
+    add_tree(truss_path, "")
+    packages_dir = Path(handle.spec.config.bundled_packages_dir).as_posix()
+    dirs.append(packages_dir)
     for path in handle.spec.external_package_dirs_paths:
         if not path.is_dir():
             raise ValueError(
@@ -46,20 +82,13 @@ def gather(truss_path: Path) -> Path:
         #
         # Note that this operation can fail if there are conflicts. Onus is on
         # the creator of truss to make sure that there are no conflicts.
-        for sub_path in path.iterdir():
+        for sub_path in sorted(path.iterdir()):
             if sub_path.is_dir():
-                copy_tree_path(sub_path, packages_dir_path_in_shadow / sub_path.name)
+                dirs.append(f"{packages_dir}/{sub_path.name}")
+                add_tree(sub_path, f"{packages_dir}/{sub_path.name}/")
             if sub_path.is_file():
-                copy_file_path(sub_path, packages_dir_path_in_shadow / sub_path.name)
-
-    # Don't run validation because they will fail until we clear external
-    # packages. We do it after.
-    shadow_handle = TrussHandle(shadow_truss_path, validate=False)
-    shadow_handle.clear_external_packages()
-    shadow_handle.validate()
-    with shadow_truss_metdata_file_path.open("w") as fp:
-        yaml.safe_dump({"max_mod_time": handle.max_modified_time}, fp)
-    return shadow_truss_path
+                files[f"{packages_dir}/{sub_path.name}"] = sub_path
+    return files, dirs
 
 
 def calc_shadow_truss_dirname(truss_path: Path) -> str:
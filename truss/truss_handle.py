@@ -34,7 +34,7 @@ from truss.constants import (
 from truss.contexts.image_builder.serving_image_builder import (
     ServingImageBuilderContext,
 )
-from truss.contexts.local_loader.load_model_local import LoadModelLocal
+from truss.contexts.local_loader.model_session import LocalModelSession
 from truss.decorators import proxy_to_shadow_if_scattered
 from truss.docker import (
     Docker,
@@ -50,10 +50,17 @@ from truss.errors import ContainerIsDownError, ContainerNotFoundError
 from truss.local.local_config_handler import LocalConfigHandler
 from truss.notebook import is_notebook_or_ipython
 from truss.patch.calc_patch import calc_truss_patch
+from truss.patch.content_store import patch_content_store
 from truss.patch.hash import directory_content_hash
 from truss.patch.signature import calc_truss_signature
 from truss.patch.types import TrussSignature
 from truss.readme_generator import generate_readme
+from truss.templates.control.control.helpers.truss_patch.wire_format import (
+    ACCEPT_PATCH_HEADER,
+    PATCH_BINARY_MEDIA_TYPE,
+    encode_patch_request,
+)
+from truss.templates.control.control.helpers.types import Patch, PatchType
 from truss.templates.shared.serialization import (
     truss_msgpack_deserialize,
     truss_msgpack_serialize,
@@ -61,12 +68,11 @@ from truss.templates.shared.serialization import (
 from truss.truss_config import BaseImage, ExternalData, ExternalDataItem, TrussConfig
 from truss.truss_spec import TrussSpec
 from truss.types import Example, PatchDetails, PatchRequest
-from truss.util.path import (
-    copy_file_path,
-    copy_tree_path,
-    get_max_modified_time_of_dir,
-    load_trussignore_patterns,
+from truss.util.mtime_tracker import (
+    invalidate_max_modified_time_of_dir,
+    tracked_max_modified_time_of_dir,
 )
+from truss.util.path import copy_file_path, copy_tree_path, load_trussignore_patterns
 from truss.validation import validate_secret_name
 
 logger: logging.Logger = logging.getLogger(__name__)
@@ -81,6 +87,7 @@ class TrussHandle:
         self._truss_dir = truss_dir
         self._spec = TrussSpec(truss_dir)
         self._hash_for_mod_time: Optional[Tuple[float, str]] = None
+        self._local_session: Optional[LocalModelSession] = None
         if validate:
             self.validate()
 
@@ -280,8 +287,17 @@ class TrussHandle:
 
     def server_predict(self, request: Dict):
         """Run the prediction flow locally."""
-        model = LoadModelLocal.run(self._truss_dir)
-        return _prediction_flow(model, request)
+        return self.local_session.predict(request)
+
+    @property
+    def local_session(self) -> LocalModelSession:
+        """
+        Session that keeps the model loaded in this process, for local
+        predictions, e.g. `local_session.predict_many(requests)`.
+        """
+        if self._local_session is None:
+            self._local_session = LocalModelSession(self)
+        return self._local_session
 
     @proxy_to_shadow_if_scattered
     def docker_predict(
@@ -526,6 +542,7 @@ class TrussHandle:
         with self._spec.examples_path.open("w") as examples_file:
             examples_to_write = [example.to_dict() for example in examples]
             examples_file.write(yaml.dump(examples_to_write))
+        self._invalidate_max_modified_time()
 
     def example(self, name_or_index: Union[str, int]) -> Example:
         """Return lookup an example by name or index.
@@ -654,10 +671,16 @@ class TrussHandle:
         self._update_config(define_base_image_fn)
 
     @proxy_to_shadow_if_scattered
-    def patch_container(self, patch_request: PatchRequest):
+    def patch_container(
+        self,
+        patch_request: PatchRequest,
+        prev_signature: Optional[TrussSignature] = None,
+    ):
         """Patch changes onto the container running this Truss.
 
-        Useful for local incremental development.
+        Useful for local incremental development. If the container accepts
+        binary patches, the patch is sent compressed, with deltas of changed
+        files whose contents at `prev_signature` are stored locally.
         """
         if not self.spec.live_reload:
             raise ValueError("Not a control truss: applying patch is not supported.")
@@ -669,13 +692,74 @@ class TrussHandle:
                 "Only running trusses can be patched: no running containers found for this truss."
             )
 
-        model_base_url = _get_url_from_container(container)
+        patch_url = _patch_url(container)
+        if not _accepts_binary_patches(patch_url):
+            if any(
+                getattr(patch.body, "binary_content", None) is not None
+                for patch in patch_request.patches
+            ):
+                raise ValueError(
+                    "Container doesn't accept binary patches, needed to patch "
+                    "files that aren't UTF-8 text."
+                )
+            resp = requests.post(patch_url, json=patch_request.to_dict())
+            resp.raise_for_status()
+            return resp.json()
+
+        base_content = None
+        if prev_signature is not None:
+            base_content = self._patch_base_content_fn(prev_signature)
+        resp_json = self._post_binary_patch(patch_url, patch_request, base_content)
+        if (
+            base_content is not None
+            and resp_json.get("error", {}).get("type") == "delta_base_mismatch"
+        ):
+            logger.info("Patch deltas don't apply on container, sending full files.")
+            resp_json = self._post_binary_patch(patch_url, patch_request, None)
+        return resp_json
+
+    def _post_binary_patch(
+        self,
+        patch_url: str,
+        patch_request: PatchRequest,
+        base_content: Optional[Callable[[Patch], Optional[bytes]]],
+    ):
+        body = encode_patch_request(
+            patch_request.hash,
+            patch_request.prev_hash,
+            patch_request.patches,
+            base_content,
+        )
         resp = requests.post(
-            f"{model_base_url}/control/patch", json=patch_request.to_dict()
+            patch_url,
+            data=body,
+            headers={"Content-Type": PATCH_BINARY_MEDIA_TYPE},
         )
         resp.raise_for_status()
         return resp.json()
 
+    def _patch_base_content_fn(
+        self, prev_signature: TrussSignature
+    ) -> Callable[[Patch], Optional[bytes]]:
+        """Previous contents of patched files, from the local content store."""
+        dirs_by_type = {
+            PatchType.MODEL_CODE: self._spec.config.model_module_dir,
+            PatchType.PACKAGE: self._spec.config.bundled_packages_dir,
+        }
+        content_store = patch_content_store()
+
+        def base_content(patch: Patch) -> Optional[bytes]:
+            patch_dir = dirs_by_type.get(patch.type)
+            if patch_dir is None:
+                return None
+            path = (Path(patch_dir) / patch.body.path).as_posix()  # type: ignore[attr-defined]
+            digest = prev_signature.content_hashes_by_path.get(path)
+            if digest is None:
+                return None
+            return content_store.get(digest)
+
+        return base_content
+
     def truss_hash_on_container(self) -> Optional[str]:
         """[Deprecated] Use truss_hash_on_serving_container."""
         return self.truss_hash_on_serving_container()
@@ -762,12 +846,17 @@ class TrussHandle:
 
     @proxy_to_shadow_if_scattered
     def calc_patch(
-        self, prev_truss_hash: str, truss_ignore_patterns: List[str]
+        self,
+        prev_truss_hash: str,
+        truss_ignore_patterns: List[str],
+        binary_content: bool = False,
     ) -> Optional[PatchDetails]:
         """Calculates patch of current truss from previous.
 
         Returns None if signature cannot be found locally for previous truss hash
         or if the change cannot be expressed with currently supported patches.
+        Set `binary_content` if the patch is sent in the binary format, to
+        patch files that aren't UTF-8 text.
         """
         prev_sign_str = LocalConfigHandler.get_signature(prev_truss_hash)
         if prev_sign_str is None:
@@ -776,7 +865,9 @@ class TrussHandle:
 
         prev_sign = TrussSignature.from_dict(json.loads(prev_sign_str))
         ignore_patterns = truss_ignore_patterns + self._spec.hash_ignore_patterns
-        patch_ops = calc_truss_patch(self._truss_dir, prev_sign, ignore_patterns)
+        patch_ops = calc_truss_patch(
+            self._truss_dir, prev_sign, ignore_patterns, binary_content=binary_content
+        )
         if patch_ops is None:
             return None
 
@@ -808,16 +899,22 @@ class TrussHandle:
     @property
     def max_modified_time(self) -> float:
         """Max modified time of all the files and directories that this Truss spans."""
-        max_mod_time = get_max_modified_time_of_dir(self._truss_dir)
+        max_mod_time = tracked_max_modified_time_of_dir(self._truss_dir)
         if self.no_external_packages:
             return max_mod_time
 
         for path in self.spec.external_package_dirs_paths:
-            max_mod_time_for_path = get_max_modified_time_of_dir(path)
+            max_mod_time_for_path = tracked_max_modified_time_of_dir(path)
             if max_mod_time_for_path > max_mod_time:
                 max_mod_time = max_mod_time_for_path
         return max_mod_time
 
+    def _invalidate_max_modified_time(self):
+        # Makes tracking, and the local session, notice a write right away.
+        invalidate_max_modified_time_of_dir(self._truss_dir)
+        if self._local_session is not None:
+            self._local_session.invalidate()
+
     @property
     def no_external_packages(self) -> bool:
         return len(self.spec.config.external_package_dirs) == 0
@@ -834,6 +931,20 @@ class TrussHandle:
         sign = calc_truss_signature(self._truss_dir)
         truss_hash = self._serving_hash()
         LocalConfigHandler.add_signature(truss_hash, json.dumps(sign.to_dict()))
+        if self.is_control_truss:
+            # Contents of patchable files, to send deltas of them next time.
+            patch_content_store().put_files(
+                self._truss_dir / path
+                for path, digest in sign.content_hashes_by_path.items()
+                if digest is not None
+                and _is_under_any(
+                    path,
+                    [
+                        self._spec.config.model_module_dir,
+                        self._spec.config.bundled_packages_dir,
+                    ],
+                )
+            )
 
     def _copy_files(self, file_dir_or_glob: str, destination_dir: Path):
         item = file_dir_or_glob
@@ -845,9 +956,10 @@ class TrussHandle:
             for filename in filenames:
                 filepath = Path(filename)
                 copy_file_path(filepath, destination_dir / filepath.name)
+        self._invalidate_max_modified_time()
 
     def _get_serving_labels(self) -> Dict[str, Any]:
-        truss_mod_time = get_max_modified_time_of_dir(self._truss_dir)
+        truss_mod_time = tracked_max_modified_time_of_dir(self._truss_dir)
         return {
             **self._get_serving_lookup_labels(),
             TRUSS_MODIFIED_TIME: truss_mod_time,
@@ -883,6 +995,7 @@ class TrussHandle:
     def _update_config(self, update_config_fn: Callable[[TrussConfig], TrussConfig]):
         config = update_config_fn(self._spec.config)
         config.write_to_yaml_file(self._spec.config_path)
+        self._invalidate_max_modified_time()
         # reload spec
         self._spec = TrussSpec(self._truss_dir)
 
@@ -913,7 +1026,11 @@ class TrussHandle:
             "container found: attempting to patch the container"
         )
         truss_ignore_patterns = load_trussignore_patterns()
-        patch_details = self.calc_patch(running_truss_hash, truss_ignore_patterns)
+        patch_details = self.calc_patch(
+            running_truss_hash,
+            truss_ignore_patterns,
+            binary_content=_accepts_binary_patches(_patch_url(container)),
+        )
         if patch_details is None:
             logger.info("Unable to calculate patch.")
             return None
@@ -930,7 +1047,7 @@ class TrussHandle:
             prev_hash=running_truss_hash,
             patches=patch_details.patch_ops,
         )
-        resp = self.patch_container(patch_request)
+        resp = self.patch_container(patch_request, patch_details.prev_signature)
         if "error" in resp:
             raise RuntimeError(f'Failed to patch control truss {resp["error"]}')
         self._store_signature()
@@ -943,7 +1060,7 @@ class TrussHandle:
         then this avoids calculating the hash, which could be expensive for large
         model binaries.
         """
-        truss_mod_time = get_max_modified_time_of_dir(self._truss_dir)
+        truss_mod_time = tracked_max_modified_time_of_dir(self._truss_dir)
         # If mod time hasn't changed then hash must be the same
         if (
             self._hash_for_mod_time is not None
@@ -967,17 +1084,6 @@ class TrussHandle:
                     )
 
 
-def _prediction_flow(model, request: Dict):
-    """This flow attempts to mimic the request life-cycle of a server"""
-    # TODO: can we just call ModelWrapper directly here?
-    if hasattr(model, "preprocess"):
-        request = model.preprocess(request)
-    response = model.predict(request)
-    if hasattr(model, "postprocess"):
-        response = model.postprocess(response)
-    return response
-
-
 def _wait_for_docker_build(container) -> None:
     for attempt in Retrying(stop=stop_after_attempt(5), wait=wait_fixed(2)):
         state = get_container_state(container)
@@ -1032,6 +1138,25 @@ def _get_url_from_container(container) -> str:
     return get_urls_from_container(container)[INFERENCE_SERVER_PORT][0]
 
 
+def _patch_url(container) -> str:
+    return f"{_get_url_from_container(container)}/control/patch"
+
+
+def _accepts_binary_patches(patch_url: str) -> bool:
+    try:
+        resp = requests.options(patch_url)
+    except exceptions.RequestException:
+        return False
+    if not resp.ok:
+        return False
+    accepted = resp.headers.get(ACCEPT_PATCH_HEADER, "")
+    return PATCH_BINARY_MEDIA_TYPE in [t.strip() for t in accepted.split(",")]
+
+
+def _is_under_any(path: str, dirs: List[str]) -> bool:
+    return any(path.startswith(f"{Path(d).as_posix()}/") for d in dirs)
+
+
 def _create_rand_dir_in_dot_truss(subdir: str) -> Path:
     rnd = str(uuid.uuid4())
     target_directory_path = Path(Path.home(), ".truss", subdir, rnd)
@@ -0,0 +1,228 @@
+import atexit
+import logging
+import math
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Set
+
+from truss.util.path import get_max_modified_time_of_dir
+from watchfiles import watch
+
+logger = logging.getLogger(__name__)
+
+# Set to always walk directories, e.g. where file events aren't reliable,
+# like on network filesystems.
+DISABLE_FILE_EVENTS_ENV_VAR = "TRUSS_DISABLE_FILE_EVENTS"
+DEFAULT_TTL_SECS = 1.0
+# With file events, the directory is still walked this often, in case events
+# were missed, e.g. while the watcher started.
+EVENTS_MAX_AGE_SECS = 30.0
+WATCH_DEBOUNCE_MS = 50
+WATCH_STEP_MS = 10
+
+# Watchers still running at exit are stopped first, the interpreter aborts
+# when it tears down a thread blocked in the watcher.
+_watching_trackers: "weakref.WeakSet[MaxModifiedTimeTracker]" = weakref.WeakSet()
+
+
+@atexit.register
+def _stop_watching():
+    for tracker in list(_watching_trackers):
+        tracker.close()
+
+
+class MaxModifiedTimeTracker:
+    """Max modified time of a directory, kept without walking it every time.
+
+    Same as `get_max_modified_time_of_dir`, but a walk is reused for
+    `ttl_secs`. If the directory is asked for again after that, which
+    happens in long running processes, a watcher is started and file events
+    keep the value current, with walks only every `EVENTS_MAX_AGE_SECS`.
+    Without file events, e.g. if the inotify watch limit is reached, walks
+    are reused for `ttl_secs` only.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        ttl_secs: float = DEFAULT_TTL_SECS,
+        use_events: bool = True,
+    ):
+        self._path = path
+        self._ttl_secs = ttl_secs
+        self._use_events = use_events and not os.environ.get(
+            DISABLE_FILE_EVENTS_ENV_VAR
+        )
+        # Walks hold the lock, so that events seen during a walk are applied
+        # after it.
+        self._lock = threading.Lock()
+        self._max_mtime: Optional[float] = None
+        self._walked_at = 0.0
+        self._stale = True
+        self._watching = False
+        self._stop_event = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    def get(self) -> float:
+        with self._lock:
+            age = time.monotonic() - self._walked_at
+            max_age = self._ttl_secs
+            if self._watching:
+                max_age = max(max_age, EVENTS_MAX_AGE_SECS)
+            if self._max_mtime is not None and not self._stale and age < max_age:
+                return self._max_mtime
+            if self._max_mtime is not None and self._use_events:
+                self._start_watching()
+            max_mtime = get_max_modified_time_of_dir(self._path)
+            self._max_mtime = max_mtime
+            self._walked_at = time.monotonic()
+            self._stale = False
+            return max_mtime
+
+    def invalidate(self):
+        """Walk again on the next `get`, e.g. after writing to the directory."""
+        with self._lock:
+            self._stale = True
+
+    def close(self):
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join()
+
+    def _start_watching(self):
+        if self._watcher is not None:
+            return
+        self._watching = True
+        _watching_trackers.add(self)
+        self._watcher = threading.Thread(
+            target=self._watch, name="truss-mtime-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def _watch(self):
+        try:
+            for changes in watch(
+                self._path,
+                watch_filter=None,
+                debounce=WATCH_DEBOUNCE_MS,
+                step=WATCH_STEP_MS,
+                stop_event=self._stop_event,
+                raise_interrupt=False,
+            ):
+                self._apply_changes(path for _, path in changes)
+        except Exception as e:
+            logger.debug(f"Not using file events for {self._path}: {e}")
+        finally:
+            with self._lock:
+                self._watching = False
+
+    def _apply_changes(self, paths: Iterable[str]):
+        root = os.path.abspath(self._path)
+        changed: Set[str] = set()
+        directories: Set[str] = set()
+        for path in paths:
+            relative_parts = Path(os.path.relpath(path, root)).parts
+            # Hidden files and directories are skipped by the walk.
+            if any(part.startswith(".") for part in relative_parts):
+                continue
+            changed.add(path)
+            # Adding or removing an entry changes its directory's mtime.
+            directories.add(os.path.dirname(path))
+        to_stat = list(changed | directories)
+        mtimes = [_mtime(path) for path in to_stat]
+        with self._lock:
+            if self._max_mtime is None:
+                return
+            for path, mtime in zip(to_stat, mtimes):
+                if mtime is None:
+                    # Removed, the mtime of its directory accounts for it.
+                    continue
+                if mtime < self._max_mtime:
+                    if path not in changed:
+                        # A directory of a changed file that kept its mtime.
+                        continue
+                    # A modified time set to the past, e.g. by extracting an
+                    # archive, may lower the max, so walk again.
+                    self._stale = True
+                    continue
+                self._max_mtime = mtime
+
+
+@dataclass
+class _TrackingScope:
+    ttl_secs: float
+    use_events: bool
+    trackers: Dict[str, MaxModifiedTimeTracker] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+_tracking_scope: ContextVar[Optional[_TrackingScope]] = ContextVar(
+    "truss_mtime_tracking_scope", default=None
+)
+
+
+@contextmanager
+def max_modified_time_tracking(
+    ttl_secs: float = math.inf, use_events: bool = False
+) -> Iterator[None]:
+    """Track max modified times of directories within this context.
+
+    By default a directory is walked only once within the context, which
+    suits single operations, like a `docker_predict`. Long lived consumers,
+    that may see the directory change, like the local model session, keep a
+    `MaxModifiedTimeTracker` with file events instead. Nested contexts use
+    the outermost one.
+    """
+    if _tracking_scope.get() is not None:
+        yield
+        return
+    scope = _TrackingScope(ttl_secs=ttl_secs, use_events=use_events)
+    token = _tracking_scope.set(scope)
+    try:
+        yield
+    finally:
+        _tracking_scope.reset(token)
+        for tracker in scope.trackers.values():
+            tracker.close()
+
+
+def tracked_max_modified_time_of_dir(path: Path) -> float:
+    """
+    Max modified time of files and directories in `path`, like
+    `get_max_modified_time_of_dir`, but tracked if within a
+    `max_modified_time_tracking` context.
+    """
+    scope = _tracking_scope.get()
+    if scope is None:
+        return get_max_modified_time_of_dir(path)
+    key = os.path.abspath(path)
+    with scope.lock:
+        tracker = scope.trackers.get(key)
+        if tracker is None:
+            tracker = MaxModifiedTimeTracker(path, scope.ttl_secs, scope.use_events)
+            scope.trackers[key] = tracker
+    return tracker.get()
+
+
+def invalidate_max_modified_time_of_dir(path: Path):
+    """Make tracking notice a write to `path` right away."""
+    scope = _tracking_scope.get()
+    if scope is None:
+        return
+    with scope.lock:
+        tracker = scope.trackers.get(os.path.abspath(path))
+    if tracker is not None:
+        tracker.invalidate()
+
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
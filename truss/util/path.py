@@ -1,12 +1,27 @@
+import errno
 import os
 import random
+import shutil
+import stat
 import string
+import sys
 import tempfile
 from contextlib import contextmanager
 from distutils.dir_util import remove_tree
 from distutils.file_util import copy_file
+from functools import lru_cache
 from pathlib import Path
-from typing import Iterable, Iterator, List, Optional, Set, Tuple, Union
+from typing import (
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 import pathspec
 
@@ -14,26 +29,39 @@ import pathspec
 # that should be ignored when copying a directory tree such as .git directory.
 FIXED_TRUSS_IGNORE_PATH = Path(__file__).parent / ".truss_ignore"
 
+# ioctl request to share the content of a file copy-on-write, on Linux
+# filesystems that support it, such as btrfs and xfs.
+_FICLONE = 0x40049409
 
-def copy_tree_path(src: Path, dest: Path, ignore_patterns: List[str] = []) -> None:
-    """Copy a directory tree, ignoring files specified in .truss_ignore."""
+
+def copy_tree_path(
+    src: Path,
+    dest: Path,
+    ignore_patterns: List[str] = [],
+    link_min_size: Optional[int] = None,
+) -> None:
+    """Copy a directory tree, ignoring files specified in .truss_ignore.
+
+    With `link_min_size`, files of at least that size are cloned or
+    hardlinked where possible, see `link_or_copy_file`.
+    """
     patterns = load_trussignore_patterns()
     patterns.extend(ignore_patterns)
 
     if not dest.exists():
         dest.mkdir(parents=True)
 
-    for sub_path in src.rglob("*"):
-        if is_ignored(sub_path, patterns, base_dir=src):
-            continue
+    for relative_path, entry in IgnoreMatcher(patterns).walk(src):
+        dest_fp = dest / relative_path
 
-        dest_fp = dest / sub_path.relative_to(src)
-
-        if sub_path.is_dir():
+        if entry.is_dir():
             dest_fp.mkdir(exist_ok=True)
         else:
             dest_fp.parent.mkdir(exist_ok=True, parents=True)
-            copy_file(str(sub_path), str(dest_fp), verbose=False)
+            if link_min_size is not None and entry.stat().st_size >= link_min_size:
+                link_or_copy_file(Path(entry.path), dest_fp)
+            else:
+                copy_file(entry.path, str(dest_fp), verbose=False)
 
 
 def copy_file_path(src: Path, dest: Path) -> Tuple[str, str]:
@@ -47,6 +75,132 @@ def copy_tree_or_file(src: Path, dest: Path) -> Union[List[str], Tuple[str, str]
     return copy_tree_path(src, dest)  # type: ignore
 
 
+def link_or_copy_file(src: Path, dest: Path, allow_hardlink: bool = True) -> None:
+    """
+    Make `dest` a file with the content of `src`, as cheaply as possible: a
+    copy-on-write clone where the filesystem supports it, else a hardlink,
+    else a copy. `dest` is replaced, never written to, as it may be a
+    hardlink itself.
+
+    Only allow hardlinks if `dest` is never written to in place, writes to
+    it would go to `src` too.
+    """
+    if dest.is_dir() and not dest.is_symlink():
+        shutil.rmtree(dest)
+    elif os.path.lexists(dest):
+        dest.unlink()
+    if _clone_file(src, dest):
+        return
+    if allow_hardlink:
+        try:
+            os.link(src, dest)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src, dest)
+
+
+def _clone_file(src: Path, dest: Path) -> bool:
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+
+    try:
+        with src.open("rb") as src_file, dest.open("xb") as dest_file:
+            try:
+                fcntl.ioctl(dest_file.fileno(), _FICLONE, src_file.fileno())
+            except OSError as e:
+                if e.errno not in (
+                    errno.EOPNOTSUPP,
+                    errno.ENOTTY,
+                    errno.EXDEV,
+                    errno.EINVAL,
+                    errno.EBADF,
+                ):
+                    raise
+                cloned = False
+            else:
+                cloned = True
+    except OSError:
+        cloned = False
+    if not cloned:
+        if os.path.lexists(dest):
+            dest.unlink()
+        return False
+    shutil.copystat(src, dest)
+    return True
+
+
+def sync_tree(
+    dest: Path,
+    files: Dict[str, Path],
+    dirs: Iterable[str] = (),
+    copy_only: Collection[str] = (),
+) -> int:
+    """
+    Make the directory `dest` contain exactly `files`, source file by path
+    relative to `dest`, and `dirs`, besides the parents of `files`.
+
+    Only files whose size or modification time differ from their source are
+    linked or copied again, see `link_or_copy_file`, and anything else under
+    `dest` is removed. Paths in `copy_only` are always copied, for files
+    that get written to in `dest`.
+
+    Returns: number of files linked or copied.
+    """
+    wanted_dirs = set(dirs)
+    for path in files:
+        parts = path.split("/")
+        wanted_dirs.update("/".join(parts[:end]) for end in range(1, len(parts)))
+
+    dest.mkdir(parents=True, exist_ok=True)
+    for root, dir_names, file_names in os.walk(dest, topdown=False):
+        relative_root = Path(root).relative_to(dest).as_posix()
+        prefix = "" if relative_root == "." else f"{relative_root}/"
+        for name in file_names:
+            if f"{prefix}{name}" not in files:
+                os.unlink(os.path.join(root, name))
+        for name in dir_names:
+            dir_path = os.path.join(root, name)
+            if f"{prefix}{name}" in wanted_dirs:
+                continue
+            if os.path.islink(dir_path):
+                os.unlink(dir_path)
+            else:
+                shutil.rmtree(dir_path)
+
+    for path in sorted(wanted_dirs):
+        dir_path = dest / path
+        if os.path.lexists(dir_path) and not dir_path.is_dir():
+            dir_path.unlink()
+        dir_path.mkdir(exist_ok=True)
+
+    synced = 0
+    for path, src in files.items():
+        dest_file = dest / path
+        if path not in copy_only and _same_file_stat(src, dest_file):
+            continue
+        link_or_copy_file(src, dest_file, allow_hardlink=path not in copy_only)
+        synced += 1
+    return synced
+
+
+def _same_file_stat(src: Path, dest: Path) -> bool:
+    try:
+        dest_stat = dest.lstat()
+        src_stat = src.stat()
+    except OSError:
+        return False
+    if not stat.S_ISREG(dest_stat.st_mode):
+        return False
+    if (src_stat.st_ino, src_stat.st_dev) == (dest_stat.st_ino, dest_stat.st_dev):
+        return True
+    return (src_stat.st_size, src_stat.st_mtime_ns) == (
+        dest_stat.st_size,
+        dest_stat.st_mtime_ns,
+    )
+
+
 def remove_tree_path(target: Path) -> None:
     return remove_tree(str(target), verbose=0)
 
@@ -129,14 +283,10 @@ def is_ignored(
         bool: True if the path matches any of the ignore patterns (i.e., should be ignored),
             and False otherwise.
     """
-    ignore_spec = pathspec.PathSpec.from_lines(
-        pathspec.patterns.GitWildMatchPattern, patterns
-    )
-
     if base_dir:
         path = path.relative_to(base_dir)
 
-    return ignore_spec.match_file(path)
+    return IgnoreMatcher(patterns).is_ignored(path)
 
 
 def get_ignored_relative_paths(
@@ -147,20 +297,75 @@ def get_ignored_relative_paths(
     if ignore_patterns is None:
         return iter([])
 
-    ignore_spec = pathspec.PathSpec.from_lines(
-        pathspec.patterns.GitWildMatchPattern, ignore_patterns
-    )
-    return ignore_spec.match_files(root_relative_paths)
+    return _compile_patterns(tuple(ignore_patterns)).match_files(root_relative_paths)
 
 
 def get_unignored_relative_paths_from_root(
     root: Path,
     ignore_patterns: Optional[List[str]] = None,
 ) -> Set[Path]:
-    """Given a root directory, returns an iterator of the relative paths that do not match ignore_patterns."""
-    root_relative_paths = set(path.relative_to(root) for path in root.glob("**/*"))
+    """Given a root directory, returns the relative paths that do not match ignore_patterns."""
+    return {
+        relative_path for relative_path, _ in IgnoreMatcher(ignore_patterns).walk(root)
+    }
 
-    ignored_paths = set(
-        get_ignored_relative_paths(root_relative_paths, ignore_patterns)
-    )
-    return root_relative_paths - ignored_paths  # type: ignore
+
+@lru_cache(maxsize=32)
+def _compile_patterns(patterns: Tuple[str, ...]) -> pathspec.PathSpec:
+    return pathspec.PathSpec.from_lines(pathspec.patterns.GitWildMatchPattern, patterns)
+
+
+class IgnoreMatcher:
+    """Ignore patterns compiled once, to match many paths against.
+
+    Paths are matched the same way as by `is_ignored`. `walk` lists a
+    directory tree without descending into directories whose contents are all
+    ignored, such as `.git` or `__pycache__`.
+    """
+
+    def __init__(self, patterns: Optional[Iterable[str]] = None):
+        self._spec = _compile_patterns(tuple(patterns or ()))
+        # With negated patterns, a file in an ignored directory can still be
+        # included, so the directory has to be listed.
+        self._can_prune = all(
+            pattern.include is not False for pattern in self._spec.patterns
+        )
+
+    def is_ignored(self, relative_path: Union[str, os.PathLike]) -> bool:
+        return self._spec.match_file(relative_path)
+
+    def walk(
+        self, root: Path, start: Optional[Path] = None
+    ) -> Iterator[Tuple[Path, os.DirEntry]]:
+        """
+        Yields the relative path and directory entry of every path under
+        `root` that is not ignored, parents before their contents. With
+        `start`, a directory relative to `root`, only the paths under it are
+        yielded, still relative to `root`.
+
+        Like `Path.glob("**/*")`, hidden files are included and symlinks to
+        directories are listed but not descended into.
+        """
+        if start is None:
+            if root.is_dir():
+                yield from self._walk(str(root), "")
+        elif (root / start).is_dir():
+            yield from self._walk(str(root / start), f"{start.as_posix()}/")
+
+    def _walk(
+        self, dir_path: str, relative_dir: str
+    ) -> Iterator[Tuple[Path, os.DirEntry]]:
+        try:
+            with os.scandir(dir_path) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            return
+
+        for entry in entries:
+            relative_path = f"{relative_dir}{entry.name}"
+            if not self._spec.match_file(relative_path):
+                yield Path(relative_path), entry
+            if entry.is_dir(follow_symlinks=False) and not (
+                self._can_prune and self._spec.match_file(f"{relative_path}/")
+            ):
+                yield from self._walk(entry.path, f"{relative_path}/")